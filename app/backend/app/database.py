@@ -1,8 +1,10 @@
+import os
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "postgresql://user:password@db:5432/colonia_gatos"
+# Por defecto la BD del contenedor; DATABASE_URL permite apuntar a otra (p. ej. benchmarks)
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/colonia_gatos")
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
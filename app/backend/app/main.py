@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, Response
-from app.routes import gatos, auth, actividades, partes, colonias, campanas, quejas, inspecciones, informes, voluntarios, backup, password_routes, settings_api
+from app.routes import gatos, auth, actividades, partes, colonias, campanas, quejas, inspecciones, informes, voluntarios, backup, password_routes, settings_api, busqueda, exportaciones, importaciones, notificaciones, eventos, cambios
 from app.database import engine, Base
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_jwt_auth import AuthJWT
@@ -14,6 +14,8 @@ from datetime import datetime
 
 # Importar logger centralizado
 from app.utils.logger import get_logger
+from app.utils.scheduler import planificador
+from app.utils.cambios import usuario_actual, usuario_del_token
 logger = get_logger("main")
 
 # Leer variable del entorno para mostrar o no /docs
@@ -36,6 +38,13 @@ app = FastAPI(title="Onegat API", version="1.0.0", description="API para la gest
 @app.on_event("startup")
 async def on_startup():
     logger.info("Onegat arrancado")
+    # Todos los workers lo arrancan; solo el líder (advisory lock) ejecuta las tareas
+    if settings.planificador_activo:
+        planificador.iniciar()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await planificador.detener()
 
 
 # Asegúrate de que la carpeta existe
@@ -99,6 +108,12 @@ app.include_router(voluntarios.router, prefix="/api/voluntarios", tags=["Volunta
 app.include_router(backup.router, prefix="/api/backup", tags=["Backup"])
 app.include_router(password_routes.router, prefix="/api/auth", tags=["Password Management"])
 app.include_router(settings_api.router, prefix="/api", tags=["settings"])
+app.include_router(busqueda.router, prefix="/api/busqueda", tags=["Búsqueda"])
+app.include_router(exportaciones.router, prefix="/api/exportaciones", tags=["Exportaciones"])
+app.include_router(importaciones.router, prefix="/api/importaciones", tags=["Importaciones"])
+app.include_router(notificaciones.router, prefix="/api/notificaciones", tags=["Notificaciones"])
+app.include_router(eventos.router, prefix="/api/eventos", tags=["Eventos"])
+app.include_router(cambios.router, prefix="/api", tags=["Cambios"])
 
 @app.middleware("http")
 async def expiration_check(request: Request, call_next):
@@ -112,6 +127,15 @@ async def expiration_check(request: Request, call_next):
 
     return await call_next(request)
 
+@app.middleware("http")
+async def usuario_registro_cambios(request: Request, call_next):
+    # Quién escribe, para registro_cambios (utils/cambios.py)
+    token = usuario_actual.set(usuario_del_token(request))
+    try:
+        return await call_next(request)
+    finally:
+        usuario_actual.reset(token)
+
 # Health público para monitorización
 @app.get("/api/health")
 def health():
@@ -1,8 +1,33 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Table, MetaData, Float
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Boolean, Table, MetaData, Float, Index, JSON, Sequence, text, DDL, event
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
+def columna_updated_at():
+    """Marca de última modificación (UTC). La usan los backups incrementales."""
+    return Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+        index=True,
+    )
+
+# Búsqueda de texto (routes/busqueda.py): en producción lo crea la migración 0003;
+# así también existe en las BD de desarrollo creadas con create_all
+event.listen(Base.metadata, "before_create", DDL("""
+    CREATE EXTENSION IF NOT EXISTS unaccent;
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+"""))
+
+def indice_busqueda(tabla: str, expresion: str) -> Index:
+    """Índice GIN de la búsqueda de texto (migración 0003). `expresion` debe ser
+    la misma que usa routes/busqueda.py, o PostgreSQL no usará el índice."""
+    return Index(f"ix_{tabla}_busqueda", text(f"({expresion})"), postgresql_using="gin")
+
 # Tabla intermedia para la relación muchos-a-muchos entre Campanas y Gatos
 metadata = Base.metadata
 campanas_gatos = Table(
@@ -22,7 +47,7 @@ usuarios_colonias = Table(
 class Gato(Base):
     __tablename__ = "gatos"
     id = Column(Integer, primary_key=True, index=True)
-    nombre = Column(String, nullable=False)
+    nombre = Column(String, nullable=False, index=True)
     raza = Column(String)
     sexo = Column(String, nullable=False)
     edad_num = Column(Integer, nullable=True)  # Almacena el número (0-12 meses o 1+ años)
@@ -32,17 +57,36 @@ class Gato(Base):
     colonia_id = Column(Integer, ForeignKey("colonias.id", ondelete="SET NULL"), nullable=True)  # Relación con colonia
     evaluacion_sanitaria = Column(String, nullable=True)  # Evaluación sanitaria del gato
     adoptabilidad = Column(String, nullable=True)  # Estado de adoptabilidad
-    fecha_vacunacion = Column(DateTime, nullable=True)  # Fecha de la última vacunación
+    fecha_vacunacion = Column(DateTime, nullable=True, index=True)  # Fecha de la última vacunación
     tipo_vacuna = Column(String, nullable=True)  # Tipo de vacuna aplicada
-    fecha_desparasitacion = Column(DateTime, nullable=True)  # Fecha de la última desparasitación
-    fecha_esterilizacion = Column(DateTime, nullable=True)  # Fecha de esterilización
+    fecha_desparasitacion = Column(DateTime, nullable=True, index=True)  # Fecha de la última desparasitación
+    fecha_esterilizacion = Column(DateTime, nullable=True, index=True)  # Fecha de esterilización
     codigo_identificacion = Column(String(15), nullable=True)
     imagen = Column(String, nullable=True)  # Ruta de la imagen
     activo = Column(Boolean, default=True)  # Nuevo campo para marcar si está activo
+    # Alta en el sistema (series de /informes/series); NULL en gatos anteriores a la migración 0006
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=text("timezone('utc', now())"), nullable=True, index=True)
+    updated_at = columna_updated_at()
 
     colonia = relationship("Colonia", back_populates="gatos")
     campanas = relationship("Campana", secondary=campanas_gatos, back_populates="gatos")
 
+    __table_args__ = (
+        # Búsqueda por microchip: exacta y por prefijo (utils/microchip.py normaliza a solo dígitos)
+        Index(
+            "uq_gatos_codigo_identificacion", "codigo_identificacion", unique=True,
+            postgresql_where=text("codigo_identificacion IS NOT NULL"),
+            postgresql_ops={"codigo_identificacion": "text_pattern_ops"},
+        ),
+        # Listados filtrados por colonia(s) y paginados por id (utils/filtros.py)
+        Index("ix_gatos_colonia_id_id", "colonia_id", "id"),
+        indice_busqueda(
+            "gatos",
+            "setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(nombre, '') || ' ' || coalesce(codigo_identificacion, ''))), 'A')"
+            " || setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(raza, ''))), 'B')",
+        ),
+    )
+
 class Campana(Base):
     __tablename__ = "campanas"
     id = Column(Integer, primary_key=True, index=True)
@@ -53,6 +97,7 @@ class Campana(Base):
     voluntarios_involucrados = Column(String, nullable=True)
     gatos_objetivo = Column(Integer, default=0)
     gatos_esterilizados = Column(Integer, default=0)
+    updated_at = columna_updated_at()
 
     gatos = relationship("Gato", secondary=campanas_gatos, back_populates="campanas")
 
@@ -67,6 +112,9 @@ class User(Base):
     accepted_terms_date = Column(DateTime, nullable=True)
     accepted_demo_terms = Column(Boolean, default=False)
     accepted_demo_terms_date = Column(DateTime, nullable=True)
+    digest_notificaciones = Column(Boolean, nullable=False, default=False, server_default=text("false"))  # correo: resumen horario
+    notificaciones_no_leidas = Column(Integer, nullable=False, default=0, server_default=text("0"))  # contador de la bandeja
+    updated_at = columna_updated_at()
 
     actividades = relationship("ActividadVoluntario", back_populates="voluntario")
     colonias = relationship( "Colonia", secondary=usuarios_colonias, back_populates="usuarios")
@@ -78,6 +126,7 @@ class ActividadVoluntario(Base):
     fecha = Column(DateTime, default=datetime.utcnow)
     voluntario_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     estatus = Column(String, default="pendiente")  # pendiente, en progreso, completada
+    updated_at = columna_updated_at()
 
     voluntario = relationship("User", back_populates="actividades")
 
@@ -91,24 +140,38 @@ class Colonia(Base):
     numero_gatos = Column(Integer, default=0)
     responsable_voluntario = Column(String, nullable=True)
     estado = Column(String, default="activa")
+    updated_at = columna_updated_at()
 
     gatos = relationship("Gato", back_populates="colonia")
     quejas = relationship("Queja", back_populates="colonia")
     inspecciones = relationship("Inspeccion", back_populates="colonia")
     usuarios = relationship( "User", secondary=usuarios_colonias, back_populates="colonias")
 
+    __table_args__ = (
+        indice_busqueda(
+            "colonias",
+            "setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(nombre, ''))), 'A')"
+            " || setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(ubicacion, ''))), 'B')",
+        ),
+    )
+
 class Queja(Base):
     __tablename__ = "quejas"
     id = Column(Integer, primary_key=True, index=True)
-    fecha = Column(DateTime, default=datetime.utcnow)
+    fecha = Column(DateTime, default=datetime.utcnow, index=True)
     descripcion = Column(String, nullable=False)
     estatus = Column(String, default="pendiente")  # pendiente, en progreso, resuelto
     colonia_id = Column(Integer, ForeignKey("colonias.id", ondelete="SET NULL"), nullable=True)
     solucion_responsable = Column(String, nullable=True)
     archivo = Column(String, nullable=True)
+    updated_at = columna_updated_at()
 
     colonia = relationship("Colonia", back_populates="quejas")
 
+    __table_args__ = (
+        indice_busqueda("quejas", "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(descripcion, '')))"),
+    )
+
 class Inspeccion(Base):
     __tablename__ = "inspecciones"
     id = Column(Integer, primary_key=True, index=True)
@@ -118,9 +181,14 @@ class Inspeccion(Base):
     acciones_recomendadas = Column(String, nullable=True)
     estatus = Column(String, default="pendiente")  # Agregar campo si no existe
     archivo = Column(String, nullable=True)  # Asegurar que el campo está definido
+    updated_at = columna_updated_at()
 
     colonia = relationship("Colonia", back_populates="inspecciones")
 
+    __table_args__ = (
+        indice_busqueda("inspecciones", "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(observaciones, '')))"),
+    )
+
 class Actividad(Base):
     __tablename__ = "actividades"
     id = Column(Integer, primary_key=True, index=True)
@@ -129,6 +197,7 @@ class Actividad(Base):
     fecha_hora = Column(DateTime, default=datetime.utcnow)
     usuario_id = Column(Integer, ForeignKey("users.id"))
     gato_id = Column(Integer, ForeignKey("gatos.id"))
+    updated_at = columna_updated_at()
 
 class Parte(Base):
     __tablename__ = "partes"
@@ -138,6 +207,7 @@ class Parte(Base):
     fecha_hora = Column(DateTime, default=datetime.utcnow)
     usuario_id = Column(Integer, ForeignKey("users.id"))
     responsable_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    updated_at = columna_updated_at()
 
 class Notificacion(Base):
     __tablename__ = "notificaciones"
@@ -146,3 +216,105 @@ class Notificacion(Base):
     usuario_id = Column(Integer, ForeignKey("users.id"))
     leido = Column(Boolean, default=False)
     fecha_hora = Column(DateTime, default=datetime.utcnow)
+    tipo = Column(String, nullable=True)  # queja, inspeccion, parte...
+    updated_at = columna_updated_at()
+
+    __table_args__ = (
+        # Bandeja de cada usuario, paginada por id descendente
+        Index("ix_notificaciones_usuario_id_id", "usuario_id", "id"),
+    )
+
+class CorreoPendiente(Base):
+    """Cola de salida de correos (utils/notificaciones.py): se escribe en la transacción del evento y la vacía el planificador."""
+    __tablename__ = "correos_pendientes"
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    asunto = Column(String, nullable=False)
+    mensaje = Column(String, nullable=False)
+    resumen = Column(Boolean, nullable=False, default=False)  # va en el resumen horario del usuario
+    intentos = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    enviado_en = Column(DateTime, nullable=True)
+    updated_at = columna_updated_at()
+
+    __table_args__ = (
+        # Solo los pendientes: la cola se mantiene pequeña aunque el histórico crezca
+        Index("ix_correos_pendientes_pendientes", "resumen", "id", postgresql_where=text("enviado_en IS NULL")),
+    )
+
+class PerfilImportacion(Base):
+    """Formato del CSV de censo de un municipio (utils/importacion.py detecta cuál encaja)."""
+    __tablename__ = "perfiles_importacion"
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String, nullable=False, unique=True)
+    columnas = Column(JSON, nullable=False)  # cabecera del CSV -> campo de Gato
+    formato_fecha = Column(String, nullable=True)  # p. ej. "%d/%m/%Y"; vacío = deducir
+    codificacion = Column(String, nullable=False, default="utf-8")
+    delimitador = Column(String(1), nullable=True)  # vacío = detectar
+    fila_cabecera = Column(Integer, nullable=True)  # líneas antes de la cabecera; vacío = detectar
+    colonia_id = Column(Integer, ForeignKey("colonias.id", ondelete="SET NULL"), nullable=True)  # colonia destino
+    updated_at = columna_updated_at()
+
+class LoteImportacion(Base):
+    """Una importación de CSV, identificada por el hash del fichero (reanudable e idempotente)."""
+    __tablename__ = "lotes_importacion"
+    id = Column(Integer, primary_key=True, index=True)
+    hash_sha256 = Column(String(64), nullable=False, unique=True)
+    nombre_fichero = Column(String, nullable=True)
+    perfil_id = Column(Integer, ForeignKey("perfiles_importacion.id", ondelete="SET NULL"), nullable=True)
+    estado = Column(String, nullable=False, default="en_curso")  # en_curso, completado, fallido
+    total_filas = Column(Integer, nullable=False, default=0)
+    filas_procesadas = Column(Integer, nullable=False, default=0)  # punto de control: filas del CSV ya confirmadas
+    importados = Column(Integer, nullable=False, default=0)
+    actualizados = Column(Integer, nullable=False, default=0)
+    omitidos = Column(Integer, nullable=False, default=0)
+    errores = Column(String, nullable=True)  # fichero de filas descartadas
+    # Filas que rechazó la BD ({fila del CSV: motivo}): se conservan entre intentos para el fichero de errores
+    rechazadas = Column(JSON(none_as_null=True), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = columna_updated_at()  # también sirve de latido mientras está en curso
+
+class RegistroCambio(Base):
+    """Registro de cambios de solo inserción (utils/cambios.py); lo sirve GET /api/changes."""
+    __tablename__ = "registro_cambios"
+    id = Column(BigInteger, primary_key=True)
+    transaccion = Column(BigInteger, nullable=False, server_default=text("txid_current()"))  # orden del feed
+    tabla = Column(String, nullable=False)
+    pk = Column(String, nullable=False)  # clave primaria; las compuestas separadas por comas
+    op = Column(String(6), nullable=False)  # insert, update, delete
+    campos = Column(JSON(none_as_null=True), nullable=True)  # columnas modificadas (solo en update)
+    usuario_id = Column(Integer, nullable=True)  # sin FK: el registro sobrevive al usuario
+    fecha = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"))
+
+    __table_args__ = (
+        Index("ix_registro_cambios_transaccion_id", "transaccion", "id"),
+    )
+
+# Tablas de los listados con ETag (utils/condicional.py): un trigger por sentencia
+# avanza la secuencia <tabla>_version_seq con cada escritura. nextval() no
+# bloquea filas ni espera al commit, así que los escritores no se esperan entre
+# sí; el lock compartido (hasta el commit) solo avisa a los lectores de que hay
+# escrituras sin confirmar en la tabla
+TABLAS_VERSIONADAS = ("campanas", "colonias", "gatos", "quejas", "usuarios_colonias")
+LOCK_VERSIONES = 0x76657273  # "vers": clave 1 de pg_advisory_xact_lock_shared(clave, oid de la tabla)
+
+def secuencia_version(tabla: str) -> str:
+    return f"{tabla}_version_seq"
+
+for _tabla in TABLAS_VERSIONADAS:
+    Sequence(secuencia_version(_tabla), metadata=Base.metadata)
+
+# En producción lo crea la migración 0013; así también existe con create_all
+# (al final, cuando ya existen las tablas; es idempotente)
+event.listen(Base.metadata, "after_create", DDL(f"""
+    CREATE OR REPLACE FUNCTION f_versionar_tabla() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock_shared({LOCK_VERSIONES}, TG_RELID::int);
+        PERFORM nextval((TG_TABLE_NAME || '_version_seq')::regclass);
+        RETURN NULL;
+    END $$;
+""" + "".join(f"""
+    DROP TRIGGER IF EXISTS tr_{tabla}_version ON {tabla};
+    CREATE TRIGGER tr_{tabla}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}
+    FOR EACH STATEMENT EXECUTE FUNCTION f_versionar_tabla();
+""" for tabla in TABLAS_VERSIONADAS)))
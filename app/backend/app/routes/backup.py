@@ -1,27 +1,88 @@
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, APIRouter, UploadFile, File
 from fastapi_jwt_auth import AuthJWT
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 import os
+import re
 import subprocess
+import shutil
+import tarfile
+import tempfile
 import datetime
-import asyncio
-import boto3  # Para almacenamiento en AWS S3
-from cryptography.fernet import Fernet
+import base64
+import hashlib
+import json
+import math
+from functools import lru_cache
+from app.database import engine
 from app.settings import settings
+from app.utils.backup_crypto import (
+    TAM_TROZO, BackupCorruptoError, CifradorFlujo, abrir_descifrado, cifrar_flujo, descifrar_legacy,
+    es_dump_sin_cifrar, es_formato_flujo, verificar_flujo,
+)
+from app.utils.backup_incremental import (
+    ahora_utc, aplicar_delta, exportar_delta, horizonte_transacciones, leer_cabecera,
+)
+from app.utils.logger import get_logger
+from app.utils.scheduler import planificador
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter()
+logger = get_logger("backup")
 
 # Configuración
 BACKUP_DIR = "/backups"
 MAX_BACKUPS = 7  # Máximo número de backups a conservar
-ENCRYPTION_KEY = settings.encryption_key.encode()
-fernet = Fernet(ENCRYPTION_KEY)
+ENCRYPTION_KEY = settings.encryption_key
+PG_HOST = os.getenv("POSTGRES_HOST", "db")
+PG_DB = os.getenv("POSTGRES_DB", "colonia_gatos")
+# Cadena activa de backups incrementales: {"base", "archivos", "hasta", "horizonte"}
+CADENA_PATH = os.path.join(BACKUP_DIR, ".cadena.json")
+
+def _pg_args():
+    """Argumentos de conexión comunes para pg_dump/pg_restore/psql."""
+    return ["-h", PG_HOST, "-U", os.getenv("POSTGRES_USER", "user")]
+
+def _pg_env():
+    # La contraseña va por entorno, nunca en la línea de comandos
+    return {**os.environ, "PGPASSWORD": os.getenv("POSTGRES_PASSWORD", "password")}
 
 # Modelo para solicitud de backup
 class BackupRequest(BaseModel):
-    backup_type: str  # full o incremental
-    format: str  # sql o json
+    backup_type: str  # full (modo del tenant), custom, directorio o incremental
+    format: str  # extensión del archivo (sql o json)
+
+    @validator("backup_type")
+    def validar_tipo(cls, v):
+        if v not in TIPOS_BACKUP:
+            raise ValueError(f"Tipo de backup no válido. Opciones: {', '.join(TIPOS_BACKUP)}")
+        return v
+
+TIPOS_BACKUP = ("full", "custom", "directorio", "incremental")
+MODOS_COMPLETOS = ("custom", "directorio")
+
+def _resolver_modo(backup_type: str) -> str:
+    """'full' usa el modo configurado para el tenant (BACKUP_MODO)."""
+    if backup_type == "full":
+        return settings.backup_modo if settings.backup_modo in MODOS_COMPLETOS else "custom"
+    return backup_type
+
+def _jobs() -> int:
+    return max(1, settings.backup_jobs or min(os.cpu_count() or 1, 8))
+
+@lru_cache(maxsize=1)
+def _version_pg_dump() -> int:
+    salida = subprocess.run(["pg_dump", "--version"], capture_output=True, text=True).stdout
+    match = re.search(r"(\d+)", salida)
+    return int(match.group(1)) if match else 0
+
+def _compresion() -> str:
+    """zstd solo existe desde pg_dump 16; en versiones anteriores se usa gzip."""
+    compresion = settings.backup_compresion
+    if compresion.startswith("zstd") and _version_pg_dump() < 16:
+        logger.warning(f"pg_dump {_version_pg_dump()} no soporta zstd; se usa gzip")
+        return "6"
+    return compresion
 
 # Protección con AuthJWT
 @router.post("/backup")
@@ -31,46 +92,134 @@ def backup(request: BackupRequest, background_tasks: BackgroundTasks, Authorize:
     if user_claims.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Unauthorized action")
     
+    if request.backup_type == "incremental" and not _cadena_valida():
+        raise HTTPException(status_code=409, detail="Se necesita un backup completo previo para crear un incremental")
+
     background_tasks.add_task(create_backup, request.backup_type, request.format)
     return {"message": "Backup en proceso"}
 
 # Función para generar backup
 def create_backup(backup_type: str, format: str):
+    """
+    Genera un backup cifrado sin cargar el dump en memoria.
+
+    - custom: la salida de pg_dump -F c (comprimida con -Z) se cifra por trozos
+      directamente a disco.
+    - directorio: pg_dump -F d -j N vuelca en paralelo a un directorio temporal,
+      que se empaqueta en tar y se cifra en flujo.
+    - incremental: solo las filas cambiadas desde el último backup de la cadena
+      activa (ver utils/backup_incremental); requiere un completo previo.
+    """
+    modo = _resolver_modo(backup_type)
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
     backup_filename = f"backup_{backup_type}_{timestamp}.{format}"
     backup_path = os.path.join(BACKUP_DIR, backup_filename)
-    
-    # Comando para crear el backup
-    cmd = (
-        f"PGPASSWORD='{os.getenv('POSTGRES_PASSWORD', 'password')}' "
-        f"pg_dump -h db -U {os.getenv('POSTGRES_USER', 'user')} -F c -f {backup_path} colonia_gatos"
-    )
+    # Archivo oculto mientras se escribe: nunca se lista un backup a medias
+    tmp_path = os.path.join(BACKUP_DIR, f".{backup_filename}.part")
 
     try:
-        subprocess.run(cmd, shell=True, check=True)
-
-        # Cifrar archivo
-        with open(backup_path, 'rb') as file:
-            encrypted_data = fernet.encrypt(file.read())
-
-        with open(backup_path, 'wb') as file:
-            file.write(encrypted_data)
+        if modo == "incremental":
+            cadena = _leer_cadena()
+            if not _cadena_valida(cadena):
+                raise HTTPException(status_code=409, detail="Se necesita un backup completo previo")
+            with open(tmp_path, "wb") as destino:
+                with CifradorFlujo(destino, ENCRYPTION_KEY) as cifrador:
+                    hasta, horizonte = exportar_delta(
+                        engine, cifrador,
+                        desde=datetime.datetime.fromisoformat(cadena["hasta"]),
+                        base=cadena["base"],
+                        anterior=cadena["archivos"][-1],
+                        desde_horizonte=cadena.get("horizonte"),
+                    )
+            os.replace(tmp_path, backup_path)
+            cadena["archivos"].append(backup_filename)
+            cadena["hasta"] = hasta.isoformat()
+            cadena["horizonte"] = horizonte
+            _guardar_cadena(cadena)
+        else:
+            # Marcas tomadas antes del dump: el siguiente incremental parte de aquí
+            with engine.connect() as conn:
+                inicio = ahora_utc(conn)
+                horizonte = horizonte_transacciones(conn)
+            if modo == "directorio":
+                _dump_directorio(tmp_path)
+            else:
+                _dump_custom(tmp_path)
+            os.replace(tmp_path, backup_path)
+            _guardar_cadena({
+                "base": backup_filename, "archivos": [backup_filename],
+                "hasta": inicio.isoformat(), "horizonte": horizonte,
+            })
 
         # Eliminar backups antiguos si hay más de los permitidos
         delete_old_backups()
 
-        return {"backup_file": backup_filename, "timestamp": timestamp}
+        return {"backup_file": backup_filename, "timestamp": timestamp, "modo": modo}
 
     except subprocess.CalledProcessError as e:
         raise HTTPException(status_code=500, detail=f"Error al crear el backup: {str(e)}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-# Eliminar backups antiguos
+def _dump_custom(tmp_path: str):
+    cmd = ["pg_dump", *_pg_args(), "-F", "c", "-Z", _compresion(), PG_DB]
+    with open(tmp_path, "wb") as destino:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, env=_pg_env())
+        try:
+            cifrar_flujo(proc.stdout, destino, ENCRYPTION_KEY)
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+def _dump_directorio(tmp_path: str):
+    # El directorio temporal va en el mismo volumen que los backups (no en /tmp del contenedor)
+    trabajo = tempfile.mkdtemp(prefix=".dump_", dir=BACKUP_DIR)
+    try:
+        directorio = os.path.join(trabajo, "dump")
+        cmd = ["pg_dump", *_pg_args(), "-F", "d", "-j", str(_jobs()), "-Z", _compresion(), "-f", directorio, PG_DB]
+        subprocess.run(cmd, check=True, env=_pg_env())
+
+        # Los archivos ya van comprimidos por pg_dump: tar sin compresión adicional
+        with open(tmp_path, "wb") as destino:
+            with CifradorFlujo(destino, ENCRYPTION_KEY) as cifrador:
+                with tarfile.open(fileobj=cifrador, mode="w|") as tar:
+                    tar.add(directorio, arcname="dump")
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+# Cadena de backups incrementales
+def _leer_cadena():
+    try:
+        with open(CADENA_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _guardar_cadena(cadena: dict):
+    tmp = f"{CADENA_PATH}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cadena, f)
+    os.replace(tmp, CADENA_PATH)
+
+def _borrar_cadena():
+    if os.path.exists(CADENA_PATH):
+        os.remove(CADENA_PATH)
+
+def _cadena_valida(cadena=None) -> bool:
+    cadena = cadena or _leer_cadena()
+    return bool(cadena) and all(os.path.exists(os.path.join(BACKUP_DIR, f)) for f in cadena["archivos"])
+
+# Eliminar backups antiguos (nunca los de la cadena activa: sin ellos no se pueden restaurar los incrementales)
 def delete_old_backups():
+    protegidos = set((_leer_cadena() or {}).get("archivos", []))
     backups = sorted(
-        [f for f in os.listdir(BACKUP_DIR) if f.startswith("backup_")],
+        [f for f in os.listdir(BACKUP_DIR) if f.startswith("backup_") and f not in protegidos],
         key=lambda f: os.path.getctime(os.path.join(BACKUP_DIR, f))
     )
-    while len(backups) > MAX_BACKUPS:
+    while backups and len(backups) + len(protegidos) > MAX_BACKUPS:
         old_backup = backups.pop(0)
         os.remove(os.path.join(BACKUP_DIR, old_backup))
 
@@ -90,48 +239,231 @@ def restore_backup(backup_filename: str):
     if not os.path.exists(backup_path):
         raise HTTPException(status_code=404, detail="Backup no encontrado")
 
-    # Descifrar archivo antes de restaurarlo
-    with open(backup_path, 'rb') as file:
-        decrypted_data = fernet.decrypt(file.read())
-
-    with open(backup_path, 'wb') as file:
-        file.write(decrypted_data)
-
-    cmd = (
-        f"PGPASSWORD='{os.getenv('POSTGRES_PASSWORD', 'password')}' "
-        f"psql -h db -U {os.getenv('POSTGRES_USER', 'user')} -d colonia_gatos -c 'DROP SCHEMA public CASCADE; CREATE SCHEMA public;'"
-    )
-    cmd += (
-        f" && PGPASSWORD='{os.getenv('POSTGRES_PASSWORD', 'password')}' "
-        f"pg_restore -h db -U {os.getenv('POSTGRES_USER', 'user')} -d colonia_gatos {backup_path}"
-    )
+    # Comprobar integridad ANTES de borrar el esquema (lectura en flujo, sin escribir texto claro)
+    formato_flujo = es_formato_flujo(backup_path)
+    datos_legacy = None
+    try:
+        if formato_flujo:
+            with open(backup_path, "rb") as origen:
+                verificar_flujo(origen, ENCRYPTION_KEY)
+        elif not es_dump_sin_cifrar(backup_path):
+            # Backups antiguos (Fernet): se descifran en memoria, solo para compatibilidad
+            datos_legacy = descifrar_legacy(backup_path, ENCRYPTION_KEY)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Backup inválido o dañado: {str(e)}")
 
     try:
-        subprocess.run(cmd, shell=True, check=True)
+        if formato_flujo and _contenido(backup_path) == "incremental":
+            _restaurar_cadena(backup_filename)
+        else:
+            _restaurar_completo(backup_path, formato_flujo, datos_legacy)
+
+        # La BD vuelve a un estado anterior: la cadena incremental deja de ser válida
+        _borrar_cadena()
         return {"message": "Restauración completada"}
+    except BackupCorruptoError as e:
+        raise HTTPException(status_code=500, detail=f"Backup dañado durante la restauración: {str(e)}")
     except subprocess.CalledProcessError as e:
         raise HTTPException(status_code=500, detail=f"Error al restaurar el backup: {str(e)}")
 
+def _contenido(backup_path: str) -> str:
+    """Tipo de contenido de un backup v2: 'directorio' (tar), 'incremental' (gzip) o 'custom'."""
+    with open(backup_path, "rb") as origen:
+        cabecera = abrir_descifrado(origen, ENCRYPTION_KEY).peek(512)
+    if cabecera[257:262] == b"ustar":
+        return "directorio"
+    if cabecera[:2] == b"\x1f\x8b":
+        return "incremental"
+    return "custom"
+
+def _restaurar_completo(backup_path: str, formato_flujo: bool, datos_legacy=None):
+    reset_cmd = ["psql", *_pg_args(), "-d", PG_DB, "-c", "DROP SCHEMA public CASCADE; CREATE SCHEMA public;"]
+    if formato_flujo:
+        es_tar = _contenido(backup_path) == "directorio"
+        with open(backup_path, "rb") as origen:
+            lector = abrir_descifrado(origen, ENCRYPTION_KEY)
+            subprocess.run(reset_cmd, check=True, env=_pg_env())
+            if es_tar:
+                _restaurar_directorio(lector)
+            else:
+                _restaurar_flujo(lector)
+    else:
+        subprocess.run(reset_cmd, check=True, env=_pg_env())
+        if datos_legacy is not None:
+            _restaurar_flujo(datos_legacy)
+        else:
+            # Dumps que versiones anteriores dejaban descifrados en disco tras restaurar
+            with open(backup_path, "rb") as origen:
+                _restaurar_flujo(origen)
+
+def _cabecera_delta(nombre: str) -> dict:
+    with open(os.path.join(BACKUP_DIR, nombre), "rb") as origen:
+        return leer_cabecera(abrir_descifrado(origen, ENCRYPTION_KEY))
+
+def _restaurar_cadena(backup_filename: str):
+    """Restaura el backup completo base y reproduce en orden los incrementales hasta `backup_filename`."""
+    deltas = [backup_filename]
+    cabecera = _cabecera_delta(backup_filename)
+    base = cabecera["base"]
+    while cabecera["anterior"] != base:
+        anterior = cabecera["anterior"]
+        if not os.path.exists(os.path.join(BACKUP_DIR, anterior)):
+            raise HTTPException(status_code=409, detail=f"Falta el backup incremental {anterior} de la cadena")
+        deltas.insert(0, anterior)
+        cabecera = _cabecera_delta(anterior)
+
+    base_path = os.path.join(BACKUP_DIR, base)
+    if not os.path.exists(base_path):
+        raise HTTPException(status_code=409, detail=f"Falta el backup completo base {base}")
+
+    # Toda la cadena se verifica antes de tocar la BD
+    for nombre in [base] + deltas[:-1]:
+        with open(os.path.join(BACKUP_DIR, nombre), "rb") as origen:
+            verificar_flujo(origen, ENCRYPTION_KEY)
+
+    _restaurar_completo(base_path, formato_flujo=True)
+    with engine.begin() as conn:
+        for nombre in deltas:
+            logger.info(f"Aplicando incremental {nombre}")
+            with open(os.path.join(BACKUP_DIR, nombre), "rb") as origen:
+                aplicar_delta(conn, abrir_descifrado(origen, ENCRYPTION_KEY))
+
+def _restaurar_flujo(origen):
+    """pg_restore de un dump custom leído por su entrada estándar (`origen`: objeto de lectura o bytes)."""
+    restore_cmd = ["pg_restore", *_pg_args(), "-d", PG_DB]
+    proc = subprocess.Popen(restore_cmd, stdin=subprocess.PIPE, env=_pg_env())
+    try:
+        if isinstance(origen, bytes):
+            proc.stdin.write(origen)
+        else:
+            shutil.copyfileobj(origen, proc.stdin, TAM_TROZO)
+    except BrokenPipeError:
+        pass  # pg_restore terminó antes de tiempo: su código de salida informa del error
+    finally:
+        proc.stdin.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, restore_cmd)
+
+def _restaurar_directorio(lector):
+    """Extrae el tar descifrado a un directorio temporal y restaura con pg_restore -j N."""
+    trabajo = tempfile.mkdtemp(prefix=".restore_", dir=BACKUP_DIR)
+    try:
+        with tarfile.open(fileobj=lector, mode="r|") as tar:
+            for miembro in tar:
+                destino = os.path.realpath(os.path.join(trabajo, miembro.name))
+                if not destino.startswith(os.path.realpath(trabajo) + os.sep) or not (miembro.isfile() or miembro.isdir()):
+                    raise BackupCorruptoError(f"Entrada no permitida en el backup: {miembro.name}")
+                tar.extract(miembro, trabajo)
+        restore_cmd = ["pg_restore", *_pg_args(), "-d", PG_DB, "-F", "d", "-j", str(_jobs()),
+                       os.path.join(trabajo, "dump")]
+        subprocess.run(restore_cmd, check=True, env=_pg_env())
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
 # Automatización de backups
-async def scheduled_backup():
-    while True:
-        await asyncio.sleep(86400)  # Ejecutar cada 24 horas
-        create_backup("full", "sql")
+def scheduled_backup(backup_type: str):
+    """Backup lanzado por el planificador (en un hilo, solo en el worker líder)."""
+    try:
+        resultado = create_backup(backup_type, "sql")
+        logger.info(f"Backup programado creado: {resultado['backup_file']}")
+    except HTTPException as e:
+        if backup_type == "incremental" and e.status_code == 409:
+            # Sin cadena activa (p. ej. tras una restauración): se empieza con un completo
+            logger.info("Sin backup base para el incremental; se crea uno completo")
+            scheduled_backup("full")
+        else:
+            logger.error(f"Error en el backup programado: {e.detail}")
 
-@router.on_event("startup")
-async def startup_event():
-    asyncio.create_task(scheduled_backup())
+planificador.registrar("backup_completo", settings.backup_cron, scheduled_backup, "full")
+planificador.registrar("backup_incremental", settings.backup_incremental_cron, scheduled_backup, "incremental")
 
 # Subir backup a AWS S3
+@lru_cache(maxsize=1)
+def _cliente_s3():
+    import boto3  # Carga diferida: solo se usa al subir a S3
+
+    # Un único cliente por proceso (es thread-safe y reutiliza conexiones)
+    return boto3.client("s3", endpoint_url=settings.s3_endpoint_url or None)
+
+def _config_transferencia():
+    from boto3.s3.transfer import TransferConfig
+
+    tam_parte = settings.s3_tam_parte_mb * 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=tam_parte,
+        multipart_chunksize=tam_parte,
+        max_concurrency=settings.s3_concurrencia,
+        use_threads=True,
+    )
+
+def _sha256_archivo(file_path: str) -> bytes:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for bloque in iter(lambda: f.read(TAM_TROZO), b""):
+            h.update(bloque)
+    return h.digest()
+
+def _checksum_s3(file_path: str, config) -> str:
+    """
+    ChecksumSHA256 que S3 da al objeto: el SHA-256 del fichero si se sube en una
+    sola petición; si va por partes, el SHA-256 de los SHA-256 de cada parte
+    seguido de "-<número de partes>" (checksum compuesto).
+    """
+    from s3transfer.utils import ChunksizeAdjuster
+
+    tamano = os.path.getsize(file_path)
+    if tamano < config.multipart_threshold:
+        return base64.b64encode(_sha256_archivo(file_path)).decode()
+
+    # Mismo tamaño de parte que usará s3transfer (mínimo 5 MiB, máximo 10.000 partes)
+    tam_parte = ChunksizeAdjuster().adjust_chunksize(config.multipart_chunksize, tamano)
+    partes = []
+    with open(file_path, "rb") as f:
+        for _ in range(math.ceil(tamano / tam_parte)):
+            h = hashlib.sha256()
+            restante = tam_parte
+            while restante:
+                bloque = f.read(min(TAM_TROZO, restante))
+                if not bloque:
+                    break
+                h.update(bloque)
+                restante -= len(bloque)
+            partes.append(h.digest())
+    return f"{base64.b64encode(hashlib.sha256(b''.join(partes)).digest()).decode()}-{len(partes)}"
+
 def upload_to_s3(file_path, bucket_name, object_name):
+    """
+    Sube un backup a S3 en partes paralelas. S3 valida el SHA-256 de cada parte
+    (ChecksumAlgorithm) y al terminar se compara el ChecksumSHA256 que S3 da del
+    objeto con el calculado en local. Se ejecuta en segundo plano: el resultado
+    queda en el log.
+    """
     try:
-        s3 = boto3.client('s3')
-        s3.upload_file(file_path, bucket_name, object_name)
+        config = _config_transferencia()
+        esperado = _checksum_s3(file_path, config)
+        s3 = _cliente_s3()
+        s3.upload_file(
+            file_path, bucket_name, object_name,
+            ExtraArgs={"ChecksumAlgorithm": "SHA256"},
+            Config=config,
+        )
+
+        remoto = s3.head_object(Bucket=bucket_name, Key=object_name, ChecksumMode="ENABLED")
+        if remoto["ContentLength"] != os.path.getsize(file_path):
+            raise RuntimeError("El objeto subido no tiene el tamaño del backup local")
+        checksum = remoto.get("ChecksumSHA256")
+        if checksum is None:
+            # Algunos servicios compatibles con S3 no guardan checksums adicionales
+            logger.warning(f"S3 no devuelve ChecksumSHA256 de {object_name}: solo se ha comprobado el tamaño")
+        elif checksum != esperado:
+            raise RuntimeError(f"El checksum del objeto subido ({checksum}) no coincide con el local ({esperado})")
+        logger.info(f"Backup {object_name} subido a s3://{bucket_name} (sha256 {esperado})")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al subir a S3: {str(e)}")
+        logger.error(f"Error al subir {object_name} a S3: {str(e)}")
 
 @router.post("/backup/upload")
-def upload_backup(backup_filename: str, bucket_name: str, Authorize: AuthJWT = Depends()):
+def upload_backup(backup_filename: str, bucket_name: str, background_tasks: BackgroundTasks, Authorize: AuthJWT = Depends()):
     Authorize.jwt_required()
     user_claims = Authorize.get_raw_jwt()
     if user_claims.get("role") != "admin":
@@ -141,8 +473,8 @@ def upload_backup(backup_filename: str, bucket_name: str, Authorize: AuthJWT = D
     if not os.path.exists(backup_path):
         raise HTTPException(status_code=404, detail="Backup no encontrado")
 
-    upload_to_s3(backup_path, bucket_name, backup_filename)
-    return {"message": "Backup subido a S3"}
+    background_tasks.add_task(upload_to_s3, backup_path, bucket_name, backup_filename)
+    return {"message": "Subida a S3 en proceso"}
 
 # Eliminar backup manualmente
 @router.delete("/backup/delete")
@@ -164,7 +496,7 @@ def delete_backup(backup_filename: str, Authorize: AuthJWT = Depends()):
 def list_backups():
     try:
         backups = sorted(
-            os.listdir(BACKUP_DIR),
+            [f for f in os.listdir(BACKUP_DIR) if not f.startswith(".")],
             key=lambda f: os.path.getctime(os.path.join(BACKUP_DIR, f)),
             reverse=True  # Mostrar los más recientes primero
         )
@@ -194,10 +526,28 @@ async def import_backup(file: UploadFile = File(...), Authorize: AuthJWT = Depen
     if user_claims.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Unauthorized action")
 
-    # Guardar el archivo en /backups
-    backup_path = os.path.join(BACKUP_DIR, file.filename)
-    with open(backup_path, "wb") as f:
-        f.write(await file.read())
+    # Guardar el archivo en /backups por trozos, sin cargarlo en memoria
+    nombre = os.path.basename(file.filename or "")
+    if not nombre or nombre.startswith("."):
+        raise HTTPException(status_code=400, detail="Nombre de archivo no válido")
+    backup_path = os.path.join(BACKUP_DIR, nombre)
+    tmp_path = os.path.join(BACKUP_DIR, f".{nombre}.part")
+    limite = settings.backup_max_subida_mb * 1024 * 1024
+    recibidos = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                bloque = await file.read(TAM_TROZO)
+                if not bloque:
+                    break
+                recibidos += len(bloque)
+                if recibidos > limite:
+                    raise HTTPException(status_code=413, detail=f"El backup supera el máximo de {settings.backup_max_subida_mb} MB")
+                await run_in_threadpool(f.write, bloque)
+        os.replace(tmp_path, backup_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-    # Restaurar backup usando la lógica existente
-    return restore_backup(file.filename)
\ No newline at end of file
+    # Restaurar backup usando la lógica existente (fuera del bucle de eventos)
+    return await run_in_threadpool(restore_backup, nombre)
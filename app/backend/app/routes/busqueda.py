@@ -0,0 +1,132 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_jwt_auth import AuthJWT
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+import re
+
+from app.database import get_db
+
+router = APIRouter()
+
+# Vectores de búsqueda por tabla. Deben coincidir con los índices GIN de
+# models.py (indice_busqueda) y de la migración 0003 para que la búsqueda sea indexada.
+VECTORES = {
+    "gato": "setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(g.nombre, '') || ' ' || coalesce(g.codigo_identificacion, ''))), 'A')"
+            " || setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(g.raza, ''))), 'B')",
+    "colonia": "setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(c.nombre, ''))), 'A')"
+               " || setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(c.ubicacion, ''))), 'B')",
+    "queja": "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(q.descripcion, '')))",
+    "inspeccion": "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(i.observaciones, '')))",
+}
+TIPOS = tuple(VECTORES)
+MAX_TERMINOS = 10
+
+_COINCIDENCIAS = f"""
+    WITH consulta AS (SELECT to_tsquery('spanish'::regconfig, f_unaccent(:consulta)) AS tsq),
+    r AS (
+        SELECT 'gato' AS tipo, g.id, g.nombre AS titulo, coalesce(g.codigo_identificacion, g.raza) AS detalle,
+               g.colonia_id, ts_rank({VECTORES["gato"]}, tsq) AS rank
+        FROM gatos g, consulta
+        WHERE ({VECTORES["gato"]}) @@ tsq AND (:incluir_inactivos OR g.activo)
+        UNION ALL
+        SELECT 'colonia', c.id, c.nombre, c.ubicacion, c.id, ts_rank({VECTORES["colonia"]}, tsq)
+        FROM colonias c, consulta
+        WHERE ({VECTORES["colonia"]}) @@ tsq
+        UNION ALL
+        SELECT 'queja', q.id, left(q.descripcion, 120), q.estatus, q.colonia_id, ts_rank({VECTORES["queja"]}, tsq)
+        FROM quejas q, consulta
+        WHERE ({VECTORES["queja"]}) @@ tsq
+        UNION ALL
+        SELECT 'inspeccion', i.id, left(i.observaciones, 120), i.estatus, i.colonia_id, ts_rank({VECTORES["inspeccion"]}, tsq)
+        FROM inspecciones i, consulta
+        WHERE ({VECTORES["inspeccion"]}) @@ tsq
+    )
+"""
+_FILTRO_TIPO = "tipo = ANY(:tipos)"
+_FILTRO_COLONIA = "(CAST(:colonia_id AS integer) IS NULL OR colonia_id = :colonia_id)"
+
+# Página de resultados con ambos filtros aplicados
+SQL_RESULTADOS = text(_COINCIDENCIAS + f"""
+    SELECT tipo, id, titulo, detalle, colonia_id, rank
+    FROM r
+    WHERE {_FILTRO_TIPO} AND {_FILTRO_COLONIA}
+    ORDER BY rank DESC, tipo, id
+    LIMIT :limit OFFSET :skip
+""")
+
+# Facetas: cada una cuenta aplicando solo el filtro de la otra dimensión
+SQL_FACETAS = text(_COINCIDENCIAS + f"""
+    SELECT tipo, colonia_id, GROUPING(tipo) AS por_colonia,
+           count(*) FILTER (WHERE {_FILTRO_COLONIA}) AS n_tipo,
+           count(*) FILTER (WHERE {_FILTRO_TIPO}) AS n_colonia
+    FROM r
+    GROUP BY GROUPING SETS ((tipo), (colonia_id))
+""")
+
+
+class ResultadoBusqueda(BaseModel):
+    tipo: str
+    id: int
+    titulo: Optional[str] = None
+    detalle: Optional[str] = None
+    colonia_id: Optional[int] = None
+    rank: float
+
+
+class RespuestaBusqueda(BaseModel):
+    total: int
+    resultados: List[ResultadoBusqueda]
+    facetas_tipo: Dict[str, int]
+    facetas_colonia: Dict[int, int]
+
+
+def construir_tsquery(q: str) -> str:
+    """'gato negr' -> 'gato:* & negr:*' (cada término como prefijo, todos obligatorios)."""
+    terminos = re.findall(r"\w+", q)[:MAX_TERMINOS]
+    if not terminos:
+        raise HTTPException(status_code=400, detail="La búsqueda no contiene términos válidos")
+    return " & ".join(f"{t}:*" for t in terminos)
+
+
+@router.get("/busqueda/", response_model=RespuestaBusqueda)
+def buscar(
+    q: str = Query(..., min_length=1, max_length=200),
+    tipos: List[str] = Query(list(TIPOS)),
+    colonia_id: Optional[int] = None,
+    incluir_inactivos: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    Authorize: AuthJWT = Depends(),
+):
+    Authorize.jwt_required()
+    invalidos = set(tipos) - set(TIPOS)
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Tipos no válidos: {', '.join(sorted(invalidos))}")
+
+    params = {
+        "consulta": construir_tsquery(q),
+        "tipos": tipos,
+        "colonia_id": colonia_id,
+        "incluir_inactivos": incluir_inactivos,
+        "skip": skip,
+        "limit": limit,
+    }
+    filas = db.execute(SQL_RESULTADOS, params).mappings().all()
+
+    facetas_tipo, facetas_colonia = {}, {}
+    for f in db.execute(SQL_FACETAS, params).mappings():
+        if f["por_colonia"]:
+            if f["colonia_id"] is not None and f["n_colonia"]:
+                facetas_colonia[f["colonia_id"]] = f["n_colonia"]
+        elif f["n_tipo"]:
+            facetas_tipo[f["tipo"]] = f["n_tipo"]
+
+    return RespuestaBusqueda(
+        total=sum(n for t, n in facetas_tipo.items() if t in tipos),
+        resultados=[ResultadoBusqueda(**f) for f in filas],
+        facetas_tipo=facetas_tipo,
+        facetas_colonia=facetas_colonia,
+    )
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_jwt_auth import AuthJWT
+from pydantic import BaseModel
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import RegistroCambio
+
+router = APIRouter()
+
+
+class CambioResponse(BaseModel):
+    id: int
+    tabla: str
+    pk: str
+    op: str
+    campos: Optional[List[str]] = None
+    usuario_id: Optional[int] = None
+    fecha: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class FeedCambios(BaseModel):
+    cambios: List[CambioResponse]
+    siguiente: Optional[str] = None  # valor de since para la siguiente llamada
+    hay_mas: bool
+
+
+def _leer_cursor(since: Optional[str]):
+    if not since:
+        return None
+    try:
+        transaccion, id_ = since.split(".")
+        return int(transaccion), int(id_)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor since no válido")
+
+
+@router.get("/changes", response_model=FeedCambios)
+def listar_cambios(
+    since: Optional[str] = Query(None, description="Cursor devuelto en `siguiente` (vacío = desde el principio)"),
+    tabla: Optional[List[str]] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    Authorize: AuthJWT = Depends(),
+):
+    """Cambios posteriores al cursor, en orden de transacción (ver utils/cambios.py)."""
+    Authorize.jwt_required()
+    if Authorize.get_raw_jwt().get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized action")
+
+    cursor = _leer_cursor(since)
+    # Solo transacciones ya terminadas: ninguna en curso puede acabar por detrás del cursor
+    horizonte = func.txid_snapshot_xmin(func.txid_current_snapshot())
+    consulta = select(RegistroCambio).where(RegistroCambio.transaccion < horizonte)
+    if cursor:
+        consulta = consulta.where(tuple_(RegistroCambio.transaccion, RegistroCambio.id) > tuple_(*cursor))
+    if tabla:
+        consulta = consulta.where(RegistroCambio.tabla.in_(tabla))
+    filas = db.execute(
+        consulta.order_by(RegistroCambio.transaccion, RegistroCambio.id).limit(limit + 1)
+    ).scalars().all()
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    return {
+        "cambios": filas,
+        "siguiente": f"{filas[-1].transaccion}.{filas[-1].id}" if filas else since,
+        "hay_mas": hay_mas,
+    }
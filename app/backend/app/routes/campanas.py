@@ -1,45 +1,90 @@
 # routes/campanas.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Campana, Gato
+from app.database import SessionLocal, get_db
+from app.models import Campana, Gato, campanas_gatos
 from typing import List
 from pydantic import BaseModel
 from fastapi_jwt_auth import AuthJWT
-from app.schemas import CampanaCreate, CampanaUpdate, CampanaResponse, GatoResponse
+from app.schemas import CampanaCreate, CampanaUpdate, CampanaResponse, GatoResponse, IdsLote, ResultadoItemLote, ResultadoLote
+from sqlalchemy import case, func, literal, or_, select, update
+from app.settings import settings
+from app.utils.cambios import registrar_cambios
+from app.utils.condicional import Condicional
+from app.utils.logger import get_logger
+from app.utils.scheduler import planificador
+from sqlalchemy.dialects.postgresql import insert
 from datetime import date
 
 router = APIRouter()
+logger = get_logger("campanas")
 
 from datetime import datetime, date
 
+def _como_fecha(valor):
+    """datetime, date o 'YYYY-MM-DD' (como llega de CampanaCreate) -> date."""
+    if valor is None or isinstance(valor, date) and not isinstance(valor, datetime):
+        return valor
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    return valor.date()
+
 def actualizar_estatus_campana(campana: Campana):
     """
     Función para actualizar el estatus de la campaña en base a las fechas.
+    Solo se usa al escribir; en las lecturas el estatus se calcula en SQL (ESTATUS_SQL).
     """
     hoy = date.today()
-
-    # Convertir fechas de la campaña a `date` si son `datetime`
-    fecha_inicio = campana.fecha_inicio.date() if isinstance(campana.fecha_inicio, datetime) else campana.fecha_inicio
-    fecha_fin = campana.fecha_fin.date() if isinstance(campana.fecha_fin, datetime) else campana.fecha_fin
+    fecha_inicio = _como_fecha(campana.fecha_inicio)
+    fecha_fin = _como_fecha(campana.fecha_fin)
 
     if fecha_inicio > hoy:
         campana.estatus = "planeada"
-    elif fecha_inicio <= hoy <= fecha_fin:
+    elif fecha_fin is None or hoy <= fecha_fin:  # Sin fecha de fin: sigue abierta
         campana.estatus = "en progreso"
     else:
         campana.estatus = "completada"
 
-@router.get("/campanas/", response_model=List[CampanaResponse])
-def listar_campanas(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    campanas = db.query(Campana).offset(skip).limit(limit).all()
+# Mismo criterio que actualizar_estatus_campana, evaluado por PostgreSQL
+ESTATUS_SQL = case(
+    (func.date(Campana.fecha_inicio) > func.current_date(), "planeada"),
+    (or_(Campana.fecha_fin.is_(None), func.date(Campana.fecha_fin) >= func.current_date()), "en progreso"),
+    else_="completada",
+)
+
+def actualizar_estatus_campanas():
+    """Tarea diaria: un único UPDATE que solo toca las campañas que cambian de estatus."""
+    tabla = Campana.__table__
+    db = SessionLocal()
+    try:
+        cambiadas = db.execute(
+            update(tabla).where(tabla.c.estatus.is_distinct_from(ESTATUS_SQL)).values(estatus=ESTATUS_SQL)
+            .returning(tabla.c.id)
+        ).scalars().all()
+        registrar_cambios(db, "campanas", cambiadas, "update", ["estatus"])
+        db.commit()
+        logger.info(f"Estatus de campañas actualizado ({len(cambiadas)} cambios)")
+    finally:
+        db.close()
 
-    # Actualizamos el estatus de cada campaña antes de devolver la respuesta
-    for campana in campanas:
-        actualizar_estatus_campana(campana)
+planificador.registrar("estatus_campanas", settings.campanas_estatus_cron, actualizar_estatus_campanas)
 
-    db.commit()
-    return campanas
+@router.get("/campanas/", response_model=List[CampanaResponse])
+def listar_campanas(
+    skip: int = 0,
+    limit: int = 10,
+    db: Session = Depends(get_db),
+    cache: dict = Depends(Condicional("campanas", por_dia=True)),  # el estatus cambia con la fecha
+):
+    # Lectura pura: el estatus se deriva de las fechas en la propia consulta
+    columnas = [c for c in Campana.__table__.columns if c.name != "estatus"]
+    return (
+        db.query(*columnas, ESTATUS_SQL.label("estatus"))
+        .order_by(Campana.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 @router.post("/campanas/", response_model=CampanaResponse)
 def crear_campana(campana: CampanaCreate, db: Session = Depends(get_db)):
@@ -83,6 +128,30 @@ def get_gatos_por_campana(
     return gatos
 
 
+@router.post("/campanas/{campana_id}/asociar-gatos", response_model=ResultadoLote)
+def asociar_gatos_a_campana(campana_id: int, lote: IdsLote, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    """Inscribe muchos gatos en una campaña con un único INSERT ... SELECT ... ON CONFLICT DO NOTHING."""
+    Authorize.jwt_required()
+    if not db.query(Campana.id).filter(Campana.id == campana_id).first():
+        raise HTTPException(status_code=404, detail="Campana no encontrada")
+
+    existentes = set(db.execute(select(Gato.id).where(Gato.id.in_(lote.ids))).scalars())
+    asociados = set(db.execute(
+        insert(campanas_gatos)
+        .from_select(["campana_id", "gato_id"], select(literal(campana_id), Gato.id).where(Gato.id.in_(lote.ids)))
+        .on_conflict_do_nothing()
+        .returning(campanas_gatos.c.gato_id)
+    ).scalars())
+    registrar_cambios(db, "campanas_gatos", [(campana_id, gato_id) for gato_id in asociados], "insert")
+    db.commit()
+
+    def estado(gato_id):
+        if gato_id not in existentes:
+            return "no_encontrado"
+        return "asociado" if gato_id in asociados else "ya_asociado"
+
+    return ResultadoLote.de([ResultadoItemLote(id=i, estado=estado(i)) for i in lote.ids])
+
 @router.post("/campanas/{campana_id}/asociar-gato/{gato_id}")
 def asociar_gato_a_campana(campana_id: int, gato_id: int, db: Session = Depends(get_db)):
     # Verificar si la campaña existe
@@ -1,13 +1,12 @@
 # routes/colonias.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Colonia, Gato, User
 from typing import List, Dict, Optional
 from pydantic import BaseModel
-from sqlalchemy import func  # Para contar gatos
+from sqlalchemy import func, select  # Para contar gatos
 from fastapi_jwt_auth import AuthJWT
-import requests
 import os
 from math import radians, cos, sin, asin, sqrt
 from app.utils.utils import enviar_correo
@@ -15,6 +14,12 @@ from urllib.parse import quote
 from fastapi_jwt_auth import AuthJWT
 from app.routes.usage_limits import verificar_limite_colonias
 from app.settings import settings
+from app.utils.cambios import registrar_cambios
+from app.utils.condicional import Condicional
+from app.utils.proyecciones import respuesta_proyeccion, seleccionar_campos
+from app.models import usuarios_colonias
+from app.schemas import AsignacionesLote, ResultadoAsignacion, ResultadoAsignaciones
+from sqlalchemy.dialects.postgresql import insert
 
 class ColoniaCreate(BaseModel):
     nombre: str
@@ -83,6 +88,8 @@ MUNICIPIO_AUTORIZADO = (
 # Geocodificación directa
 def geocode_address(address: str):
     """Convierte una dirección en coordenadas usando OpenStreetMap Nominatim."""
+    import requests  # Carga diferida: solo se usa al crear colonias sin coordenadas
+
     full_address = f"{address}, {settings.municipio_nombre}, {settings.municipio_provincia}"
     encoded_address = quote(full_address)
 
@@ -119,8 +126,25 @@ def validar_municipio_autorizado(lat, lon, municipio):
     distancia = haversine_distance(lat, lon, municipio["lat"], municipio["lon"])
     return distancia <= municipio["radio_km"]
 
+# Campos que admite ?fields= (numero_gatos solo se cuenta si se pide)
+CAMPOS_COLONIA = {
+    **{c.name: c for c in Colonia.__table__.columns if c.name not in ("numero_gatos", "updated_at")},
+    "numero_gatos": select(func.count(Gato.id)).where(Gato.colonia_id == Colonia.id).scalar_subquery(),
+}
+
 @router.get("/colonias/", response_model=List[ColoniaResponse])
-def listar_colonias(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+def listar_colonias(
+    skip: int = 0,
+    limit: int = 10,
+    fields: Optional[str] = Query(None, description="Campos separados por comas (p. ej. id,nombre)"),
+    db: Session = Depends(get_db),
+    cache: dict = Depends(Condicional("colonias", "gatos")),  # 304 si no ha cambiado
+):
+    campos = seleccionar_campos(fields, CAMPOS_COLONIA)
+    if campos:
+        filas = db.query(*campos).select_from(Colonia).order_by(Colonia.id).offset(skip).limit(limit).all()
+        return respuesta_proyeccion(filas, cabeceras=cache)
+
     # Consulta para obtener las colonias junto con el número de gatos asociados
     colonias = db.query(
         Colonia.id,
@@ -303,6 +327,39 @@ def asignar_usuario_colonia(asignacion: AsignarUsuarioColonia, db: Session = Dep
     
     return {"mensaje": "Usuario asignado a colonia correctamente"}
 
+@router.post("/asignar_usuarios/", response_model=ResultadoAsignaciones)
+def asignar_usuarios_colonias(lote: AsignacionesLote, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    """Asigna muchos usuarios a colonias en un único INSERT ... ON CONFLICT DO NOTHING."""
+    Authorize.jwt_required()
+    if Authorize.get_raw_jwt().get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized action")
+
+    pares = list(dict.fromkeys((a.user_id, a.colonia_id) for a in lote.asignaciones))
+    usuarios = set(db.execute(select(User.id).where(User.id.in_({u for u, _ in pares}))).scalars())
+    colonias = set(db.execute(select(Colonia.id).where(Colonia.id.in_({c for _, c in pares}))).scalars())
+    validos = [(u, c) for u, c in pares if u in usuarios and c in colonias]
+
+    asignados = set()
+    if validos:
+        asignados = {tuple(fila) for fila in db.execute(
+            insert(usuarios_colonias)
+            .values([{"user_id": u, "colonia_id": c} for u, c in validos])
+            .on_conflict_do_nothing()
+            .returning(usuarios_colonias.c.user_id, usuarios_colonias.c.colonia_id)
+        )}
+        registrar_cambios(db, "usuarios_colonias", asignados, "insert")
+        db.commit()
+
+    resultados = []
+    for u, c in pares:
+        if u not in usuarios:
+            resultados.append(ResultadoAsignacion(user_id=u, colonia_id=c, estado="no_encontrado", detalle="Usuario no encontrado"))
+        elif c not in colonias:
+            resultados.append(ResultadoAsignacion(user_id=u, colonia_id=c, estado="no_encontrado", detalle="Colonia no encontrada"))
+        else:
+            resultados.append(ResultadoAsignacion(user_id=u, colonia_id=c, estado="asignado" if (u, c) in asignados else "ya_asignado"))
+    return ResultadoAsignaciones.de(resultados)
+
 @router.get("/asignaciones/", tags=["Usuarios"])
 def obtener_asignaciones(db: Session = Depends(get_db)):
     asignados = db.query(User).filter(User.role.in_(["voluntario", "usuario"])).all()
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi_jwt_auth import AuthJWT
+from starlette.concurrency import run_in_threadpool
+import redis
+
+from app.database import SessionLocal
+from app.models import User, usuarios_colonias
+from app.utils.eventos import CANAL_GLOBAL, canal_colonia, canal_usuario, escuchar, suscribir
+from app.utils.logger import get_logger
+
+router = APIRouter()
+logger = get_logger("eventos")
+
+# Ven los eventos de todas las colonias
+ROLES_GLOBALES = {"admin", "responsable"}
+
+
+def _canales(usuario_id: int) -> list:
+    # Sesión corta: la conexión SSE puede durar horas y no debe retener una conexión del pool
+    db = SessionLocal()
+    try:
+        usuario = db.query(User.id, User.role).filter(User.id == usuario_id).first()
+        if not usuario:
+            raise HTTPException(status_code=401, detail="Usuario no encontrado")
+        if usuario.role in ROLES_GLOBALES:
+            return [CANAL_GLOBAL]
+        colonias = db.query(usuarios_colonias.c.colonia_id).filter(usuarios_colonias.c.user_id == usuario_id).all()
+        return [canal_usuario(usuario_id)] + [canal_colonia(c.colonia_id) for c in colonias]
+    finally:
+        db.close()
+
+
+async def _sse(cliente, pubsub):
+    yield "retry: 5000\n\n"
+    async for evento in escuchar(cliente, pubsub):
+        if evento is None:
+            yield ": keepalive\n\n"
+        else:
+            yield f"data: {evento}\n\n"
+
+
+@router.get("/eventos/stream")
+async def stream_eventos(
+    token: str = Query(..., description="Access token (EventSource no permite enviar cabeceras)"),
+    Authorize: AuthJWT = Depends(),
+):
+    """
+    Server-Sent Events con las quejas, inspecciones y partes creados o resueltos
+    en las colonias del usuario (todas para admin/responsable). Los canales se
+    fijan al conectar: si cambian sus colonias, el cliente se reconecta.
+    """
+    Authorize.jwt_required("websocket", token=token)
+    usuario_id = int(Authorize.get_raw_jwt(token)["sub"])
+    canales = await run_in_threadpool(_canales, usuario_id)
+    try:
+        cliente, pubsub = await suscribir(canales)
+    except (redis.RedisError, OSError) as e:
+        logger.warning(f"Eventos no disponibles: {e}")
+        raise HTTPException(status_code=503, detail="Eventos en tiempo real no disponibles")
+
+    return StreamingResponse(
+        _sse(cliente, pubsub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # sin buffer en nginx
+    )
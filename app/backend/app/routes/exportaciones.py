@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi_jwt_auth import AuthJWT
+from sqlalchemy import select
+from datetime import date
+
+from app.models import Campana, Colonia, Gato, Queja, campanas_gatos
+from app.utils.exportacion import FORMATOS
+
+router = APIRouter()
+
+# Tablas exportables para análisis externo (pandas, DuckDB, R...)
+ENTIDADES = {
+    "gatos": Gato.__table__,
+    "colonias": Colonia.__table__,
+    "campanas": Campana.__table__,
+    "campanas_gatos": campanas_gatos,
+    "quejas": Queja.__table__,
+}
+
+
+@router.get("/exportaciones/{entidad}")
+def exportar(
+    entidad: str,
+    formato: str = Query("parquet", description="parquet, arrow o csv"),
+    Authorize: AuthJWT = Depends(),
+):
+    Authorize.jwt_required()
+    if Authorize.get_raw_jwt().get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized action")
+    if entidad not in ENTIDADES:
+        raise HTTPException(status_code=404, detail=f"Entidad no exportable. Opciones: {', '.join(ENTIDADES)}")
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"formato debe ser uno de: {', '.join(FORMATOS)}")
+
+    tabla = ENTIDADES[entidad]
+    consulta = select(tabla).order_by(*tabla.primary_key.columns)
+    generar, media_type, extension = FORMATOS[formato]
+    nombre = f"{entidad}_{date.today().isoformat()}.{extension}"
+    # El generador abre su propia conexión con cursor de servidor: no depende de la sesión de la petición
+    return StreamingResponse(
+        generar(consulta),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
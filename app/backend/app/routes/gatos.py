@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Query
+from collections import Counter, defaultdict
+from sqlalchemy import Integer, cast, column, select, update, values
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from fastapi.responses import StreamingResponse
 from fastapi_jwt_auth import AuthJWT
 from app.database import get_db
-from app.models import Gato, Colonia, Campana, User
-from app.schemas import GatoCreate, GatoResponse, GatoUpdate
+from app.models import Gato, Colonia, Campana, LoteImportacion, PerfilImportacion, User
+from app.schemas import (
+    GatoCreate, GatoResponse, GatoUpdate, MicrochipLote, MicrochipLoteResponse,
+    GatosLoteUpdate, IdsLote, ResultadoItemLote, ResultadoLote,
+)
+from app.utils.cambios import registrar_cambios
+from app.utils.campanas import asociar_por_esterilizacion
+from app.utils.condicional import Condicional
+from app.utils.exportacion import leer_por_lotes
+from app.utils.filtros import FiltrosGatos
+from app.utils.logger import get_logger
+from app.utils.microchip import normalizar_chip, es_chip_valido
+from app.utils.proyecciones import respuesta_proyeccion, seleccionar_campos
 from app.settings import settings  # Ajusta si es necesario
 from pydantic import BaseSettings
 import os
 import re
-import pandas as pd
 import csv
+import hashlib
 from datetime import datetime
 from io import StringIO
 from app.routes.usage_limits import (verificar_limite_gatos_total,verificar_limite_gatos_por_colonia,)
@@ -19,6 +34,7 @@ from app.routes.usage_limits import (verificar_limite_gatos_total,verificar_limi
 os.makedirs("media", exist_ok=True)
 
 router = APIRouter()
+logger = get_logger("gatos")
 
 @router.post("/gatos/", response_model=GatoResponse, dependencies=[Depends(verificar_limite_gatos_total)])
 async def create_gato(
@@ -61,6 +77,13 @@ async def create_gato(
                 detail=f"Esa colonia ya tiene el máximo de {settings.max_gatos_por_colonia} gatos.",
             )
 
+    # Microchip en forma normalizada (solo dígitos) y sin duplicados
+    codigo_identificacion = normalizar_chip(codigo_identificacion)
+    if codigo_identificacion is not None:
+        if not es_chip_valido(codigo_identificacion):
+            raise HTTPException(status_code=400, detail="El código de identificación debe contener exactamente 15 dígitos.")
+        verificar_chip_libre(db, codigo_identificacion)
+
     # Procesar la imagen si se proporciona
     image_path = None
     if file:
@@ -98,6 +121,9 @@ async def create_gato(
     )
 
     db.add(db_gato)
+    if fecha_esterilizacion:
+        db.flush()
+        asociar_por_esterilizacion(db, {db_gato.id: fecha_esterilizacion})
     db.commit()
     db.refresh(db_gato)
 
@@ -110,18 +136,29 @@ async def create_gato(
             
     return GatoResponse.from_orm(db_gato)
 
+# Campos que admite ?fields= en los listados de gatos
+CAMPOS_GATO = {
+    **{c.name: c for c in Gato.__table__.columns if c.name != "updated_at"},
+    "colonia_nombre": select(Colonia.nombre).where(Colonia.id == Gato.colonia_id).scalar_subquery(),
+}
+DESCRIPCION_FIELDS = "Campos separados por comas (p. ej. id,nombre,imagen): solo se leen esas columnas"
+
 @router.get("/gatos/", response_model=List[GatoResponse])
 def get_gatos(
     skip: int = 0,
     limit: int = 10,
-    incluir_inactivos: bool = False,  # Parámetro para incluir gatos inactivos
+    filtros: FiltrosGatos = Depends(),  # colonia(s), sexo, fechas, orden... (incluye incluir_inactivos)
+    fields: Optional[str] = Query(None, description=DESCRIPCION_FIELDS),
     db: Session = Depends(get_db),
     Authorize: AuthJWT = Depends(),
 ):
     Authorize.jwt_required()
-    query = db.query(Gato)
-    if not incluir_inactivos:
-        query = query.filter(Gato.activo == True)
+    campos = seleccionar_campos(fields, CAMPOS_GATO)
+    if campos:
+        query = filtros.aplicar(db.query(*campos).select_from(Gato))
+        return respuesta_proyeccion(query.offset(skip).limit(limit).all())
+
+    query = filtros.aplicar(db.query(Gato))
     gatos = query.offset(skip).limit(limit).all()
     return gatos
 
@@ -129,12 +166,15 @@ def get_gatos(
 def get_gatos_filtrados(
     skip: int = 0,
     limit: int = 10,
-    incluir_inactivos: bool = False,
+    filtros: FiltrosGatos = Depends(),
+    fields: Optional[str] = Query(None, description=DESCRIPCION_FIELDS),
     db: Session = Depends(get_db),
     Authorize: AuthJWT = Depends(),
+    cache: dict = Depends(Condicional("gatos", "colonias", "usuarios_colonias", por_usuario=True)),
 ):
     Authorize.jwt_required()
     current_user_id = Authorize.get_jwt_subject()
+    campos = seleccionar_campos(fields, CAMPOS_GATO)
 
     from app.models import User  # Asegúrate de tener este import
     user = db.query(User).filter(User.id == current_user_id).first()
@@ -146,10 +186,16 @@ def get_gatos_filtrados(
     if not colonias_ids:
         return []
 
-    # Filtrar por colonias
-    query = db.query(Gato).filter(Gato.colonia_id.in_(colonias_ids))
-    if not incluir_inactivos:
-        query = query.filter(Gato.activo == True)
+    # Filtrar por colonias (si se piden colonias concretas, solo las del usuario)
+    if filtros.colonia_id:
+        colonias_ids = [c for c in colonias_ids if c in filtros.colonia_id]
+        if not colonias_ids:
+            return []
+    if campos:
+        query = filtros.aplicar(db.query(*campos).select_from(Gato).filter(Gato.colonia_id.in_(colonias_ids)))
+        return respuesta_proyeccion(query.offset(skip).limit(limit).all(), cabeceras=cache)
+
+    query = filtros.aplicar(db.query(Gato).filter(Gato.colonia_id.in_(colonias_ids)))
 
     gatos = query.offset(skip).limit(limit).all()
 
@@ -181,6 +227,231 @@ def get_gatos_filtrados(
 
     return response
 
+# Exportación en el formato de importar-csv: 3 líneas de cabecera libre, ';' y
+# fechas dd/mm/YYYY. Las 7 primeras columnas (hasta Fe.Esterilización) son las
+# que lee el importador (COLUMNAS_CENSO); el resto son informativas y las ignora.
+COLUMNAS_CSV_CENSO = [
+    ("Nombre", Gato.nombre),
+    ("Raza", Gato.raza),
+    ("Sexo", Gato.sexo),
+    ("Fe.Vacunación", Gato.fecha_vacunacion),
+    ("Fe.Desparasitación", Gato.fecha_desparasitacion),
+    ("Código de identificación", Gato.codigo_identificacion),
+    ("Fe.Esterilización", Gato.fecha_esterilizacion),
+    ("Colonia", Colonia.nombre),
+    ("Estado de salud", Gato.estado_salud),
+    ("Adoptabilidad", Gato.adoptabilidad),
+    ("Activo", Gato.activo),
+    ("ID", Gato.id),
+]
+SEXOS_CSV = {"M": "Macho", "H": "Hembra"}
+
+def _valor_csv_censo(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, bool):
+        return "Sí" if valor else "No"
+    return valor
+
+def _csv_censo(consulta):
+    buffer = StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    ancho = len(COLUMNAS_CSV_CENSO)
+    # Cabecera libre rellenada hasta el ancho de la tabla (la detección de formato la salta)
+    for linea in ("Censo de gatos", f"Municipio: {settings.municipio_nombre}",
+                  f"Exportado: {datetime.now().strftime('%d/%m/%Y %H:%M')}"):
+        escritor.writerow([linea] + [""] * (ancho - 1))
+    escritor.writerow([nombre for nombre, _ in COLUMNAS_CSV_CENSO])
+    yield "\ufeff" + buffer.getvalue()  # BOM para Excel; cae en la cabecera libre que el importador salta
+    for lote in leer_por_lotes(consulta):
+        buffer.seek(0)
+        buffer.truncate()
+        for fila in lote:
+            fila = list(fila)
+            fila[2] = SEXOS_CSV.get(fila[2], fila[2])
+            escritor.writerow([_valor_csv_censo(v) for v in fila])
+        yield buffer.getvalue()
+
+@router.get("/gatos/exportar-csv")
+def exportar_gatos_csv(filtros: FiltrosGatos = Depends(), Authorize: AuthJWT = Depends()):
+    """Censo en CSV (mismos filtros y orden que /gatos/), reimportable con /gatos/importar-csv."""
+    Authorize.jwt_required()
+    if Authorize.get_raw_jwt().get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized action")
+
+    consulta = (
+        select(*[columna for _, columna in COLUMNAS_CSV_CENSO])
+        .select_from(Gato)
+        .outerjoin(Colonia, Colonia.id == Gato.colonia_id)
+        .where(*filtros.condiciones())
+        .order_by(*filtros.orden)
+    )
+    nombre = f"censo_gatos_{datetime.now().strftime('%Y%m%d')}.csv"
+    # Cursor de servidor en su propia conexión: los primeros bytes salen antes de leer todo el censo
+    return StreamingResponse(
+        _csv_censo(consulta),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+def verificar_chip_libre(db: Session, codigo: str, gato_id: Optional[int] = None):
+    """409 si otro gato ya tiene ese microchip (consulta sobre el índice único)."""
+    query = db.query(Gato.id).filter(Gato.codigo_identificacion == codigo)
+    if gato_id is not None:
+        query = query.filter(Gato.id != gato_id)
+    if query.first():
+        raise HTTPException(status_code=409, detail=f"Ya existe un gato con el microchip {codigo}")
+
+# Búsqueda por microchip (declaradas antes de /gatos/{gato_id})
+@router.get("/gatos/microchip/", response_model=List[GatoResponse])
+def buscar_por_prefijo_chip(
+    prefijo: str,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    Authorize: AuthJWT = Depends(),
+):
+    Authorize.jwt_required()
+    prefijo = normalizar_chip(prefijo)
+    if not prefijo or len(prefijo) < 4:
+        raise HTTPException(status_code=400, detail="El prefijo debe tener al menos 4 dígitos")
+    # Solo dígitos tras normalizar: sin comodines de LIKE, usa el índice text_pattern_ops
+    return (
+        db.query(Gato)
+        .filter(Gato.codigo_identificacion.like(f"{prefijo}%"))
+        .limit(limit)
+        .all()
+    )
+
+@router.get("/gatos/microchip/{codigo}", response_model=GatoResponse)
+def buscar_por_chip(codigo: str, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    Authorize.jwt_required()
+    codigo = normalizar_chip(codigo)
+    gato = db.query(Gato).filter(Gato.codigo_identificacion == codigo).first() if codigo else None
+    if not gato:
+        raise HTTPException(status_code=404, detail="Microchip no registrado")
+    return gato
+
+@router.post("/gatos/microchip/lote", response_model=MicrochipLoteResponse)
+def buscar_lote_chips(lote: MicrochipLote, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    Authorize.jwt_required()
+    # Se responde con los códigos tal y como llegaron
+    normalizados = {c: normalizar_chip(c) for c in lote.codigos}
+    buscados = {n for n in normalizados.values() if n}
+    gatos = {}
+    if buscados:
+        gatos = {g.codigo_identificacion: g for g in db.query(Gato).filter(Gato.codigo_identificacion.in_(buscados))}
+    return MicrochipLoteResponse(
+        encontrados={c: GatoResponse.from_orm(gatos[n]) for c, n in normalizados.items() if n in gatos},
+        no_encontrados=[c for c, n in normalizados.items() if n not in gatos],
+    )
+
+# --- Operaciones en lote (declaradas antes de /gatos/{gato_id}) ---
+
+def _actualizar_grupo(db, campos: tuple, items: list):
+    """Un UPDATE ... FROM (VALUES ...) para los elementos que envían los mismos `campos`."""
+    tabla = Gato.__table__
+    filas = values(
+        column("id", Integer), *[column(c, tabla.c[c].type) for c in campos], name="v"
+    ).data([(gato_id, *[datos[c] for c in campos]) for gato_id, datos in items])
+    db.execute(
+        update(tabla)
+        .where(tabla.c.id == filas.c.id)
+        .values({c: cast(filas.c[c], tabla.c[c].type) for c in campos})
+    )
+    registrar_cambios(db, "gatos", [gato_id for gato_id, _ in items], "update", list(campos))
+
+@router.put("/gatos/lote", response_model=ResultadoLote)
+def actualizar_gatos_lote(lote: GatosLoteUpdate, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    """
+    Actualiza muchos gatos en una transacción. Los elementos que envían los
+    mismos campos se agrupan en un único UPDATE ... FROM (VALUES ...); si la BD
+    rechaza el grupo, se reintenta elemento a elemento (cada uno en su
+    SAVEPOINT) y solo los que fallan quedan con estado error.
+    """
+    Authorize.jwt_required()
+    ids = [item.id for item in lote.gatos]
+    existentes = set(db.execute(select(Gato.id).where(Gato.id.in_(ids))).scalars())
+    resultados = {i: ResultadoItemLote(id=i, estado="no_encontrado") for i in ids if i not in existentes}
+
+    # Microchips: únicos dentro del lote y frente al resto de gatos
+    chips = {item.id: item.codigo_identificacion for item in lote.gatos
+             if item.id in existentes and item.codigo_identificacion}
+    if chips:
+        repetidos = {c for c, n in Counter(chips.values()).items() if n > 1}
+        ocupados = dict(db.execute(
+            select(Gato.codigo_identificacion, Gato.id).where(Gato.codigo_identificacion.in_(set(chips.values())))
+        ).all())
+        for gato_id, chip in chips.items():
+            if chip in repetidos or ocupados.get(chip, gato_id) != gato_id:
+                resultados[gato_id] = ResultadoItemLote(id=gato_id, estado="error", detalle=f"Microchip {chip} en uso")
+
+    # Colonias: las referenciadas tienen que existir
+    colonias = {item.id: item.colonia_id for item in lote.gatos
+                if item.id in existentes and item.id not in resultados and item.colonia_id is not None}
+    if colonias:
+        validas = set(db.execute(select(Colonia.id).where(Colonia.id.in_(set(colonias.values())))).scalars())
+        for gato_id, colonia_id in colonias.items():
+            if colonia_id not in validas:
+                resultados[gato_id] = ResultadoItemLote(
+                    id=gato_id, estado="error", detalle=f"La colonia {colonia_id} no existe"
+                )
+
+    grupos = defaultdict(list)
+    for item in lote.gatos:
+        if item.id in resultados:
+            continue
+        datos = item.dict(exclude_unset=True, exclude={"id"})
+        if not datos:
+            resultados[item.id] = ResultadoItemLote(id=item.id, estado="sin_cambios")
+            continue
+        grupos[tuple(sorted(datos))].append((item.id, datos))
+
+    actualizados = []
+    for campos, items in grupos.items():
+        try:
+            with db.begin_nested():
+                _actualizar_grupo(db, campos, items)
+            actualizados += items
+            continue
+        except DBAPIError as e:
+            logger.warning(f"Lote de gatos: UPDATE de {list(campos)} rechazado, se reintenta uno a uno: {e.orig}")
+        for item in items:
+            try:
+                with db.begin_nested():
+                    _actualizar_grupo(db, campos, [item])
+                actualizados.append(item)
+            except DBAPIError as e:
+                logger.warning(f"Lote de gatos: gato {item[0]} rechazado: {e.orig}")
+                resultados[item[0]] = ResultadoItemLote(
+                    id=item[0], estado="error", detalle="Los datos no cumplen las restricciones de la base de datos"
+                )
+
+    esterilizados = {}
+    for gato_id, datos in actualizados:
+        resultados[gato_id] = ResultadoItemLote(id=gato_id, estado="actualizado")
+        if datos.get("fecha_esterilizacion"):
+            esterilizados[gato_id] = datetime.strptime(datos["fecha_esterilizacion"], "%Y-%m-%d")
+    asociar_por_esterilizacion(db, esterilizados)
+    db.commit()
+
+    return ResultadoLote.de([resultados[i] for i in ids])
+
+@router.put("/gatos/lote/baja", response_model=ResultadoLote)
+def dar_baja_gatos_lote(lote: IdsLote, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    Authorize.jwt_required()
+    tabla = Gato.__table__
+    dados_de_baja = set(db.execute(
+        update(tabla).where(tabla.c.id.in_(lote.ids)).values(activo=False).returning(tabla.c.id)
+    ).scalars())
+    registrar_cambios(db, "gatos", dados_de_baja, "update", ["activo"])
+    db.commit()
+    return ResultadoLote.de([
+        ResultadoItemLote(id=i, estado="dado_de_baja" if i in dados_de_baja else "no_encontrado")
+        for i in lote.ids
+    ])
+
 @router.put("/gatos/{gato_id}", response_model=GatoResponse)
 def update_gato(gato_id: int, gato: GatoCreate, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
     Authorize.jwt_required()
@@ -190,29 +461,21 @@ def update_gato(gato_id: int, gato: GatoCreate, db: Session = Depends(get_db), A
         raise HTTPException(status_code=404, detail="Gato no encontrado")
 
     update_data = gato.dict(exclude_unset=True)
+    if update_data.get("codigo_identificacion"):
+        verificar_chip_libre(db, update_data["codigo_identificacion"], gato_id)
     fecha_esterilizacion_anterior = db_gato.fecha_esterilizacion
     nueva_fecha_esterilizacion = update_data.get("fecha_esterilizacion")
 
     for key, value in update_data.items():
         setattr(db_gato, key, value)
 
-    db.commit()
-    db.refresh(db_gato)
-
-    # Si la fecha de esterilización cambió, asociar a la campaña correspondiente
+    # Si la fecha de esterilización cambió, asociar a la campaña correspondiente (misma transacción)
     if nueva_fecha_esterilizacion and nueva_fecha_esterilizacion != fecha_esterilizacion_anterior:
-        campana = (
-            db.query(Campana)
-            .filter(Campana.fecha_inicio <= nueva_fecha_esterilizacion)
-            .filter(Campana.fecha_fin >= nueva_fecha_esterilizacion)
-            .order_by(Campana.fecha_inicio.desc())
-            .first()
-        )
+        db.flush()
+        asociar_por_esterilizacion(db, {db_gato.id: nueva_fecha_esterilizacion})
 
-        if campana:
-            if db_gato not in campana.gatos:  # Evitar duplicados
-                campana.gatos.append(db_gato)
-                db.commit()
+    db.commit()
+    db.refresh(db_gato)
 
     # ⚠️ SOLUCIÓN: Retornar la respuesta con todos los campos requeridos por GatoResponse
     return GatoResponse(
@@ -328,24 +591,55 @@ def registrar_gato(gato: GatoCreate, db: Session = Depends(get_db)):
 
 # NUEVO ENDPOINT para importar CSV de gatos
 @router.post("/gatos/importar-csv")
-def importar_gatos_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    if not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser formato CSV")
+def importar_gatos_csv(
+    file: UploadFile = File(...),
+    perfil_id: Optional[int] = Query(None, description="Perfil de importación; sin él se detecta por la cabecera"),
+    db: Session = Depends(get_db),
+    Authorize: AuthJWT = Depends(),
+):
+    # Sobrescribe datos de gatos existentes (upsert por microchip): solo administración
+    Authorize.jwt_required()
+    if Authorize.get_raw_jwt().get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized action")
 
-    MAX_BYTES = 2 * 1024 * 1024  # 2MB máximo
-    raw = file.file.read(MAX_BYTES)
-    contents = raw.decode("utf-8", errors="ignore")
+    # Carga diferida: solo la importación de CSV necesita pandas
+    from app.utils.importacion import (
+        TAM_MUESTRA, detectar_formato, guardar_errores, importar_por_trozos, leer_csv,
+        limpiar_censo, reclamar_lote,
+    )
 
-    # Detectar delimitador automáticamente
-    def detectar_delimitador(sample):
-        try:
-            dialect = csv.Sniffer().sniff(sample)
-            return dialect.delimiter
-        except:
-            return ','
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="El archivo debe ser formato CSV")
 
-    delimiter = detectar_delimitador(contents[:2048])
-    df = pd.read_csv(StringIO(contents), sep=delimiter, skiprows=3)
+    max_bytes = settings.importacion_max_mb * 1024 * 1024
+    raw = file.file.read(max_bytes + 1)
+    if len(raw) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"El CSV supera el máximo de {settings.importacion_max_mb} MB")
+
+    # El mismo fichero es la misma importación: si ya terminó no se repite, si se cortó se reanuda
+    hash_sha256 = hashlib.sha256(raw).hexdigest()
+    previo = db.query(LoteImportacion).filter(LoteImportacion.hash_sha256 == hash_sha256).first()
+    if previo and previo.estado == "completado":
+        return _resumen_importacion(previo, ya_importado=True)
+
+    # Formato del fichero: el del intento anterior, el perfil indicado o el que mejor encaje con la cabecera
+    perfil_id = previo.perfil_id if previo and previo.perfil_id else perfil_id
+    if perfil_id is not None:
+        perfil = db.query(PerfilImportacion).filter(PerfilImportacion.id == perfil_id).first()
+        if not perfil:
+            raise HTTPException(status_code=404, detail="Perfil de importación no encontrado")
+        perfiles = [perfil]
+    else:
+        perfiles = db.query(PerfilImportacion).order_by(PerfilImportacion.id).all()
+    deteccion = detectar_formato(raw[:TAM_MUESTRA], perfiles)
+    if deteccion is None:
+        raise HTTPException(
+            status_code=400,
+            detail="No se reconoce la cabecera del CSV (faltan las columnas de nombre y sexo): crea un perfil de importación",
+        )
+    perfil = deteccion.perfil
+    df = leer_csv(raw, deteccion)
+    pendientes = len(df) - (previo.filas_procesadas if previo else 0)
 
     # ✅ Límites de importación
     # 1) Tamaño máximo del lote CSV
@@ -357,24 +651,22 @@ def importar_gatos_csv(file: UploadFile = File(...), db: Session = Depends(get_d
     # 2) Respeta el límite GLOBAL total
     if settings.max_gatos_total_limit is not None:
         total_gatos_actuales = db.query(Gato).count()
-        if total_gatos_actuales + len(df) > settings.max_gatos_total_limit:
+        if total_gatos_actuales + pendientes > settings.max_gatos_total_limit:
             raise HTTPException(
                 status_code=403,
                 detail=f"La importación superaría el límite global de {settings.max_gatos_total_limit} gatos en esta instancia."
             )
 
-    # Mapear columnas del CSV a campos del modelo
-    columnas_mapeo = {
-        "Nombre": "nombre",
-        "Raza": "raza",
-        "Sexo": "sexo",
-        "Fe.Vacunación": "fecha_vacunacion",
-        "Fe.Desparasitación": "fecha_desparasitacion",
-        "Código de identificación": "codigo_identificacion",
-    }
+    # Limpieza por columnas (utils/importacion.py): campos de Gato + motivo de descarte.
+    # Los chips ya registrados no se descartan: el gato existente se actualiza
+    gatos_csv = limpiar_censo(df, perfil.columnas, perfil.formato_fecha)
 
-    # Crear o recuperar colonia de importación
-    colonia_importada = db.query(Colonia).filter(Colonia.nombre == "Colonia Importada").first()
+    # Colonia destino: la del perfil o la colonia genérica de importación
+    colonia_importada = None
+    if perfil.colonia_id is not None:
+        colonia_importada = db.query(Colonia).filter(Colonia.id == perfil.colonia_id).first()
+    if not colonia_importada:
+        colonia_importada = db.query(Colonia).filter(Colonia.nombre == "Colonia Importada").first()
     if not colonia_importada:
         responsable = db.query(User).first()  # Opcional
         colonia_importada = Colonia(
@@ -387,85 +679,36 @@ def importar_gatos_csv(file: UploadFile = File(...), db: Session = Depends(get_d
         db.commit()
         db.refresh(colonia_importada)
 
-    registros_importados = 0
-    registros_omitidos = 0
-
-    def limpiar_campo(valor):
-        if not isinstance(valor, str):
-            return valor
-        valor = valor.strip()
-        if valor.startswith(("=", "+", "-", "@")):
-            valor = f"'{valor}"
-        return re.sub(r"[<>]", "", valor)
+    lote = reclamar_lote(db, hash_sha256, file.filename, perfil.id)
+    reanudado_desde = lote.filas_procesadas
+    lote.total_filas = len(df)
+    try:
+        importar_por_trozos(db, lote, gatos_csv, colonia_importada.id)
+    except Exception as e:
+        # Lo confirmado hasta el último trozo se queda; subir el mismo fichero continúa desde ahí
+        db.rollback()
+        lote.estado = "fallido"
+        db.commit()
+        print(f"❌ Importación interrumpida en la fila {lote.filas_procesadas}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Importación interrumpida tras {lote.filas_procesadas} filas; vuelve a subir el fichero para continuar",
+        )
 
-    for _, row in df.iterrows():
-        try:
-            print(f"Procesando fila: {row.to_dict()}")
-
-            nombre = limpiar_campo(row.get("Nombre"))
-            sexo_raw = limpiar_campo(row.get("Sexo"))
-            sexo = normalizar_sexo(sexo_raw)
-            codigo_identificacion = limpiar_campo(row.get("Código de identificación"))
-
-            if not nombre or not sexo:
-                registros_omitidos += 1
-                continue
-
-            if codigo_identificacion:
-                gato_existente = db.query(Gato).filter(
-                    Gato.codigo_identificacion == str(codigo_identificacion)
-                ).first()
-                if gato_existente:
-                    print(f"Gato con código {codigo_identificacion} ya existe, se omite.")
-                    registros_omitidos += 1
-                    continue
-
-            fecha_vacunacion = parse_fecha(row.get("Fe.Vacunación"))
-            fecha_esterilizacion = fecha_vacunacion  # Mismo valor
-            fecha_desparasitacion = parse_fecha(row.get("Fe.Desparasitación"))
-
-            gato = Gato(
-                nombre=nombre,
-                raza=row.get("Raza"),
-                sexo=sexo,
-                fecha_esterilizacion=fecha_esterilizacion,
-                fecha_vacunacion=fecha_vacunacion,
-                fecha_desparasitacion=fecha_desparasitacion,
-                codigo_identificacion=codigo_identificacion,
-                imagen="default.png",
-                ubicacion="Importado",
-                colonia_id=colonia_importada.id,
-                activo=True
-            )
-            db.add(gato)
-            db.commit()
-            registros_importados += 1
+    lote.errores = guardar_errores(df, gatos_csv["motivo"], deteccion.delimitador)
+    lote.estado = "completado"
+    db.commit()
+    return _resumen_importacion(lote, perfil=perfil.nombre, reanudado_desde=reanudado_desde or None)
 
-        except Exception as e:
-            db.rollback()
-            print(f"❌ Error en fila: {e}")
-            registros_omitidos += 1
-            continue
 
+def _resumen_importacion(lote: LoteImportacion, **extra):
     return {
-        "detalle": f"{registros_importados} gatos importados correctamente",
-        "omitidos": registros_omitidos
+        "detalle": f"{lote.importados} gatos importados correctamente",
+        "importados": lote.importados,
+        "actualizados": lote.actualizados,
+        "omitidos": lote.omitidos,
+        "lote_id": lote.id,
+        # CSV con las filas descartadas y el motivo (routes/importaciones.py)
+        "errores_url": f"/api/importaciones/importaciones/errores/{lote.errores}" if lote.errores else None,
+        **extra,
     }
-
-
-def parse_fecha(valor):
-    try:
-        return pd.to_datetime(valor, dayfirst=True)
-    except:
-        return None
-
-def normalizar_sexo(valor):
-    if not valor:
-        return None
-    valor = valor.strip().lower()
-    if valor in ["macho", "m", "male", "varón"]:
-        return "M"
-    elif valor in ["hembra", "h", "female", "mujer"]:
-        return "H"
-    return None
-
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi.responses import FileResponse
+from fastapi_jwt_auth import AuthJWT
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List
+import os
+import re
+
+from app.database import get_db
+from app.models import Colonia, PerfilImportacion
+from app.schemas import DeteccionImportacion, PerfilImportacionBase, PerfilImportacionResponse
+
+router = APIRouter()
+
+# Mismo directorio que utils.importacion.DIR_ERRORES (ese módulo carga pandas)
+DIR_ERRORES = os.path.join("importaciones", "errores")
+NOMBRE_ERRORES = re.compile(r"errores_[0-9a-f]{32}\.csv")
+
+
+def _solo_admin(Authorize: AuthJWT):
+    Authorize.jwt_required()
+    if Authorize.get_raw_jwt().get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized action")
+
+
+def _guardar_perfil(db: Session, perfil: PerfilImportacion, datos: PerfilImportacionBase):
+    if datos.colonia_id is not None and not db.query(Colonia.id).filter(Colonia.id == datos.colonia_id).first():
+        raise HTTPException(status_code=404, detail="Colonia no encontrada")
+    for key, value in datos.dict().items():
+        setattr(perfil, key, value)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Ya existe un perfil con ese nombre")
+    db.refresh(perfil)
+    return perfil
+
+
+@router.get("/importaciones/perfiles", response_model=List[PerfilImportacionResponse])
+def listar_perfiles(db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    _solo_admin(Authorize)
+    return db.query(PerfilImportacion).order_by(PerfilImportacion.id).all()
+
+
+@router.post("/importaciones/perfiles", response_model=PerfilImportacionResponse)
+def crear_perfil(perfil: PerfilImportacionBase, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    _solo_admin(Authorize)
+    nuevo = PerfilImportacion()
+    db.add(nuevo)
+    return _guardar_perfil(db, nuevo, perfil)
+
+
+@router.put("/importaciones/perfiles/{perfil_id}", response_model=PerfilImportacionResponse)
+def actualizar_perfil(perfil_id: int, perfil: PerfilImportacionBase, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    _solo_admin(Authorize)
+    perfil_db = db.query(PerfilImportacion).filter(PerfilImportacion.id == perfil_id).first()
+    if not perfil_db:
+        raise HTTPException(status_code=404, detail="Perfil de importación no encontrado")
+    return _guardar_perfil(db, perfil_db, perfil)
+
+
+@router.delete("/importaciones/perfiles/{perfil_id}")
+def eliminar_perfil(perfil_id: int, db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    _solo_admin(Authorize)
+    perfil_db = db.query(PerfilImportacion).filter(PerfilImportacion.id == perfil_id).first()
+    if not perfil_db:
+        raise HTTPException(status_code=404, detail="Perfil de importación no encontrado")
+    db.delete(perfil_db)
+    db.commit()
+    return {"message": "Perfil de importación eliminado"}
+
+
+@router.post("/importaciones/detectar", response_model=DeteccionImportacion)
+def detectar_perfil(file: UploadFile = File(...), db: Session = Depends(get_db), Authorize: AuthJWT = Depends()):
+    """Qué perfil usaría importar-csv con este fichero y qué columnas reconoce (solo lee el principio)."""
+    _solo_admin(Authorize)
+    from app.utils.importacion import TAM_MUESTRA, detectar_formato
+
+    perfiles = db.query(PerfilImportacion).order_by(PerfilImportacion.id).all()
+    deteccion = detectar_formato(file.file.read(TAM_MUESTRA), perfiles)
+    if deteccion is None:
+        raise HTTPException(status_code=400, detail="Ningún perfil reconoce la cabecera (faltan las columnas de nombre y sexo)")
+    return DeteccionImportacion(
+        perfil_id=deteccion.perfil.id,
+        perfil=deteccion.perfil.nombre,
+        delimitador=deteccion.delimitador,
+        fila_cabecera=deteccion.fila_cabecera,
+        reconocidas=deteccion.reconocidas,
+        ignoradas=deteccion.ignoradas,
+    )
+
+
+@router.get("/importaciones/errores/{nombre}")
+def descargar_errores(nombre: str, Authorize: AuthJWT = Depends()):
+    _solo_admin(Authorize)
+    ruta = os.path.join(DIR_ERRORES, nombre)
+    if not NOMBRE_ERRORES.fullmatch(nombre) or not os.path.isfile(ruta):
+        raise HTTPException(status_code=404, detail="Fichero de errores no encontrado o caducado")
+    return FileResponse(ruta, media_type="text/csv; charset=utf-8", filename=nombre)
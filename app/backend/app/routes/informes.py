@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi_jwt_auth import AuthJWT
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Colonia, Campana, Gato
+from app.settings import settings
+from app.utils import series
 from fastapi.responses import FileResponse, JSONResponse
+from datetime import date, timedelta
+from typing import List, Optional
 import os
 import io
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+
+# matplotlib y reportlab se importan dentro de cada función: son pesados y la
+# mayoría de peticiones nunca generan informes (arranque y RSS más bajos).
 
 router = APIRouter()
 
 def generar_pdf_colonias(colonias):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     elements = []
@@ -55,7 +63,15 @@ def generar_pdf_colonias(colonias):
     buffer.seek(0)
     return buffer
 
+def _pyplot():
+    """Carga matplotlib con backend sin pantalla (Agg) la primera vez que se usa."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
 def generar_grafico_colonias(colonias):
+    plt = _pyplot()
     nombres = [colonia.nombre for colonia in colonias]
     cantidades = [len(colonia.gatos) for colonia in colonias]
 
@@ -81,6 +97,10 @@ def generar_grafico_colonias(colonias):
 
 
 def generar_pdf_con_grafico(colonias):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+
     pdf_buffer = io.BytesIO()
     doc = SimpleDocTemplate(pdf_buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -117,6 +137,11 @@ def informe_campanas(db: Session = Depends(get_db)):
     if not campanas:
         raise HTTPException(status_code=404, detail="No hay campañas registradas")
 
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     elements = []
@@ -185,4 +210,53 @@ def datos_gatos_por_colonia(db: Session = Depends(get_db)):
         {"colonia": colonia.nombre, "gatos": len(colonia.gatos)}
         for colonia in colonias
     ]
-    return JSONResponse(content=datos)
\ No newline at end of file
+    return JSONResponse(content=datos)
+
+# Series temporales para los gráficos del panel (utils/series.py)
+@router.get("/informes/series")
+def series_temporales(
+    intervalo: str = Query("mes", description="dia, semana o mes"),
+    por: str = Query("colonia", description="colonia o campana"),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    grupo_id: Optional[List[int]] = Query(None, description="Limitar a unas colonias o campañas"),
+    db: Session = Depends(get_db),
+    Authorize: AuthJWT = Depends(),
+):
+    Authorize.jwt_required()
+    if intervalo not in series.UNIDADES:
+        raise HTTPException(status_code=400, detail=f"intervalo debe ser uno de: {', '.join(series.UNIDADES)}")
+    if por not in series.AGRUPACIONES:
+        raise HTTPException(status_code=400, detail=f"por debe ser uno de: {', '.join(series.AGRUPACIONES)}")
+    hasta = hasta or date.today()
+    desde = desde or (hasta - timedelta(days=365))
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="desde no puede ser posterior a hasta")
+    if len(series.periodos(desde, hasta, intervalo)) > series.MAX_PERIODOS:
+        raise HTTPException(status_code=400, detail=f"Demasiados periodos (máximo {series.MAX_PERIODOS}): amplía el intervalo o acorta el rango")
+
+    inicios, datos = series.calcular_series(db, por, intervalo, desde, hasta, settings.informes_cache_ttl)
+
+    # Una fila por (periodo, grupo) con todas las métricas; se omiten las vacías
+    filas = []
+    for periodo in inicios:
+        por_grupo = {}
+        for metrica, grupo, n in datos[periodo]:
+            if grupo_id and grupo not in grupo_id:
+                continue
+            fila = por_grupo.setdefault(grupo, {"periodo": periodo.isoformat(), "grupo_id": grupo,
+                                                **dict.fromkeys(series.NOMBRES_METRICAS, 0)})
+            fila[metrica] = n
+        filas.extend(sorted(por_grupo.values(), key=lambda f: (f["grupo_id"] is None, f["grupo_id"] or 0)))
+
+    modelo = Colonia if por == "colonia" else Campana
+    ids = {f["grupo_id"] for f in filas if f["grupo_id"] is not None}
+    nombres = dict(db.query(modelo.id, modelo.nombre).filter(modelo.id.in_(ids)).all()) if ids else {}
+
+    return {
+        "intervalo": intervalo,
+        "por": por,
+        "periodos": [p.isoformat() for p in inicios],
+        "grupos": {str(i): nombre for i, nombre in nombres.items()},
+        "series": filas,
+    }
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Inspeccion, Colonia, User
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 import os
 import re
 import shutil
 from datetime import datetime
 import uuid
-from app.utils.utils import enviar_correo
+from app.utils.eventos import publicar
+from app.utils.notificaciones import destinatarios, notificar, notificar_colonia
 from app.routes.auth import get_current_user
+from app.utils.proyecciones import respuesta_proyeccion, seleccionar_campos
 
 UPLOAD_DIR = "/app/uploads/"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -46,40 +49,32 @@ def limpiar_texto(valor: str) -> str:
     valor = re.sub(r"[<>]", "", valor)
     return valor
 
-# **✅ Función Reutilizable para Notificar Voluntarios**
-def notificar_voluntario(colonia_id: int, tipo_notificacion: str, db: Session):
-    """Envía una notificación al voluntario responsable de la colonia."""
-    
-    # Buscar la colonia para obtener el voluntario responsable
-    colonia = db.query(Colonia).filter(Colonia.id == colonia_id).first()
-    if not colonia:
-        print(f"⚠️ No se encontró la colonia con ID {colonia_id}")
-        return
-    
-    # Buscar al voluntario en la base de datos usando el campo responsable_voluntario
-    voluntario = db.query(User).filter(User.username == colonia.responsable_voluntario, User.role == "voluntario").first()
-    
-    if voluntario:
-        if voluntario.email:
-            asunto = f"📢 Notificación de {tipo_notificacion.capitalize()} en {colonia.nombre}"
-            mensaje = (
-                f"🆕 Se ha registrado una nueva {tipo_notificacion} en la colonia '{colonia.nombre}' que administras.\n\n"
-                f"📌 **Descripción:** {tipo_notificacion}.\n\n"
-                f"✅ Por favor, revísala en el sistema."
-            )
-            
-            try:
-                enviar_correo(voluntario.email, asunto, mensaje)
-                print(f"✅ Correo de notificación enviado a {voluntario.email}")
-            except Exception as e:
-                print(f"❌ Error al enviar correo a {voluntario.email}: {e}")
-        else:
-            print(f"⚠️ El voluntario '{voluntario.username}' no tiene un email registrado.")
-    else:
-        print(f"⚠️ No se encontró un voluntario con username '{colonia.responsable_voluntario}' en la base de datos.")
+# Campos que admite ?fields= (mismo formato que InspeccionResponse)
+CAMPOS_INSPECCION = {
+    "id": Inspeccion.id,
+    "fecha": func.to_char(Inspeccion.fecha, "DD/MM/YYYY"),
+    "colonia_id": Inspeccion.colonia_id,
+    "colonia_nombre": select(Colonia.nombre).where(Colonia.id == Inspeccion.colonia_id).scalar_subquery(),
+    "observaciones": Inspeccion.observaciones,
+    "acciones_recomendadas": Inspeccion.acciones_recomendadas,
+    "archivo": Inspeccion.archivo,
+    "estatus": func.coalesce(Inspeccion.estatus, "pendiente"),
+}
 
 @router.get("/inspecciones/", response_model=List[InspeccionResponse])
-def listar_inspecciones(request: Request, db: Session = Depends(get_db)):
+def listar_inspecciones(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos separados por comas (p. ej. id,fecha,estatus)"),
+    db: Session = Depends(get_db),
+):
+    campos = seleccionar_campos(fields, CAMPOS_INSPECCION)
+    if campos:
+        base_url = str(request.base_url).rstrip('/')
+        filas = db.query(*campos).select_from(Inspeccion).order_by(Inspeccion.id).all()
+        return respuesta_proyeccion(filas, {
+            "archivo": lambda a: f"{base_url}/uploads/{a}" if a else None,
+        })
+
     inspecciones = db.query(Inspeccion).all()
     response = []
     for ins in inspecciones:
@@ -139,11 +134,11 @@ def registrar_inspeccion(
     )
     
     db.add(nueva_inspeccion)
+    # Aviso y correo en la misma transacción que la inspección (el correo sale por la cola)
+    notificar_colonia(db, colonia_id, "inspeccion")
     db.commit()
     db.refresh(nueva_inspeccion)
-
-    # Enviar notificación
-    notificar_voluntario(colonia_id,"inspeccion", db)
+    publicar("inspeccion", "creada", nueva_inspeccion.id, colonia_id=colonia_id)
     
     return InspeccionResponse(
         id=nueva_inspeccion.id,
@@ -169,29 +164,20 @@ def resolver_inspeccion(inspeccion_id: int, usuario: User = Depends(get_current_
         raise HTTPException(status_code=404, detail="Inspección no encontrada")
     
     inspeccion.estatus = "resuelta"
-    db.commit()
-    db.refresh(inspeccion)
-
-    # Obtener al usuario con rol "responsable" en el sistema
-    responsable = db.query(User).filter(User.role == "responsable").first()
-
-    # Obtener al Voluntario responsable de la colonia
-    voluntario = None
-    if inspeccion.colonia_id:
-        colonia = db.query(Colonia).filter(Colonia.id == inspeccion.colonia_id).first()
-        if colonia and colonia.responsable_voluntario:
-            voluntario = db.query(User).filter(User.username == colonia.responsable_voluntario, User.role == "voluntario").first()
 
-    # Si la inspección es resuelta por un Usuario, notificar al Voluntario y al Responsable
+    mensaje = f"La inspección '{inspeccion.observaciones}' ha sido marcada como resuelta por {usuario.username}."
+    # Si la inspección es resuelta por un Usuario, notificar al Voluntario de la colonia y al Responsable
     if usuario.role == "usuario":
-        if voluntario and voluntario.email:
-            enviar_correo(voluntario.email, "Inspección resuelta en tu colonia", f"La inspección '{inspeccion.observaciones}' ha sido marcada como resuelta por {usuario.username}.")
-        if responsable and responsable.email:
-            enviar_correo(responsable.email, "Inspección resuelta", f"La inspección '{inspeccion.observaciones}' ha sido marcada como resuelta por {usuario.username}.")
-    
+        if inspeccion.colonia_id:
+            notificar(db, destinatarios(db, colonia_id=inspeccion.colonia_id), mensaje, asunto="Inspección resuelta en tu colonia", tipo="inspeccion")
+        notificar(db, destinatarios(db, roles=["responsable"]), mensaje, asunto="Inspección resuelta", tipo="inspeccion")
     # Si la inspección es resuelta por un Voluntario, solo notificar al Responsable
-    elif usuario.role == "voluntario" and responsable and responsable.email:
-        enviar_correo(responsable.email, "Inspección resuelta", f"La inspección '{inspeccion.observaciones}' ha sido marcada como resuelta por el voluntario {usuario.username}.")
+    elif usuario.role == "voluntario":
+        mensaje = f"La inspección '{inspeccion.observaciones}' ha sido marcada como resuelta por el voluntario {usuario.username}."
+        notificar(db, destinatarios(db, roles=["responsable"]), mensaje, asunto="Inspección resuelta", tipo="inspeccion")
+
+    db.commit()
+    publicar("inspeccion", "resuelta", inspeccion.id, colonia_id=inspeccion.colonia_id)
 
     return {"message": "Inspección marcada como resuelta y notificación enviada correctamente"}
 
@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, conlist
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import Notificacion, User
+from app.routes.auth import get_current_user
+from app.settings import settings
+from app.utils.notificaciones import enviar_pendientes, enviar_resumenes, marcar_leidas
+from app.utils.scheduler import planificador
+
+router = APIRouter()
+
+planificador.registrar("correos_pendientes", settings.notificaciones_cron, enviar_pendientes)
+planificador.registrar("resumenes_notificaciones", settings.notificaciones_resumen_cron, enviar_resumenes)
+
+
+class PreferenciasNotificaciones(BaseModel):
+    digest: bool  # True = un correo por hora con todo lo acumulado en lugar de uno por aviso
+
+
+class NotificacionResponse(BaseModel):
+    id: int
+    mensaje: str
+    tipo: Optional[str] = None
+    leido: bool
+    fecha_hora: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
+class BandejaResponse(BaseModel):
+    notificaciones: List[NotificacionResponse]
+    no_leidas: int
+    siguiente: Optional[int] = None  # valor de antes_de para la página siguiente; None = no hay más
+
+
+class MarcarLeidas(BaseModel):
+    ids: Optional[conlist(int, min_items=1, max_items=500)] = None  # None = todas
+
+
+class NoLeidasResponse(BaseModel):
+    no_leidas: int
+
+
+@router.get("/notificaciones/", response_model=BandejaResponse)
+def listar_notificaciones(
+    antes_de: Optional[int] = Query(None, description="Id de la última notificación recibida (paginación)"),
+    limit: int = Query(20, ge=1, le=100),
+    solo_no_leidas: bool = False,
+    usuario: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # Paginación por id (índice usuario_id, id): el coste no crece con la profundidad de la página
+    query = db.query(Notificacion).filter(Notificacion.usuario_id == usuario.id)
+    if antes_de is not None:
+        query = query.filter(Notificacion.id < antes_de)
+    if solo_no_leidas:
+        query = query.filter(Notificacion.leido.isnot(True))
+    filas = query.order_by(Notificacion.id.desc()).limit(limit + 1).all()
+
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+    return {
+        "notificaciones": [
+            NotificacionResponse(id=n.id, mensaje=n.mensaje, tipo=n.tipo, leido=bool(n.leido), fecha_hora=n.fecha_hora)
+            for n in filas
+        ],
+        "no_leidas": usuario.notificaciones_no_leidas,
+        "siguiente": filas[-1].id if hay_mas else None,
+    }
+
+
+@router.get("/notificaciones/no-leidas", response_model=NoLeidasResponse)
+def contar_no_leidas(usuario: User = Depends(get_current_user)):
+    # Contador mantenido al notificar y al marcar: el badge no recorre la tabla
+    return {"no_leidas": usuario.notificaciones_no_leidas}
+
+
+@router.post("/notificaciones/leidas", response_model=NoLeidasResponse)
+def marcar_varias_leidas(
+    datos: MarcarLeidas,
+    usuario: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    marcar_leidas(db, usuario.id, datos.ids)
+    db.commit()
+    db.refresh(usuario)
+    return {"no_leidas": usuario.notificaciones_no_leidas}
+
+
+@router.put("/notificaciones/{notificacion_id}/leida", response_model=NoLeidasResponse)
+def marcar_leida(
+    notificacion_id: int,
+    usuario: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    existe = db.query(Notificacion.id).filter(
+        Notificacion.id == notificacion_id, Notificacion.usuario_id == usuario.id
+    ).first()
+    if not existe:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    marcar_leidas(db, usuario.id, [notificacion_id])
+    db.commit()
+    db.refresh(usuario)
+    return {"no_leidas": usuario.notificaciones_no_leidas}
+
+
+@router.get("/notificaciones/preferencias", response_model=PreferenciasNotificaciones)
+def obtener_preferencias(usuario: User = Depends(get_current_user)):
+    return {"digest": usuario.digest_notificaciones}
+
+
+@router.put("/notificaciones/preferencias", response_model=PreferenciasNotificaciones)
+def actualizar_preferencias(
+    preferencias: PreferenciasNotificaciones,
+    usuario: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # Los correos ya encolados siguen su curso; el cambio aplica a los siguientes avisos
+    usuario.digest_notificaciones = preferencias.digest
+    db.commit()
+    return {"digest": usuario.digest_notificaciones}
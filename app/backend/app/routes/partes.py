@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import Parte, User, Notificacion
+from app.models import Parte, User
 from app.schemas import ParteCreate, ParteUpdate, ParteResponse
+from app.utils.eventos import publicar
+from app.utils.notificaciones import notificar
 from fastapi_jwt_auth import AuthJWT
 from fastapi_jwt_auth.exceptions import AuthJWTException
 
 router = APIRouter()
 
-# Función para enviar notificaciones
+# Función para enviar notificaciones (solo en la app, sin correo)
 def enviar_notificacion(db: Session, usuario_id: int, mensaje: str):
-    notificacion = Notificacion(mensaje=mensaje, usuario_id=usuario_id)
-    db.add(notificacion)  # Añadir la notificación a la base de datos
-    db.commit()           # Confirmar la transacción
+    notificar(db, [usuario_id], mensaje, tipo="parte")
+    db.commit()
 
 # Crear un nuevo parte (incidencia) - Disponible para voluntarios
 @router.post("/partes/", response_model=ParteResponse, summary="Crear parte de incidencia")
@@ -36,6 +37,7 @@ def crear_parte(
         db.add(nuevo_parte)
         db.commit()
         db.refresh(nuevo_parte)
+        publicar("parte", "creado", nuevo_parte.id, usuario_ids=[user_id])
         return nuevo_parte
 
     except AuthJWTException as e:
@@ -96,6 +98,9 @@ def actualizar_parte(
         parte.responsable_id = user_id
         db.commit()
         db.refresh(parte)
+        # Lo recibe quien lo creó; cualquier otro cambio de estado también se publica
+        accion = "resuelto" if parte.estado == "resuelto" else "actualizado"
+        publicar("parte", accion, parte.id, usuario_ids=[parte.usuario_id, parte.responsable_id])
         return parte
 
     except AuthJWTException as e:
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Queja, User, Colonia
@@ -9,8 +10,11 @@ import re
 import shutil
 from datetime import datetime
 import uuid
-from app.utils.utils import enviar_correo
+from app.utils.condicional import Condicional
+from app.utils.eventos import publicar
+from app.utils.notificaciones import destinatarios, notificar, notificar_colonia
 from app.routes.auth import get_current_user
+from app.utils.proyecciones import respuesta_proyeccion, seleccionar_campos
 
 # Definir directorio de almacenamiento
 UPLOAD_DIR = "/app/uploads/quejas/"
@@ -43,41 +47,33 @@ def limpiar_texto(valor: str) -> str:
     valor = re.sub(r"[<>]", "", valor)
     return valor
 
-# **✅ Función Reutilizable para Notificar Voluntarios**
-def notificar_voluntario(colonia_id: int, tipo_notificacion: str, db: Session):
-    """Envía una notificación al voluntario responsable de la colonia."""
-    
-    # Buscar la colonia para obtener el voluntario responsable
-    colonia = db.query(Colonia).filter(Colonia.id == colonia_id).first()
-    if not colonia:
-        print(f"⚠️ No se encontró la colonia con ID {colonia_id}")
-        return
-    
-    # Buscar al voluntario en la base de datos usando el campo responsable_voluntario
-    voluntario = db.query(User).filter(User.username == colonia.responsable_voluntario, User.role == "voluntario").first()
-    
-    if voluntario:
-        if voluntario.email:
-            asunto = f"📢 Notificación de {tipo_notificacion.capitalize()} en {colonia.nombre}"
-            mensaje = (
-                f"🆕 Se ha registrado una nueva {tipo_notificacion} en la colonia '{colonia.nombre}' que administras.\n\n"
-                f"📌 **Descripción:** {tipo_notificacion}.\n\n"
-                f"✅ Por favor, revísala en el sistema."
-            )
-            
-            try:
-                enviar_correo(voluntario.email, asunto, mensaje)
-                print(f"✅ Correo de notificación enviado a {voluntario.email}")
-            except Exception as e:
-                print(f"❌ Error al enviar correo a {voluntario.email}: {e}")
-        else:
-            print(f"⚠️ El voluntario '{voluntario.username}' no tiene un email registrado.")
-    else:
-        print(f"⚠️ No se encontró un voluntario con username '{colonia.responsable_voluntario}' en la base de datos.")
+# Campos que admite ?fields= (mismo formato que QuejaResponse)
+CAMPOS_QUEJA = {
+    "id": Queja.id,
+    "fecha": func.to_char(Queja.fecha, "DD/MM/YYYY"),
+    "descripcion": Queja.descripcion,
+    "colonia_id": Queja.colonia_id,
+    "colonia_nombre": select(Colonia.nombre).where(Colonia.id == Queja.colonia_id).scalar_subquery(),
+    "solucion_responsable": Queja.solucion_responsable,
+    "archivo": Queja.archivo,
+    "estatus": func.coalesce(Queja.estatus, "pendiente"),
+}
 
 # Obtener todas las quejas
 @router.get("/quejas/", response_model=List[QuejaResponse])
-def listar_quejas(request: Request, db: Session = Depends(get_db)):
+def listar_quejas(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Campos separados por comas (p. ej. id,fecha,estatus)"),
+    db: Session = Depends(get_db),
+):
+    campos = seleccionar_campos(fields, CAMPOS_QUEJA)
+    if campos:
+        base_url = str(request.base_url).rstrip('/')
+        filas = db.query(*campos).select_from(Queja).order_by(Queja.id).all()
+        return respuesta_proyeccion(filas, {
+            "archivo": lambda a: f"{base_url}/uploads/quejas/{a}" if a else None,
+        })
+
     quejas = db.query(Queja).all()
     response = []
     for q in quejas:
@@ -136,11 +132,12 @@ def registrar_queja(
     )
 
     db.add(nueva_queja)
+    # Aviso y correo en la misma transacción que la queja (el correo sale por la cola)
+    if colonia_id:
+        notificar_colonia(db, colonia_id, "queja")
     db.commit()
     db.refresh(nueva_queja)
-
-    # Llamar a la función para enviar el correo
-    notificar_voluntario(colonia_id, "queja", db)
+    publicar("queja", "creada", nueva_queja.id, colonia_id=nueva_queja.colonia_id)
 
     return QuejaResponse(
         id=nueva_queja.id,
@@ -183,34 +180,30 @@ def resolver_queja(queja_id: int, usuario: User = Depends(get_current_user), db:
         raise HTTPException(status_code=404, detail="Queja no encontrada")
     
     queja.estatus = "resuelta"
-    db.commit()
-    db.refresh(queja)
 
-    # Obtener al usuario con rol "responsable" en el sistema
-    responsable = db.query(User).filter(User.role == "responsable").first()
-
-    # Obtener al Voluntario responsable de la colonia
-    voluntario = None
-    if queja.colonia_id:
-        colonia = db.query(Colonia).filter(Colonia.id == queja.colonia_id).first()
-        if colonia and colonia.responsable_voluntario:
-            voluntario = db.query(User).filter(User.username == colonia.responsable_voluntario, User.role == "voluntario").first()
-
-    # Si la queja es resuelta por un Usuario, notificar al Voluntario y al Responsable
+    mensaje = f"La queja '{queja.descripcion}' ha sido marcada como resuelta por {usuario.username}."
+    # Si la queja es resuelta por un Usuario, notificar al Voluntario de la colonia y al Responsable
     if usuario.role == "usuario":
-        if voluntario and voluntario.email:
-            enviar_correo(voluntario.email, "Queja resuelta en tu colonia", f"La queja '{queja.descripcion}' ha sido marcada como resuelta por {usuario.username}.")
-        if responsable and responsable.email:
-            enviar_correo(responsable.email, "Queja resuelta", f"La queja '{queja.descripcion}' ha sido marcada como resuelta por {usuario.username}.")
-    
+        if queja.colonia_id:
+            notificar(db, destinatarios(db, colonia_id=queja.colonia_id), mensaje, asunto="Queja resuelta en tu colonia", tipo="queja")
+        notificar(db, destinatarios(db, roles=["responsable"]), mensaje, asunto="Queja resuelta", tipo="queja")
     # Si la queja es resuelta por un Voluntario, solo notificar al Responsable
-    elif usuario.role == "voluntario" and responsable and responsable.email:
-        enviar_correo(responsable.email, "Queja resuelta", f"La queja '{queja.descripcion}' ha sido marcada como resuelta por el voluntario {usuario.username}.")
+    elif usuario.role == "voluntario":
+        mensaje = f"La queja '{queja.descripcion}' ha sido marcada como resuelta por el voluntario {usuario.username}."
+        notificar(db, destinatarios(db, roles=["responsable"]), mensaje, asunto="Queja resuelta", tipo="queja")
+
+    db.commit()
+    publicar("queja", "resuelta", queja.id, colonia_id=queja.colonia_id)
 
     return {"message": "Queja marcada como resuelta y notificación enviada correctamente"}
 
 @router.get("/quejas/mis-quejas", response_model=List[QuejaResponse])
-def obtener_mis_quejas(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def obtener_mis_quejas(
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    cache: dict = Depends(Condicional("quejas", "colonias", "usuarios_colonias", por_usuario=True)),
+):
     # Obtener las colonias asociadas al usuario
     colonias = user.colonias  # Gracias a la relación en SQLAlchemy
 
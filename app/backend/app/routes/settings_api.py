@@ -1,12 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from app.settings import settings
+from app.utils.condicional import etag_debil, responder_condicional
 
 router = APIRouter()
 
 @router.get("/settings")
-def get_settings():
+def get_settings(request: Request, response: Response):
     """Devuelve parámetros de configuración del municipio para el frontend."""
-    return {
+    datos = {
         "municipio_lat": settings.municipio_lat,
         "municipio_lon": settings.municipio_lon,
         "municipio_radio_km": settings.municipio_radio_km,
@@ -14,3 +15,6 @@ def get_settings():
         "municipio_provincia": settings.municipio_provincia,
         "map_zoom": 14,  # puedes hacerlo configurable si quieres
     }
+    # Solo cambian al reiniciar con otra configuración: el ETag sale del propio contenido
+    response.headers.update(responder_condicional(request, etag_debil(sorted(datos.items()))))
+    return datos
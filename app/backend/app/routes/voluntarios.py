@@ -4,9 +4,10 @@ from sqlalchemy.orm import Session
 from typing import List
 from pydantic import BaseModel
 from app.database import get_db
-from app.models import User, ActividadVoluntario, Colonia, Notificacion, Queja, Inspeccion
+from app.models import User, ActividadVoluntario, Colonia, Queja, Inspeccion
 from app.schemas import ActividadResponse, QuejaCreate, QuejaResponse, InspeccionCreate, InspeccionResponse
-from app.utils.utils import enviar_correo
+from app.utils.eventos import publicar
+from app.utils.notificaciones import notificar_colonia
 
 # Definición de esquemas para Pydantic
 class VoluntarioResponse(BaseModel):
@@ -98,36 +99,15 @@ def actualizar_actividad(actividad_id: int, actividad_actualizada: ActividadCrea
     db.refresh(actividad_db)
     return actividad_db
 
-### FUNCIONALIDAD DE NOTIFICACIONES POR CORREO ###
-def notificar_voluntario(colonia_id: int, tipo_evento: str, db: Session):
-    """
-    Envía una notificación por correo electrónico al voluntario responsable de la colonia cuando hay una queja o inspección.
-    """
-    colonia = db.query(Colonia).filter(Colonia.id == colonia_id).first()
-    if colonia and colonia.responsable_id:
-        voluntario = db.query(User).filter(User.id == colonia.responsable_id).first()
-        if voluntario:
-            mensaje = f"Hola {voluntario.username},\n\nSe ha registrado una nueva {tipo_evento} en la colonia '{colonia.nombre}'. Por favor revisa los detalles en el sistema.\n\nSaludos,\nGestión de Colonias Felinas."
-            
-            nueva_notificacion = Notificacion(
-                usuario_id=voluntario.id,
-                mensaje=mensaje,
-                tipo="alerta",
-            )
-            db.add(nueva_notificacion)
-            db.commit()
-
-            # Enviar correo electrónico
-            enviar_correo(voluntario.email, f"Nueva {tipo_evento} en tu colonia", mensaje)
-
 ### ENDPOINT PARA REGISTRAR UNA QUEJA ###
 @router.post("/quejas/", response_model=QuejaResponse)
 def registrar_queja(queja: QuejaCreate, db: Session = Depends(get_db)):
     nueva_queja = Queja(**queja.dict())  # Convertimos Pydantic a SQLAlchemy
     db.add(nueva_queja)
+    notificar_colonia(db, nueva_queja.colonia_id, "queja")
     db.commit()
     db.refresh(nueva_queja)
-    notificar_voluntario(nueva_queja.colonia_id, "queja", db)
+    publicar("queja", "creada", nueva_queja.id, colonia_id=nueva_queja.colonia_id)
     return nueva_queja  # Devuelve una respuesta válida con Pydantic
 
 ### ENDPOINT PARA REGISTRAR UNA INSPECCIÓN ###
@@ -135,8 +115,9 @@ def registrar_queja(queja: QuejaCreate, db: Session = Depends(get_db)):
 def registrar_inspeccion(inspeccion: InspeccionCreate, db: Session = Depends(get_db)):
     nueva_inspeccion = Inspeccion(**inspeccion.dict())  # Convertimos Pydantic a SQLAlchemy
     db.add(nueva_inspeccion)
+    notificar_colonia(db, nueva_inspeccion.colonia_id, "inspeccion")
     db.commit()
     db.refresh(nueva_inspeccion)
-    notificar_voluntario(nueva_inspeccion.colonia_id, "inspección", db)
+    publicar("inspeccion", "creada", nueva_inspeccion.id, colonia_id=nueva_inspeccion.colonia_id)
     return nueva_inspeccion  # Devuelve una respuesta válida con Pydantic
 
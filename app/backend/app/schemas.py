@@ -1,7 +1,15 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, validator, EmailStr
 from datetime import datetime
 from datetime import date
+from app.utils.microchip import normalizar_chip, es_chip_valido
+
+def validar_chip(v):
+    """Normaliza el microchip a solo dígitos y exige 15."""
+    v = normalizar_chip(v)
+    if v is not None and not es_chip_valido(v):
+        raise ValueError("El código de identificación debe contener exactamente 15 dígitos.")
+    return v
 
 class GatoBase(BaseModel):
     nombre: str
@@ -23,11 +31,9 @@ class GatoBase(BaseModel):
     codigo_identificacion: Optional[str] = None
     imagen: Optional[str] = None  # Hacer que la imagen sea opcional en la base
 
-    @validator("codigo_identificacion")
+    @validator("codigo_identificacion", pre=True)
     def validate_codigo_identificacion(cls, v):
-        if v is not None and (not v.isdigit() or len(v) != 15):
-            raise ValueError("El código de identificación debe contener exactamente 15 dígitos.")
-        return v
+        return validar_chip(v)
 
 class GatoCreate(GatoBase):
     pass
@@ -50,6 +56,10 @@ class GatoUpdate(BaseModel):
     codigo_identificacion: Optional[str] = None
     imagen: Optional[str] = None  
 
+    @validator("codigo_identificacion", pre=True)
+    def validate_codigo_identificacion(cls, v):
+        return validar_chip(v)
+
     @validator("fecha_vacunacion", "fecha_desparasitacion", "fecha_esterilizacion", pre=True)
     def validate_date(cls, value):
         """
@@ -196,3 +206,152 @@ class UserResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+# Búsqueda de microchips en lote (p. ej. lector en una jornada de captura)
+class MicrochipLote(BaseModel):
+    codigos: List[str]
+
+    @validator("codigos")
+    def validate_codigos(cls, v):
+        if len(v) > 1000:
+            raise ValueError("Máximo 1000 códigos por consulta.")
+        return v
+
+class MicrochipLoteResponse(BaseModel):
+    encontrados: Dict[str, GatoResponse]
+    no_encontrados: List[str]
+
+# Operaciones en lote: un resultado por elemento, todo en una transacción
+MAX_LOTE = 1000
+ESTADOS_ERROR = ("no_encontrado", "error")
+
+class IdsLote(BaseModel):
+    ids: List[int]
+
+    @validator("ids")
+    def validate_ids(cls, v):
+        if not v:
+            raise ValueError("La lista de ids está vacía.")
+        if len(v) > MAX_LOTE:
+            raise ValueError(f"Máximo {MAX_LOTE} elementos por lote.")
+        return list(dict.fromkeys(v))
+
+class GatoLoteItem(GatoUpdate):
+    id: int
+
+    @validator("nombre", "sexo")
+    def validate_obligatorios(cls, v):
+        if v is None:
+            raise ValueError("No puede ser nulo.")
+        return v
+
+class GatosLoteUpdate(BaseModel):
+    gatos: List[GatoLoteItem]
+
+    @validator("gatos")
+    def validate_gatos(cls, v):
+        if not v:
+            raise ValueError("El lote está vacío.")
+        if len(v) > MAX_LOTE:
+            raise ValueError(f"Máximo {MAX_LOTE} elementos por lote.")
+        if len({g.id for g in v}) != len(v):
+            raise ValueError("Hay ids repetidos en el lote.")
+        return v
+
+class ResultadoItemLote(BaseModel):
+    id: int
+    estado: str  # actualizado, dado_de_baja, asociado, ya_asociado, sin_cambios, no_encontrado, error
+    detalle: Optional[str] = None
+
+class ResultadoLote(BaseModel):
+    correctos: int
+    errores: int
+    resultados: List[ResultadoItemLote]
+
+    @classmethod
+    def de(cls, resultados: list):
+        errores = sum(r.estado in ESTADOS_ERROR for r in resultados)
+        return cls(correctos=len(resultados) - errores, errores=errores, resultados=resultados)
+
+class AsignacionUsuarioColonia(BaseModel):
+    user_id: int
+    colonia_id: int
+
+class AsignacionesLote(BaseModel):
+    asignaciones: List[AsignacionUsuarioColonia]
+
+    @validator("asignaciones")
+    def validate_asignaciones(cls, v):
+        if not v:
+            raise ValueError("El lote está vacío.")
+        if len(v) > MAX_LOTE:
+            raise ValueError(f"Máximo {MAX_LOTE} elementos por lote.")
+        return v
+
+class ResultadoAsignacion(BaseModel):
+    user_id: int
+    colonia_id: int
+    estado: str  # asignado, ya_asignado, no_encontrado
+    detalle: Optional[str] = None
+
+class ResultadoAsignaciones(ResultadoLote):
+    resultados: List[ResultadoAsignacion]
+
+# Campos de Gato que se pueden mapear desde un CSV de censo (utils/importacion.py)
+CAMPOS_IMPORTACION = (
+    "nombre", "raza", "sexo", "fecha_vacunacion", "fecha_desparasitacion",
+    "fecha_esterilizacion", "codigo_identificacion",
+)
+
+class PerfilImportacionBase(BaseModel):
+    nombre: str
+    columnas: Dict[str, str]  # cabecera del CSV -> campo de Gato
+    formato_fecha: Optional[str] = None
+    codificacion: str = "utf-8"
+    delimitador: Optional[str] = None
+    fila_cabecera: Optional[int] = None
+    colonia_id: Optional[int] = None
+
+    @validator("columnas")
+    def validate_columnas(cls, v):
+        desconocidos = set(v.values()) - set(CAMPOS_IMPORTACION)
+        if desconocidos:
+            raise ValueError(f"Campos no importables: {', '.join(sorted(desconocidos))}")
+        if not {"nombre", "sexo"} <= set(v.values()):
+            raise ValueError("El perfil debe indicar las columnas de nombre y sexo.")
+        return {cabecera.strip(): campo for cabecera, campo in v.items()}
+
+    @validator("codificacion")
+    def validate_codificacion(cls, v):
+        import codecs
+        try:
+            codecs.lookup(v)
+        except LookupError:
+            raise ValueError(f"Codificación desconocida: {v}")
+        return v
+
+    @validator("delimitador")
+    def validate_delimitador(cls, v):
+        if v is not None and len(v) != 1:
+            raise ValueError("El delimitador debe ser un único carácter.")
+        return v
+
+    @validator("fila_cabecera")
+    def validate_fila_cabecera(cls, v):
+        if v is not None and v < 0:
+            raise ValueError("fila_cabecera no puede ser negativa.")
+        return v
+
+class PerfilImportacionResponse(PerfilImportacionBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+class DeteccionImportacion(BaseModel):
+    perfil_id: Optional[int] = None  # None = formato por defecto de Onegat
+    perfil: str
+    delimitador: str
+    fila_cabecera: int
+    reconocidas: Dict[str, str]  # cabecera -> campo
+    ignoradas: List[str]
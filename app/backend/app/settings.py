@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     max_gatos_total_limit: Optional[int] = Field(default=None, env="MAX_GATOS_TOTAL_LIMIT")
     max_gatos_por_colonia: Optional[int] = Field(default=None, env="MAX_GATOS_POR_COLONIA")
     max_gatos_import_csv: Optional[int] = Field(default=None, env="MAX_GATOS_IMPORT_CSV")
+    importacion_max_mb: int = Field(default=50, env="IMPORTACION_MAX_MB")  # tamaño máximo del CSV de censo
 
     # NUEVO: orígenes permitidos (CSV)
     allowed_origins: List[str] = Field(default_factory=list, env="ALLOWED_ORIGINS")
@@ -28,6 +29,27 @@ class Settings(BaseSettings):
     municipio_lon: Optional[float] = Field(default=None, env="MUNICIPIO_LON")
     municipio_radio_km: Optional[float] = Field(default=None, env="MUNICIPIO_RADIO_KM")
 
+    # Backups: "custom" (un solo flujo pg_dump -F c) o "directorio" (pg_dump -F d -j N)
+    backup_modo: str = Field(default="custom", env="BACKUP_MODO")
+    backup_jobs: Optional[int] = Field(default=None, env="BACKUP_JOBS")  # None = nº de CPUs (máx. 8)
+    backup_compresion: str = Field(default="zstd:3", env="BACKUP_COMPRESION")  # gzip si pg_dump < 16
+    # Programación (cron de 5 campos, hora local); vacío = desactivado
+    backup_cron: str = Field(default="0 3 * * *", env="BACKUP_CRON")
+    backup_incremental_cron: str = Field(default="", env="BACKUP_INCREMENTAL_CRON")  # p. ej. "0 */6 * * *"
+    campanas_estatus_cron: str = Field(default="1 0 * * *", env="CAMPANAS_ESTATUS_CRON")  # cambio de día
+    notificaciones_cron: str = Field(default="* * * * *", env="NOTIFICACIONES_CRON")  # cola de correo
+    notificaciones_resumen_cron: str = Field(default="0 * * * *", env="NOTIFICACIONES_RESUMEN_CRON")  # resúmenes horarios
+    planificador_activo: bool = Field(default=True, env="PLANIFICADOR_ACTIVO")
+    backup_max_subida_mb: int = Field(default=20480, env="BACKUP_MAX_SUBIDA_MB")  # tamaño máximo al importar
+
+    # Caducidad en Redis de los periodos cerrados de /informes/series (correcciones con fecha atrasada)
+    informes_cache_ttl: int = Field(default=6 * 3600, env="INFORMES_CACHE_TTL")
+
+    # Copia externa en S3 (S3_ENDPOINT_URL permite usar un compatible local, p. ej. MinIO)
+    s3_endpoint_url: Optional[str] = Field(default=None, env="S3_ENDPOINT_URL")
+    s3_concurrencia: int = Field(default=8, env="S3_CONCURRENCIA")
+    s3_tam_parte_mb: int = Field(default=64, env="S3_TAM_PARTE_MB")
+
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,204 @@
+"""
+Cifrado en flujo de los backups.
+
+Formato (v2), pensado para cifrar/descifrar sin cargar el dump en memoria:
+
+    MAGIC (8 bytes) | SAL (16 bytes)
+    trozo*: FLAG (1 byte) | LONGITUD (4 bytes, big-endian) | AES-256-GCM(datos) + TAG (16 bytes)
+
+- La clave de cada archivo se deriva con HKDF-SHA256 de ENCRYPTION_KEY y la sal.
+- El nonce de cada trozo es su número de orden (12 bytes), único por clave.
+- La cabecera y el FLAG van como datos autenticados: el último trozo lleva
+  FLAG=1, así que un archivo truncado, reordenado o manipulado no descifra.
+
+Los backups antiguos (un único token Fernet) se siguen pudiendo leer con
+`descifrar_legacy`.
+"""
+import base64
+import io
+import os
+import struct
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MAGIC = b"ONEGATB2"
+TAM_SAL = 16
+TAM_TROZO = 1024 * 1024  # 1 MiB de texto claro por trozo
+_TAG = 16
+_FRAME = struct.Struct(">BI")
+
+
+class BackupCorruptoError(Exception):
+    """El archivo no es un backup válido o ha sido manipulado/truncado."""
+
+
+def _clave_maestra(encryption_key: str) -> bytes:
+    # ENCRYPTION_KEY es una clave Fernet: 32 bytes en base64 url-safe
+    return base64.urlsafe_b64decode(encryption_key.encode())
+
+
+def _derivar_clave(encryption_key: str, sal: bytes) -> AESGCM:
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=sal, info=b"onegat-backup-v2")
+    return AESGCM(hkdf.derive(_clave_maestra(encryption_key)))
+
+
+def _nonce(contador: int) -> bytes:
+    return contador.to_bytes(12, "big")
+
+
+class CifradorFlujo:
+    """
+    Objeto tipo archivo de solo escritura: cifra lo que recibe por trozos y lo
+    escribe en `destino`. Hay que llamar a `close()` para emitir el trozo final.
+    """
+
+    def __init__(self, destino, encryption_key: str):
+        self._destino = destino
+        sal = os.urandom(TAM_SAL)
+        self._cabecera = MAGIC + sal
+        self._aead = _derivar_clave(encryption_key, sal)
+        self._contador = 0
+        self._pendiente = bytearray()
+        self._cerrado = False
+        destino.write(self._cabecera)
+
+    def _emitir(self, datos: bytes, final: bool):
+        flag = 1 if final else 0
+        cifrado = self._aead.encrypt(_nonce(self._contador), datos, self._cabecera + bytes([flag]))
+        self._destino.write(_FRAME.pack(flag, len(cifrado)))
+        self._destino.write(cifrado)
+        self._contador += 1
+
+    def write(self, datos) -> int:
+        if self._cerrado:
+            raise ValueError("Cifrador cerrado")
+        self._pendiente += datos
+        while len(self._pendiente) > TAM_TROZO:
+            self._emitir(bytes(self._pendiente[:TAM_TROZO]), final=False)
+            del self._pendiente[:TAM_TROZO]
+        return len(datos)
+
+    def flush(self):
+        self._destino.flush()
+
+    def close(self):
+        if not self._cerrado:
+            self._emitir(bytes(self._pendiente), final=True)
+            self._pendiente.clear()
+            self._cerrado = True
+            self._destino.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def cifrar_flujo(origen, destino, encryption_key: str):
+    """Cifra todo lo que se lea de `origen` (p. ej. la salida de pg_dump) en `destino`."""
+    with CifradorFlujo(destino, encryption_key) as cifrador:
+        while True:
+            bloque = origen.read(TAM_TROZO)
+            if not bloque:
+                break
+            cifrador.write(bloque)
+
+
+def _leer_exacto(origen, n: int) -> bytes:
+    datos = bytearray()
+    while len(datos) < n:
+        bloque = origen.read(n - len(datos))
+        if not bloque:
+            break
+        datos += bloque
+    return bytes(datos)
+
+
+def iterar_descifrado(origen, encryption_key: str):
+    """Genera los trozos de texto claro de un backup v2, verificando cada uno."""
+    cabecera = _leer_exacto(origen, len(MAGIC) + TAM_SAL)
+    if len(cabecera) != len(MAGIC) + TAM_SAL or not cabecera.startswith(MAGIC):
+        raise BackupCorruptoError("Cabecera de backup no reconocida")
+    aead = _derivar_clave(encryption_key, cabecera[len(MAGIC):])
+
+    contador = 0
+    while True:
+        marco = _leer_exacto(origen, _FRAME.size)
+        if len(marco) != _FRAME.size:
+            raise BackupCorruptoError("Backup truncado")
+        flag, longitud = _FRAME.unpack(marco)
+        if flag not in (0, 1) or longitud < _TAG or longitud > TAM_TROZO + _TAG:
+            raise BackupCorruptoError("Trozo de backup inválido")
+        cifrado = _leer_exacto(origen, longitud)
+        if len(cifrado) != longitud:
+            raise BackupCorruptoError("Backup truncado")
+        try:
+            yield aead.decrypt(_nonce(contador), cifrado, cabecera + bytes([flag]))
+        except Exception:
+            raise BackupCorruptoError("Backup manipulado o clave incorrecta")
+        contador += 1
+        if flag == 1:
+            break
+
+    if origen.read(1):
+        raise BackupCorruptoError("Datos inesperados tras el final del backup")
+
+
+def descifrar_flujo(origen, destino, encryption_key: str):
+    """Descifra un backup v2 de `origen` a `destino` (p. ej. la entrada de pg_restore)."""
+    for trozo in iterar_descifrado(origen, encryption_key):
+        destino.write(trozo)
+
+
+class _LectorDescifrado(io.RawIOBase):
+    def __init__(self, trozos):
+        self._trozos = trozos
+        self._actual = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._actual:
+            try:
+                self._actual = next(self._trozos)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._actual))
+        buffer[:n] = self._actual[:n]
+        self._actual = self._actual[n:]
+        return n
+
+
+def abrir_descifrado(origen, encryption_key: str) -> io.BufferedReader:
+    """Devuelve un objeto de lectura con el texto claro de un backup v2 (p. ej. para tarfile)."""
+    return io.BufferedReader(_LectorDescifrado(iterar_descifrado(origen, encryption_key)), TAM_TROZO)
+
+
+def verificar_flujo(origen, encryption_key: str):
+    """Recorre el backup completo comprobando su integridad sin guardar el contenido."""
+    for _ in iterar_descifrado(origen, encryption_key):
+        pass
+
+
+def es_formato_flujo(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def es_dump_sin_cifrar(path: str) -> bool:
+    """Dump de pg_dump en formato custom sin cifrar (cabecera 'PGDMP')."""
+    with open(path, "rb") as f:
+        return f.read(5) == b"PGDMP"
+
+
+def descifrar_legacy(path: str, encryption_key: str) -> bytes:
+    """Backups anteriores al formato v2: un único token Fernet (se descifra en memoria)."""
+    from cryptography.fernet import Fernet
+
+    with open(path, "rb") as f:
+        return Fernet(encryption_key.encode()).decrypt(f.read())
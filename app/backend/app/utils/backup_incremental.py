@@ -0,0 +1,209 @@
+"""
+Backups incrementales por captura lógica de cambios.
+
+Un delta contiene, para cada tabla con `updated_at`, las filas modificadas
+desde el backup anterior de la cadena y la lista completa de ids vivos (para
+detectar borrados). Las tablas de asociación (solo pares de ids) van enteras.
+Las de solo inserción (registro_cambios) llevan las filas de las transacciones
+que no habían terminado en el backup anterior: se comparan por txid con el
+horizonte (xmin de la instantánea) que guardó ese backup, así que no se pierde
+ninguna aunque confirme tarde. Toda tabla nueva tiene que encajar en uno de
+estos grupos o declararse derivada; si no, el delta falla en vez de omitirla.
+
+El contenido es JSON por líneas comprimido con gzip; el cifrado lo pone quien
+llama (ver backup_crypto). Primera línea: cabecera con la cadena a la que
+pertenece el delta.
+
+    {"tipo": "incremental", "base": ..., "anterior": ..., "desde": ..., "hasta": ..., "horizonte": ...}
+    {"t": "gatos", "fila": {...}}             (upsert, en orden de dependencias)
+    {"t": "campanas_gatos", "completa": [...]} (reemplazo completo)
+    {"t": "gatos", "ids": [...]}              (borrado de lo no listado, orden inverso)
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import DateTime, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import Base
+
+VERSION_DELTA = 1
+# Margen para no perder filas de transacciones que confirmaron justo después del corte
+SOLAPE = timedelta(minutes=5)
+TAM_LOTE = 5000
+
+
+# Tabla de solo inserción -> columna con el txid de la transacción que la escribió
+SOLO_INSERCION = {"registro_cambios": "transaccion"}
+# Se recalculan solas (triggers) al aplicar el delta: no se copian
+DERIVADAS = set()
+
+
+def _tablas():
+    """(con_updated_at, asociacion, solo_insercion) en orden de dependencias de claves foráneas."""
+    con_marca, asociacion, solo_insercion = [], [], []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name in DERIVADAS:
+            continue
+        if tabla.name in SOLO_INSERCION:
+            solo_insercion.append(tabla)
+        elif "updated_at" in tabla.c:
+            con_marca.append(tabla)
+        elif all(c.foreign_keys for c in tabla.primary_key.columns):
+            asociacion.append(tabla)
+        else:
+            raise RuntimeError(
+                f"La tabla {tabla.name} no tiene updated_at ni es de asociación: "
+                "declárala en SOLO_INSERCION o DERIVADAS (utils/backup_incremental.py)"
+            )
+    return con_marca, asociacion, solo_insercion
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def _linea(destino, obj):
+    destino.write(json.dumps(obj, default=_serializar, separators=(",", ":")).encode("utf-8") + b"\n")
+
+
+def ahora_utc(conn) -> datetime:
+    return conn.execute(text("SELECT timezone('utc', now())")).scalar()
+
+
+def horizonte_transacciones(conn) -> int:
+    """txid por debajo del cual todas las transacciones han terminado (xmin de la instantánea)."""
+    return conn.execute(text("SELECT txid_snapshot_xmin(txid_current_snapshot())")).scalar()
+
+
+def exportar_delta(engine, destino, desde: datetime, base: str, anterior: str,
+                   desde_horizonte: Optional[int] = None) -> Tuple[datetime, int]:
+    """
+    Escribe en `destino` (objeto binario de escritura) los cambios posteriores
+    a `desde`. Todo se lee en una única instantánea REPEATABLE READ. Devuelve
+    las marcas `hasta` y `horizonte` que debe usar el siguiente delta.
+    `desde_horizonte` es el horizonte del backup anterior; las cadenas que no
+    lo guardaron copian las tablas de solo inserción por fecha, con el solape.
+    """
+    con_marca, asociacion, solo_insercion = _tablas()
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        with conn.begin():
+            hasta = ahora_utc(conn)
+            horizonte = horizonte_transacciones(conn)
+            corte = desde - SOLAPE
+            with gzip.GzipFile(fileobj=destino, mode="wb") as gz:
+                _linea(gz, {
+                    "tipo": "incremental", "version": VERSION_DELTA, "base": base, "anterior": anterior,
+                    "desde": desde, "hasta": hasta, "horizonte": horizonte,
+                })
+                filtros = [(tabla, tabla.c.updated_at >= corte) for tabla in con_marca]
+                for tabla in solo_insercion:
+                    if desde_horizonte is not None:
+                        filtros.append((tabla, tabla.c[SOLO_INSERCION[tabla.name]] >= desde_horizonte))
+                    else:
+                        filtros.append((tabla, tabla.c.fecha >= corte))
+
+                for tabla, filtro in filtros:
+                    resultado = conn.execute(select(tabla).where(filtro).execution_options(stream_results=True))
+                    for lote in resultado.partitions(TAM_LOTE):
+                        for fila in lote:
+                            _linea(gz, {"t": tabla.name, "fila": dict(fila._mapping)})
+
+                for tabla in asociacion:
+                    pares = conn.execute(select(*tabla.primary_key.columns)).all()
+                    _linea(gz, {"t": tabla.name, "completa": [list(p) for p in pares]})
+
+                for tabla in reversed(con_marca):
+                    pk = list(tabla.primary_key.columns)[0]
+                    ids = conn.execute(select(pk)).scalars().all()
+                    _linea(gz, {"t": tabla.name, "ids": ids})
+    return hasta, horizonte
+
+
+def leer_cabecera(origen) -> dict:
+    """Lee solo la cabecera de un delta (`origen`: flujo ya descifrado)."""
+    with gzip.GzipFile(fileobj=origen, mode="rb") as gz:
+        cabecera = json.loads(gz.readline())
+    if cabecera.get("tipo") != "incremental":
+        raise ValueError("El archivo no es un backup incremental")
+    return cabecera
+
+
+def _conversor(tabla):
+    fechas = [c.name for c in tabla.columns if isinstance(c.type, DateTime)]
+
+    def convertir(fila: dict) -> dict:
+        for nombre in fechas:
+            if fila.get(nombre):
+                fila[nombre] = datetime.fromisoformat(fila[nombre])
+        return fila
+
+    return convertir
+
+
+def _volcar_upserts(conn, tabla, filas):
+    if not filas:
+        return
+    pk = [c.name for c in tabla.primary_key.columns]
+    stmt = insert(tabla)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=pk,
+        set_={c.name: stmt.excluded[c.name] for c in tabla.columns if c.name not in pk},
+    )
+    conn.execute(stmt, filas)
+
+
+def aplicar_delta(conn, origen):
+    """
+    Reproduce un delta sobre `conn` (dentro de la transacción del llamante).
+    Es idempotente: aplicar dos veces el mismo delta deja el mismo estado.
+    """
+    tablas = {t.name: t for t in Base.metadata.sorted_tables}
+    conversores = {nombre: _conversor(t) for nombre, t in tablas.items()}
+    pendientes, actual = [], None
+
+    with gzip.GzipFile(fileobj=origen, mode="rb") as gz:
+        cabecera = json.loads(gz.readline())
+        if cabecera.get("version") != VERSION_DELTA:
+            raise ValueError("Versión de delta no soportada")
+
+        for linea in gz:
+            entrada = json.loads(linea)
+            tabla = tablas[entrada["t"]]
+
+            if "fila" in entrada:
+                if actual is not tabla or len(pendientes) >= TAM_LOTE:
+                    _volcar_upserts(conn, actual, pendientes)
+                    pendientes, actual = [], tabla
+                pendientes.append(conversores[tabla.name](entrada["fila"]))
+                continue
+
+            _volcar_upserts(conn, actual, pendientes)
+            pendientes, actual = [], None
+
+            if "completa" in entrada:
+                columnas = [c.name for c in tabla.primary_key.columns]
+                conn.execute(delete(tabla))
+                filas = [dict(zip(columnas, par)) for par in entrada["completa"]]
+                if filas:
+                    conn.execute(insert(tabla).on_conflict_do_nothing(), filas)
+            elif "ids" in entrada:
+                # ANY(array) en vez de IN: un único parámetro aunque haya millones de ids
+                pk = list(tabla.primary_key.columns)[0].name
+                conn.execute(text(f"DELETE FROM {tabla.name} WHERE NOT ({pk} = ANY(:ids))"), {"ids": entrada["ids"]})
+
+        _volcar_upserts(conn, actual, pendientes)
+
+    # Las filas llegan con id explícito: alinear las secuencias
+    for tabla in tablas.values():
+        if "id" in tabla.c and ("updated_at" in tabla.c or tabla.name in SOLO_INSERCION):
+            conn.execute(
+                select(func.setval(
+                    func.pg_get_serial_sequence(tabla.name, "id"),
+                    select(func.coalesce(func.max(tabla.c.id), 1)).scalar_subquery(),
+                ))
+            )
@@ -0,0 +1,50 @@
+"""
+Caché en Redis compartida por los workers.
+
+Es solo una optimización: si Redis no está disponible las lecturas devuelven
+None y las escrituras se ignoran, y el llamante recalcula desde la BD.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+import redis
+
+from app.utils.logger import get_logger
+
+logger = get_logger("cache")
+
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    # Timeouts cortos: una caché caída no debe bloquear la petición
+    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def leer_json(claves: List[str]) -> List[Optional[object]]:
+    """Valores de `claves` (None si falta alguno o si Redis no responde)."""
+    if not claves:
+        return []
+    try:
+        valores = get_redis().mget(claves)
+    except redis.RedisError as e:
+        logger.warning(f"Caché no disponible: {e}")
+        return [None] * len(claves)
+    return [json.loads(v) if v is not None else None for v in valores]
+
+
+def guardar_json(valores: dict, ttl: int):
+    """Guarda {clave: valor} con caducidad en segundos."""
+    if not valores:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for clave, valor in valores.items():
+            pipe.setex(clave, ttl, json.dumps(valor))
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"No se pudo escribir en la caché: {e}")
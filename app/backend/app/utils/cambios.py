@@ -0,0 +1,131 @@
+"""
+Registro de cambios (registro_cambios): una entrada compacta por fila escrita
+(tabla, clave, operación, columnas cambiadas y usuario) en la misma
+transacción que el cambio, para que cachés, clientes sin conexión y copias
+incrementales sincronicen solo lo que cambió.
+
+Las escrituras del ORM se recogen solas en after_flush, incluidas las
+relaciones muchos-a-muchos (colonia.usuarios.append(...)). Las masivas con
+Core (INSERT ... ON CONFLICT, UPDATE ... FROM VALUES) no pasan por la sesión:
+llaman a registrar_cambios() con las claves que devuelve su RETURNING.
+
+El usuario sale de `usuario_actual`, que fija el middleware de main.py a
+partir del token; en las tareas del planificador queda a None.
+
+GET /api/changes sirve el registro en orden de transacción: cada entrada
+guarda txid_current() y solo se devuelven las de transacciones anteriores al
+xmin de la instantánea (todas terminadas), así que una transacción larga que
+confirme tarde nunca queda por detrás del cursor de un cliente.
+"""
+from contextvars import ContextVar
+from typing import Iterable, List, Optional
+
+from fastapi import Request
+from fastapi_jwt_auth import AuthJWT
+from sqlalchemy import event, insert, inspect
+
+from app.database import SessionLocal
+from app.models import RegistroCambio
+
+# Tablas internas o derivadas que no interesan a quien sincroniza
+EXCLUIDAS = {
+    "registro_cambios", "correos_pendientes", "notificaciones", "lotes_importacion",
+}
+# Solo cambia con cualquier otra columna: no cuenta como cambio por sí sola
+IGNORADAS = {"updated_at"}
+
+usuario_actual: ContextVar[Optional[int]] = ContextVar("usuario_actual", default=None)
+
+
+def usuario_del_token(request: Request) -> Optional[int]:
+    """Id del token de la petición, si lo hay y es válido (sin consultar la BD)."""
+    if "authorization" not in request.headers:
+        return None
+    try:
+        Authorize = AuthJWT(req=request)
+        Authorize.jwt_optional()
+        sujeto = Authorize.get_jwt_subject()
+        return int(sujeto) if sujeto is not None else None
+    except Exception:
+        # La validación de verdad la hace cada ruta; aquí solo se anota quién escribe
+        return None
+
+
+def _clave(valores) -> str:
+    return ",".join(str(v) for v in valores) if isinstance(valores, (tuple, list)) else str(valores)
+
+
+def registrar_cambios(db, tabla: str, pks: Iterable, op: str, campos: Optional[List[str]] = None) -> int:
+    """
+    Para escrituras con Core, que no pasan por after_flush: una entrada por
+    clave de `pks` (las compuestas como tupla). No hace commit.
+    """
+    usuario = usuario_actual.get()
+    filas = [
+        {"tabla": tabla, "pk": _clave(pk), "op": op, "campos": campos, "usuario_id": usuario}
+        for pk in dict.fromkeys(pks)
+    ]
+    if filas:
+        db.execute(insert(RegistroCambio.__table__), filas)
+    return len(filas)
+
+
+def _entradas_secundarias(estado, entradas: dict):
+    """Altas y bajas en tablas muchos-a-muchos a partir del historial de las colecciones."""
+    for relacion in estado.mapper.relationships:
+        tabla = relacion.secondary
+        if tabla is None or relacion.viewonly or tabla.name in EXCLUIDAS:
+            continue
+        historial = estado.attrs[relacion.key].history  # no carga colecciones sin cargar
+        if not historial.added and not historial.deleted:
+            continue
+        propios = {
+            secundaria.name: estado.attrs[estado.mapper.get_property_by_column(local).key].value
+            for local, secundaria in relacion.synchronize_pairs
+        }
+        for op, objetos in (("insert", historial.added), ("delete", historial.deleted)):
+            for objeto in objetos:
+                destino = inspect(objeto)
+                valores = {
+                    **propios,
+                    **{
+                        secundaria.name: destino.attrs[destino.mapper.get_property_by_column(remota).key].value
+                        for remota, secundaria in relacion.secondary_synchronize_pairs
+                    },
+                }
+                pk = _clave([valores[c.name] for c in tabla.primary_key.columns])
+                # Las dos puntas de la relación (colonia.usuarios y user.colonias) dan la misma fila
+                entradas[(tabla.name, pk, op)] = None
+
+
+def _registrar_flush(session, contexto):
+    entradas = {}  # (tabla, pk, op) -> campos
+    for op, objetos in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for objeto in objetos:
+            estado = inspect(objeto)
+            tabla = estado.mapper.local_table.name
+            if tabla in EXCLUIDAS:
+                continue
+            if op != "delete":
+                _entradas_secundarias(estado, entradas)
+
+            campos = None
+            if op == "update":
+                campos = [
+                    atributo.columns[0].name
+                    for atributo in estado.mapper.column_attrs
+                    if atributo.columns[0].name not in IGNORADAS and estado.attrs[atributo.key].history.has_changes()
+                ]
+                if not campos:
+                    continue
+            entradas[(tabla, _clave(estado.mapper.primary_key_from_instance(objeto)), op)] = campos
+
+    if entradas:
+        usuario = usuario_actual.get()
+        session.connection().execute(insert(RegistroCambio.__table__), [
+            {"tabla": tabla, "pk": pk, "op": op, "campos": campos, "usuario_id": usuario}
+            for (tabla, pk, op), campos in entradas.items()
+        ])
+
+
+event.listen(SessionLocal, "after_flush", _registrar_flush)
@@ -0,0 +1,129 @@
+"""
+Asociación automática de gatos a campañas según su fecha de esterilización.
+
+Las campañas se guardan en memoria como intervalos [fecha_inicio, fecha_fin]
+ordenados por inicio (una campaña sin fecha_fin sigue abierta). Un gato va a
+la campaña con el inicio más reciente que contenga su fecha. El índice se
+reconstruye solo cuando cambian los intervalos de la tabla campanas.
+
+Los enlaces se insertan de una vez (ON CONFLICT DO NOTHING) y
+`Campana.gatos_esterilizados` se incrementa solo con los enlaces nuevos, sin
+cargar la colección `campana.gatos`.
+"""
+import threading
+from bisect import bisect_right
+from collections import Counter
+from datetime import date, datetime, time, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import Integer, column, func, literal_column, select, update, values
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+
+from app.models import Campana, campanas_gatos
+from app.utils.cambios import registrar_cambios
+
+_SIN_FIN = datetime.max
+
+
+def _como_datetime(fecha) -> datetime:
+    """datetime sin zona (UTC, como las fechas de campanas) a partir de date, datetime, Timestamp o texto ISO."""
+    if not isinstance(fecha, datetime):
+        if isinstance(fecha, date):
+            fecha = datetime.combine(fecha, time.min)
+        elif isinstance(fecha, (int, float)):
+            # pd.Timestamp los tomaría como nanosegundos desde 1970
+            raise ValueError(f"Fecha no válida: {fecha!r}")
+        else:
+            import pandas as pd  # Solo para str, numpy.datetime64, etc.; no se carga al arrancar
+
+            try:
+                fecha = pd.Timestamp(fecha).to_pydatetime()
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Fecha no válida: {fecha!r}") from e
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+class IndiceCampanas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # (inicios, ids, fines, max_fin_hasta[i]) ordenados por fecha_inicio
+        self._datos = ([], [], [], [])
+
+    @staticmethod
+    def _version_actual(db) -> Optional[str]:
+        # Huella de los intervalos: cambia al crear, borrar o mover fechas de una campaña
+        firma = func.concat_ws(":", Campana.id, Campana.fecha_inicio, Campana.fecha_fin)
+        return db.execute(
+            select(func.md5(func.string_agg(firma, aggregate_order_by(literal_column("','"), Campana.id))))
+        ).scalar()
+
+    def actualizar(self, db):
+        version = self._version_actual(db)
+        if version == self._version:
+            return
+        filas = db.execute(
+            select(Campana.id, Campana.fecha_inicio, Campana.fecha_fin).order_by(Campana.fecha_inicio, Campana.id)
+        ).all()
+        inicios, ids, fines, max_fin = [], [], [], []
+        maximo = datetime.min
+        for campana_id, inicio, fin in filas:
+            fin = fin or _SIN_FIN
+            maximo = max(maximo, fin)
+            inicios.append(inicio)
+            ids.append(campana_id)
+            fines.append(fin)
+            max_fin.append(maximo)
+        with self._lock:
+            self._datos = (inicios, ids, fines, max_fin)
+            self._version = version
+
+    def buscar(self, fecha) -> Optional[int]:
+        """Campaña con el inicio más reciente que contiene `fecha`, o None."""
+        if fecha is None:
+            return None
+        fecha = _como_datetime(fecha)
+        inicios, ids, fines, max_fin = self._datos
+        i = bisect_right(inicios, fecha) - 1
+        # max_fin permite parar en cuanto ninguna campaña anterior llega a la fecha
+        while i >= 0 and max_fin[i] >= fecha:
+            if fines[i] >= fecha:
+                return ids[i]
+            i -= 1
+        return None
+
+
+indice_campanas = IndiceCampanas()
+
+
+def asociar_por_esterilizacion(db, fechas: Dict[int, object]) -> int:
+    """
+    Enlaza cada gato ({gato_id: fecha_esterilizacion}) con su campaña. No hace
+    commit: va en la transacción del llamante. Devuelve los enlaces nuevos.
+    """
+    indice_campanas.actualizar(db)
+    filas = []
+    for gato_id, fecha in fechas.items():
+        campana_id = indice_campanas.buscar(fecha)
+        if campana_id is not None:
+            filas.append({"campana_id": campana_id, "gato_id": gato_id})
+    if not filas:
+        return 0
+
+    enlaces = db.execute(
+        insert(campanas_gatos).values(filas).on_conflict_do_nothing()
+        .returning(campanas_gatos.c.campana_id, campanas_gatos.c.gato_id)
+    ).all()
+    registrar_cambios(db, "campanas_gatos", [tuple(e) for e in enlaces], "insert")
+    nuevos = Counter(campana_id for campana_id, _ in enlaces)
+    if nuevos:
+        incrementos = values(column("id", Integer), column("n", Integer), name="v").data(list(nuevos.items()))
+        db.execute(
+            update(Campana.__table__)
+            .where(Campana.id == incrementos.c.id)
+            .values(gatos_esterilizados=func.coalesce(Campana.gatos_esterilizados, 0) + incrementos.c.n)
+        )
+        registrar_cambios(db, "campanas", list(nuevos), "update", ["gatos_esterilizados"])
+    return sum(nuevos.values())
@@ -0,0 +1,162 @@
+"""
+Peticiones condicionales (ETag / Last-Modified) para los listados de lectura.
+
+Cada tabla de TABLAS_VERSIONADAS tiene una secuencia <tabla>_version_seq que
+un trigger por sentencia avanza con cada INSERT/UPDATE/DELETE/TRUNCATE. El
+ETag (débil) de un listado es un hash de las versiones de las tablas que lee,
+de la URL completa (filtros y paginación) y, si depende del usuario, de su id.
+Comprobar If-None-Match cuesta dos consultas pequeñas; si coincide se responde
+304 sin ejecutar el listado.
+
+nextval() es visible antes del commit: si se sirviera el ETag nuevo con los
+datos de antes, el cliente se quedaría con ellos hasta la siguiente escritura.
+Por eso, mientras alguna transacción tenga escrituras sin confirmar en esas
+tablas (el trigger toma un advisory lock compartido hasta el commit), la
+respuesta va sin ETag. Last-Modified es max(updated_at) y solo informa: no
+cubre borrados ni transacciones que confirman tarde, así que If-Modified-Since
+no da 304 en estos listados.
+
+    @router.get("/colonias/")
+    def listar_colonias(..., cache: dict = Depends(Condicional("colonias", "gatos"))):
+        ...
+        return respuesta_proyeccion(filas, cabeceras=cache)  # si se devuelve un Response propio
+
+La dependencia ya pone las cabeceras en la respuesta normal; solo hay que
+pasarlas a mano cuando la ruta construye su propio Response.
+"""
+import hashlib
+from datetime import datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi_jwt_auth import AuthJWT
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.database import Base, get_db
+from app.models import LOCK_VERSIONES, TABLAS_VERSIONADAS, secuencia_version
+
+# Revalidar siempre (no-cache) y no guardar en cachés compartidas: hay datos por usuario
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_debil(*partes) -> str:
+    return 'W/"' + hashlib.sha1("|".join(str(p) for p in partes).encode()).hexdigest() + '"'
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    # Comparación débil: se ignora el prefijo W/
+    valor = etag[2:]
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or (candidato[2:] if candidato.startswith("W/") else candidato) == valor:
+            return True
+    return False
+
+
+def _no_modificado_desde(if_modified_since: str, modificado: datetime) -> bool:
+    try:
+        fecha = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if fecha.tzinfo is None:
+        return False
+    # HTTP-date tiene resolución de segundos
+    return modificado.replace(microsecond=0) <= fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def responder_condicional(request: Request, etag: str, modificado: Optional[datetime] = None,
+                          validar_fecha: bool = True) -> Dict[str, str]:
+    """
+    Cabeceras de validación; lanza 304 si el cliente ya tiene esa versión.
+    `modificado` en UTC sin zona; con validar_fecha=False solo se informa.
+    """
+    cabeceras = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if modificado is not None:
+        cabeceras["Last-Modified"] = format_datetime(modificado.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match manda sobre If-Modified-Since (RFC 9110, 13.2.2)
+        no_modificado = _coincide(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        no_modificado = bool(
+            validar_fecha and if_modified_since and modificado and _no_modificado_desde(if_modified_since, modificado)
+        )
+    if no_modificado:
+        raise HTTPException(status_code=304, headers=cabeceras)
+    return cabeceras
+
+
+class Condicional:
+    """
+    Dependencia para listados que leen `tablas`: 304 si el cliente ya tiene la
+    versión actual; si no, pone y devuelve las cabeceras ETag/Last-Modified
+    (sin ETag mientras haya escrituras sin confirmar en esas tablas).
+    por_usuario: el resultado depende del usuario del token (lo exige).
+    por_dia: el resultado cambia al cambiar de día aunque no haya escrituras
+    (p. ej. el estatus de las campañas, derivado de current_date).
+    """
+
+    def __init__(self, *tablas: str, por_usuario: bool = False, por_dia: bool = False):
+        desconocidas = set(tablas) - set(TABLAS_VERSIONADAS)
+        if desconocidas:
+            raise ValueError(f"Tablas sin versión: {sorted(desconocidas)}")
+        self.tablas = sorted(tablas)
+        self._ultimas = [
+            select(func.max(tabla.c.updated_at)).scalar_subquery()
+            for tabla in (Base.metadata.tables[t] for t in self.tablas) if "updated_at" in tabla.c
+        ]
+        self.por_usuario = por_usuario
+        self.por_dia = por_dia
+
+    def __call__(
+        self,
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_db),
+        Authorize: AuthJWT = Depends(),
+    ) -> Dict[str, str]:
+        usuario = None
+        if self.por_usuario:
+            Authorize.jwt_required()
+            usuario = Authorize.get_jwt_subject()
+
+        secuencias = {secuencia_version(t): t for t in self.tablas}
+        filas = db.execute(
+            text(
+                "SELECT sequencename, last_value FROM pg_sequences"
+                " WHERE schemaname = current_schema() AND sequencename = ANY(:secuencias)"
+            ),
+            {"secuencias": list(secuencias)},
+        ).all()
+        # Después de leer las versiones: una escritura sin confirmar pudo avanzarlas ya
+        if self._escrituras_en_curso(db):
+            response.headers["Cache-Control"] = CACHE_CONTROL
+            return {"Cache-Control": CACHE_CONTROL}
+
+        versiones = {secuencias[f.sequencename]: f.last_value or 0 for f in filas}
+        partes = [f"{t}:{versiones.get(t, 0)}" for t in self.tablas] + [str(request.url), usuario]
+        # max(updated_at) sale del índice de updated_at; greatest() ignora los NULL
+        modificado = db.execute(select(func.greatest(*self._ultimas))).scalar() if self._ultimas else None
+        if self.por_dia:
+            hoy = datetime.utcnow().date()
+            partes.append(hoy)
+            inicio_dia = datetime.combine(hoy, time.min)
+            modificado = max(modificado, inicio_dia) if modificado else inicio_dia
+
+        cabeceras = responder_condicional(request, etag_debil(*partes), modificado, validar_fecha=False)
+        response.headers.update(cabeceras)
+        return cabeceras
+
+    def _escrituras_en_curso(self, db) -> bool:
+        return db.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory'"
+                " AND classid = CAST(:clave AS oid) AND objsubid = 2 AND pid <> pg_backend_pid()"
+                " AND objid IN (SELECT to_regclass(t)::oid FROM unnest(CAST(:tablas AS text[])) AS t))"
+            ),
+            {"clave": LOCK_VERSIONES, "tablas": self.tablas},
+        ).scalar()
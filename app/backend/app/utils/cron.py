@@ -0,0 +1,74 @@
+"""
+Expresiones cron mínimas (5 campos: minuto hora día-mes mes día-semana).
+
+Admite `*`, listas (`1,15`), rangos (`1-5`) y pasos (`*/15`, `0-30/10`).
+El día de la semana va de 0 (domingo) a 6; 7 también es domingo. Como en
+cron, si se restringen día del mes y día de la semana basta con que se
+cumpla uno de los dos.
+"""
+from datetime import datetime, timedelta
+
+_RANGOS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+# Un año bisiesto completo de minutos: si no hay coincidencia, la expresión es imposible
+_MAX_MINUTOS = 366 * 24 * 60 * 4
+
+
+def _parsear_campo(campo: str, minimo: int, maximo: int) -> set:
+    valores = set()
+    for parte in campo.split(","):
+        paso = 1
+        if "/" in parte:
+            parte, paso_txt = parte.split("/", 1)
+            paso = int(paso_txt)
+            if paso < 1:
+                raise ValueError(f"Paso no válido en '{campo}'")
+        if parte == "*":
+            inicio, fin = minimo, maximo
+        elif "-" in parte:
+            inicio, fin = (int(x) for x in parte.split("-", 1))
+        else:
+            inicio = int(parte)
+            fin = maximo if paso > 1 else inicio
+        if inicio < minimo or fin > maximo or inicio > fin:
+            raise ValueError(f"Valor fuera de rango en '{campo}' ({minimo}-{maximo})")
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class Cron:
+    def __init__(self, expresion: str):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expresión cron no válida: '{expresion}' (se esperan 5 campos)")
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+            _parsear_campo(c, *r) for c, r in zip(campos, _RANGOS)
+        )
+        self.dias_semana = {d % 7 for d in dias_semana}
+        self._dia_libre = campos[2] == "*"
+        self._semana_libre = campos[4] == "*"
+
+    def _coincide_dia(self, momento: datetime) -> bool:
+        en_dia = momento.day in self.dias
+        # isoweekday: lunes=1 ... domingo=7 -> cron: domingo=0
+        en_semana = momento.isoweekday() % 7 in self.dias_semana
+        if self._dia_libre or self._semana_libre:
+            return en_dia and en_semana
+        return en_dia or en_semana
+
+    def siguiente(self, desde: datetime) -> datetime:
+        """Primer instante que cumple la expresión estrictamente posterior a `desde`."""
+        momento = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(_MAX_MINUTOS):
+            if momento.month not in self.meses:
+                # Saltar al primer día del mes siguiente
+                momento = (momento.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._coincide_dia(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            elif momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+        raise ValueError(f"La expresión cron '{self.expresion}' nunca se cumple")
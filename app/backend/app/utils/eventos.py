@@ -0,0 +1,84 @@
+"""
+Eventos en tiempo real (quejas, inspecciones y partes creados o resueltos)
+repartidos entre workers con pub/sub de Redis.
+
+Cada evento se publica en el canal de su colonia, en el de los usuarios
+implicados y en el global (administración), siempre después del commit para
+que nadie reciba avisos de algo que luego se deshace. routes/eventos.py los
+reenvía por SSE a cada cliente según su rol y sus colonias (usuarios_colonias).
+
+Igual que la caché, es una mejora: si Redis no está disponible se registra y
+la petición sigue; los clientes recuperan el estado al recargar.
+"""
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.utils.cache import REDIS_HOST, REDIS_PORT, get_redis
+from app.utils.logger import get_logger
+
+logger = get_logger("eventos")
+
+CANAL_GLOBAL = "eventos:todos"
+# Sin eventos en ese tiempo se manda un comentario: mantiene viva la conexión a través de proxies
+KEEPALIVE_SEGUNDOS = 15
+
+
+def canal_colonia(colonia_id: int) -> str:
+    return f"eventos:colonia:{colonia_id}"
+
+
+def canal_usuario(usuario_id: int) -> str:
+    return f"eventos:usuario:{usuario_id}"
+
+
+def publicar(tipo: str, accion: str, id: int, colonia_id: Optional[int] = None, usuario_ids: Iterable[int] = ()):
+    """Publica {tipo, accion, id, colonia_id} (p. ej. queja/creada). Llamar tras el commit."""
+    evento = json.dumps({
+        "tipo": tipo,
+        "accion": accion,
+        "id": id,
+        "colonia_id": colonia_id,
+        "fecha": datetime.utcnow().isoformat(),
+    })
+    canales = [CANAL_GLOBAL]
+    if colonia_id is not None:
+        canales.append(canal_colonia(colonia_id))
+    canales += [canal_usuario(u) for u in set(usuario_ids) if u is not None]
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for canal in canales:
+            pipe.publish(canal, evento)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"No se pudo publicar el evento {tipo}/{accion} {id}: {e}")
+
+
+async def suscribir(canales: List[str]):
+    """Cliente y suscripción propios de una conexión SSE. Lanza RedisError si Redis no responde."""
+    cliente = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, socket_connect_timeout=2)
+    pubsub = cliente.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(*canales)
+    except Exception:
+        await pubsub.aclose()
+        await cliente.aclose()
+        raise
+    return cliente, pubsub
+
+
+async def escuchar(cliente, pubsub) -> AsyncIterator[Optional[str]]:
+    """Eventos (JSON) según llegan; None cada KEEPALIVE_SEGUNDOS sin actividad. Cierra todo al terminar."""
+    try:
+        while True:
+            mensaje = await pubsub.get_message(timeout=KEEPALIVE_SEGUNDOS)
+            if mensaje is None:
+                yield None
+            elif mensaje["type"] == "message":
+                yield mensaje["data"].decode()
+    finally:
+        await pubsub.aclose()
+        await cliente.aclose()
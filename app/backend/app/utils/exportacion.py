@@ -0,0 +1,129 @@
+"""
+Exportación por lotes de tablas completas con memoria constante.
+
+Las filas se leen con un cursor de servidor (stream_results: cursor con nombre
+de psycopg2) en lotes de TAM_LOTE y cada lote se serializa y se envía antes de
+leer el siguiente, así que ni la BD ni la API materializan el resultado.
+
+    StreamingResponse(exportar_parquet(select(Gato.__table__)), ...)
+
+pyarrow solo se importa al exportar a Parquet/Arrow.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Iterator, List
+
+from sqlalchemy import Boolean, DateTime, Float, Integer
+
+from app.database import engine
+
+TAM_LOTE = 5000
+
+
+def leer_por_lotes(consulta, tam_lote: int = TAM_LOTE) -> Iterator[List[tuple]]:
+    """Lotes de filas de `consulta` leídos con un cursor de servidor en su propia conexión."""
+    with engine.connect() as conexion:
+        resultado = conexion.execution_options(stream_results=True, max_row_buffer=tam_lote).execute(consulta)
+        for lote in resultado.partitions(tam_lote):
+            yield lote
+
+
+def _tipo_arrow(pa, columna):
+    tipo = columna.type
+    if isinstance(tipo, Boolean):
+        return pa.bool_()
+    if isinstance(tipo, Integer):
+        return pa.int64()
+    if isinstance(tipo, Float):
+        return pa.float64()
+    if isinstance(tipo, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _esquema(pa, consulta):
+    return pa.schema([pa.field(c.name, _tipo_arrow(pa, c)) for c in consulta.selected_columns])
+
+
+class _Buzon(io.RawIOBase):
+    """Destino de escritura que acumula lo escrito hasta que el generador lo recoge."""
+
+    def __init__(self):
+        self._trozos = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._trozos.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self) -> bytes:
+        datos, self._trozos = b"".join(self._trozos), []
+        return datos
+
+
+def _exportar_arrow(consulta, abrir_escritor) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    esquema = _esquema(pa, consulta)
+    buzon = _Buzon()
+    escritor = abrir_escritor(buzon, esquema)
+    for lote in leer_por_lotes(consulta):
+        columnas = list(zip(*lote))
+        escritor.write_batch(pa.record_batch(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema,
+        ))
+        yield buzon.vaciar()
+    escritor.close()
+    yield buzon.vaciar()
+
+
+def exportar_parquet(consulta) -> Iterator[bytes]:
+    """Un row group por lote; el pie del fichero se escribe al final."""
+    import pyarrow.parquet as pq
+
+    return _exportar_arrow(
+        consulta, lambda destino, esquema: pq.ParquetWriter(destino, esquema, compression="zstd")
+    )
+
+
+def exportar_arrow(consulta) -> Iterator[bytes]:
+    """Formato de flujo IPC de Arrow (.arrows): se puede leer según llega."""
+    import pyarrow as pa
+
+    return _exportar_arrow(consulta, lambda destino, esquema: pa.ipc.new_stream(destino, esquema))
+
+
+def _valor_csv(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=" ")
+    return "" if valor is None else valor
+
+
+def exportar_csv(consulta) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([c.name for c in consulta.selected_columns])
+    for lote in leer_por_lotes(consulta):
+        escritor.writerows([_valor_csv(v) for v in fila] for fila in lote)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+# formato -> (generador, media type, extensión)
+FORMATOS = {
+    "parquet": (exportar_parquet, "application/vnd.apache.parquet", "parquet"),
+    "arrow": (exportar_arrow, "application/vnd.apache.arrow.stream", "arrows"),
+    "csv": (exportar_csv, "text/csv; charset=utf-8", "csv"),
+}
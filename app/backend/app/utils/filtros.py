@@ -0,0 +1,114 @@
+"""
+Filtros y orden del listado de gatos, resueltos en SQL.
+
+Se usa como dependencia de FastAPI:
+
+    def get_gatos(filtros: FiltrosGatos = Depends(), ...):
+        query = filtros.aplicar(db.query(Gato))
+
+    ?colonia_id=3&colonia_id=7&sexo=H&esterilizado=false
+    &vacunacion_desde=2024-01-01&orden=-fecha_vacunacion,nombre
+
+Solo se puede ordenar por las columnas de ORDENES_GATOS (todas indexadas o
+baratas); el id se añade siempre al final para que la paginación sea estable.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException, Query
+
+from app.models import Gato
+
+ORDENES_GATOS = {
+    "id": Gato.id,
+    "nombre": Gato.nombre,
+    "colonia_id": Gato.colonia_id,
+    "fecha_vacunacion": Gato.fecha_vacunacion,
+    "fecha_esterilizacion": Gato.fecha_esterilizacion,
+    "fecha_desparasitacion": Gato.fecha_desparasitacion,
+    "updated_at": Gato.updated_at,
+}
+SEXOS = ("M", "H")
+
+
+def _inicio(d: date) -> datetime:
+    return datetime.combine(d, time.min)
+
+
+class FiltrosGatos:
+    def __init__(
+        self,
+        colonia_id: Optional[List[int]] = Query(None, description="Una o varias colonias"),
+        sexo: Optional[str] = Query(None, description="M o H"),
+        esterilizado: Optional[bool] = None,
+        vacunado: Optional[bool] = None,
+        adoptabilidad: Optional[List[str]] = Query(None),
+        vacunacion_desde: Optional[date] = None,
+        vacunacion_hasta: Optional[date] = None,
+        esterilizacion_desde: Optional[date] = None,
+        esterilizacion_hasta: Optional[date] = None,
+        incluir_inactivos: bool = False,
+        orden: Optional[str] = Query(None, description="Columnas separadas por comas; '-' para descendente"),
+    ):
+        if sexo is not None and sexo.upper() not in SEXOS:
+            raise HTTPException(status_code=400, detail="sexo debe ser 'M' o 'H'")
+        self.colonia_id = colonia_id
+        self.sexo = sexo.upper() if sexo else None
+        self.esterilizado = esterilizado
+        self.vacunado = vacunado
+        self.adoptabilidad = adoptabilidad
+        self.vacunacion = (vacunacion_desde, vacunacion_hasta)
+        self.esterilizacion = (esterilizacion_desde, esterilizacion_hasta)
+        self.incluir_inactivos = incluir_inactivos
+        self.orden = self._parsear_orden(orden)
+
+    @staticmethod
+    def _parsear_orden(orden: Optional[str]):
+        columnas, nombres = [], set()
+        for campo in (orden or "").split(","):
+            campo = campo.strip()
+            if not campo:
+                continue
+            descendente = campo.startswith("-")
+            nombre = campo.lstrip("-+")
+            if nombre not in ORDENES_GATOS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"No se puede ordenar por '{nombre}'. Opciones: {', '.join(ORDENES_GATOS)}",
+                )
+            # Orden de nulos por defecto de PostgreSQL: coincide con los índices btree
+            columna = ORDENES_GATOS[nombre]
+            columnas.append(columna.desc() if descendente else columna.asc())
+            nombres.add(nombre)
+        if "id" not in nombres:
+            columnas.append(Gato.id.asc())
+        return columnas
+
+    def condiciones(self) -> list:
+        """Condiciones WHERE (sirven igual para Query del ORM que para select() de Core)."""
+        condiciones = []
+        if not self.incluir_inactivos:
+            condiciones.append(Gato.activo == True)
+        if self.colonia_id:
+            condiciones.append(Gato.colonia_id.in_(self.colonia_id))
+        if self.sexo:
+            condiciones.append(Gato.sexo == self.sexo)
+        if self.esterilizado is not None:
+            condiciones.append(Gato.fecha_esterilizacion.isnot(None) if self.esterilizado else Gato.fecha_esterilizacion.is_(None))
+        if self.vacunado is not None:
+            condiciones.append(Gato.fecha_vacunacion.isnot(None) if self.vacunado else Gato.fecha_vacunacion.is_(None))
+        if self.adoptabilidad:
+            condiciones.append(Gato.adoptabilidad.in_(self.adoptabilidad))
+        for columna, (desde, hasta) in (
+            (Gato.fecha_vacunacion, self.vacunacion),
+            (Gato.fecha_esterilizacion, self.esterilizacion),
+        ):
+            # Rangos semiabiertos sobre DateTime: 'hasta' incluye el día completo
+            if desde:
+                condiciones.append(columna >= _inicio(desde))
+            if hasta:
+                condiciones.append(columna < _inicio(hasta) + timedelta(days=1))
+        return condiciones
+
+    def aplicar(self, query):
+        return query.filter(*self.condiciones()).order_by(*self.orden)
@@ -0,0 +1,329 @@
+"""
+Limpieza del CSV de censo antes de importarlo, por columnas.
+
+Todas las transformaciones son operaciones vectorizadas de pandas sobre la
+columna entera (nada de bucles fila a fila en Python):
+
+    df = pd.read_csv(..., dtype=str)
+    limpio = limpiar_censo(df)
+    validos = limpio[limpio["motivo"].isna()]
+
+El resultado tiene una columna por campo del modelo Gato, con None en lugar
+de NaN/NaT (listo para el ORM o para un INSERT), y `motivo` con la razón por
+la que se descarta la fila (None si es válida).
+
+Cada municipio exporta su censo a su manera: los perfiles de importación
+(modelo PerfilImportacion) guardan el mapa de columnas, codificación,
+delimitador, fila de cabecera, formato de fecha y colonia destino, y
+`detectar_formato` elige el que encaja con las primeras líneas del fichero.
+Las filas descartadas se devuelven en un CSV de errores descargable.
+
+La escritura va por trozos de TAM_TROZO filas con `INSERT ... ON CONFLICT
+(codigo_identificacion) DO UPDATE`; cada trozo se confirma junto con el punto
+de control de su LoteImportacion (clave: hash del fichero), así que volver a
+subir el mismo fichero continúa donde se quedó y nunca repite trabajo hecho.
+Si la base de datos rechaza un trozo, sus filas se reintentan una a una (cada
+una en su SAVEPOINT); las que fallan se guardan en el lote con el trozo y pasan
+al fichero de errores, aunque la importación termine en otro intento.
+
+Importa pandas al cargarse: importarlo solo dentro de la ruta de importación.
+"""
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+from typing import Dict, List, NamedTuple, Optional
+from uuid import uuid4
+
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+
+from app.models import Gato, LoteImportacion, PerfilImportacion
+from app.utils.cambios import registrar_cambios
+from app.utils.campanas import asociar_por_esterilizacion
+from app.utils.microchip import LONGITUD_CHIP, es_chip_valido
+
+# Cabecera del CSV -> campo de Gato (formato de importar-csv y exportar-csv)
+COLUMNAS_CENSO = {
+    "Nombre": "nombre",
+    "Raza": "raza",
+    "Sexo": "sexo",
+    "Fe.Vacunación": "fecha_vacunacion",
+    "Fe.Desparasitación": "fecha_desparasitacion",
+    "Fe.Esterilización": "fecha_esterilizacion",
+    "Código de identificación": "codigo_identificacion",
+}
+CAMPOS_TEXTO = ["nombre", "raza"]
+CAMPOS_FECHA = ["fecha_vacunacion", "fecha_desparasitacion", "fecha_esterilizacion"]
+
+SEXOS = {
+    "macho": "M", "m": "M", "male": "M", "varón": "M",
+    "hembra": "H", "h": "H", "female": "H", "mujer": "H",
+}
+
+
+def sanear_texto(serie: pd.Series) -> pd.Series:
+    """strip, quita '<' y '>' y neutraliza fórmulas (=, +, -, @) al abrir el CSV en una hoja de cálculo."""
+    serie = serie.astype("string").str.strip().str.replace(r"[<>]", "", regex=True)
+    return serie.mask(serie.str.match(r"[=+\-@]", na=False), "'" + serie)
+
+
+def normalizar_sexos(serie: pd.Series) -> pd.Series:
+    return serie.astype("string").str.strip().str.lower().map(SEXOS)
+
+
+def normalizar_chips(serie: pd.Series) -> pd.Series:
+    """Misma forma que utils.microchip.normalizar_chip: solo dígitos, vacío -> nulo."""
+    if pd.api.types.is_float_dtype(serie):
+        serie = serie.astype("Int64")  # columnas leídas como número (los vacíos como NaN)
+    digitos = serie.astype("string").str.replace(r"\D", "", regex=True)
+    return digitos.mask(digitos == "")
+
+
+def parsear_fechas(serie: pd.Series, formato: Optional[str] = None) -> pd.Series:
+    """
+    Una sola conversión por columna. Sin formato se deduce del primer valor
+    (dd/mm/aaaa); los valores que no encajan se reintentan uno a uno
+    (format="mixed") para no perder fechas escritas de otra manera.
+    """
+    texto = serie.astype("string").str.strip()
+    fechas = pd.to_datetime(texto, format=formato, dayfirst=True, errors="coerce")
+    if formato is None:
+        fallidas = fechas.isna() & texto.notna() & (texto != "")
+        if fallidas.any():
+            fechas[fallidas] = pd.to_datetime(texto[fallidas], format="mixed", dayfirst=True, errors="coerce")
+    return fechas
+
+
+def limpiar_censo(df: pd.DataFrame, columnas: Dict[str, str] = COLUMNAS_CENSO,
+                  formato_fecha: Optional[str] = None) -> pd.DataFrame:
+    """DataFrame del CSV (cabeceras originales) -> campos de Gato limpios + `motivo`."""
+    origen = {campo: cabecera for cabecera, campo in columnas.items() if cabecera in df.columns}
+    vacia = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    def columna(campo):
+        return df[origen[campo]] if campo in origen else vacia
+
+    limpio = pd.DataFrame(index=df.index)
+    for campo in CAMPOS_TEXTO:
+        limpio[campo] = sanear_texto(columna(campo))
+    limpio["sexo"] = normalizar_sexos(columna("sexo"))
+    limpio["codigo_identificacion"] = normalizar_chips(columna("codigo_identificacion"))
+    for campo in CAMPOS_FECHA:
+        limpio[campo] = parsear_fechas(columna(campo), formato_fecha)
+    # Los censos municipales no traen esterilización: se toma la de vacunación
+    limpio["fecha_esterilizacion"] = limpio["fecha_esterilizacion"].fillna(limpio["fecha_vacunacion"])
+
+    # Máscaras de validez; si falla más de una, la última asignada es la que se informa
+    motivo = pd.Series(None, index=df.index, dtype="object")
+    motivo[limpio["codigo_identificacion"].map(es_chip_valido, na_action="ignore").eq(False)] = \
+        f"Microchip no válido (deben ser {LONGITUD_CHIP} dígitos)"
+    motivo[limpio["sexo"].isna()] = "Sexo no reconocido"
+    motivo[limpio["nombre"].isna() | (limpio["nombre"] == "")] = "Nombre vacío"
+    limpio["motivo"] = motivo
+
+    # Un chip repetido en el fichero: vale la última aparición (como si se importara fila a fila)
+    validas = limpio["motivo"].isna() & limpio["codigo_identificacion"].notna()
+    repetidas = validas & limpio["codigo_identificacion"].where(validas).duplicated(keep="last")
+    limpio.loc[repetidas, "motivo"] = "Microchip repetido más abajo en el fichero"
+
+    # NaN/NaT/<NA> -> None para el ORM (Timestamp ya es un datetime)
+    return limpio.astype(object).where(limpio.notna(), None)
+
+
+# --- Detección del formato -------------------------------------------------
+
+MAX_LINEAS_CABECERA = 20  # la cabecera se busca en las primeras líneas
+TAM_MUESTRA = 64 * 1024
+DELIMITADORES = (";", ",", "\t", "|")
+CAMPOS_OBLIGATORIOS = {"nombre", "sexo"}
+
+
+def perfil_por_defecto() -> PerfilImportacion:
+    """Formato de Onegat (exportar-csv), sin guardar en la BD: se usa si ningún perfil encaja."""
+    return PerfilImportacion(id=None, nombre="Censo Onegat", columnas=COLUMNAS_CENSO, codificacion="utf-8")
+
+
+class Deteccion(NamedTuple):
+    perfil: PerfilImportacion
+    delimitador: str
+    fila_cabecera: int
+    reconocidas: Dict[str, str]  # cabecera -> campo
+    ignoradas: List[str]
+
+
+def _limpiar_cabecera(valor: str) -> str:
+    return valor.strip().lstrip("\ufeff").strip()
+
+
+def detectar_formato(muestra: bytes, perfiles: List[PerfilImportacion]) -> Optional[Deteccion]:
+    """
+    Prueba cada perfil (y el formato por defecto) sobre las primeras líneas:
+    gana el que reconoce más columnas con nombre y sexo entre ellas. A igualdad,
+    los perfiles guardados van antes que el de por defecto.
+    """
+    mejor = None
+    for perfil in list(perfiles) + [perfil_por_defecto()]:
+        lineas = muestra.decode(perfil.codificacion, errors="ignore").splitlines()[:MAX_LINEAS_CABECERA]
+        filas = [perfil.fila_cabecera] if perfil.fila_cabecera is not None else range(len(lineas))
+        delimitadores = [perfil.delimitador] if perfil.delimitador else DELIMITADORES
+        for fila in filas:
+            if fila >= len(lineas):
+                continue
+            for delimitador in delimitadores:
+                cabeceras = [_limpiar_cabecera(c) for c in next(csv.reader([lineas[fila]], delimiter=delimitador), [])]
+                reconocidas = {c: perfil.columnas[c] for c in cabeceras if c in perfil.columnas}
+                if not CAMPOS_OBLIGATORIOS <= set(reconocidas.values()):
+                    continue
+                if mejor is None or len(reconocidas) > len(mejor.reconocidas):
+                    ignoradas = [c for c in cabeceras if c and c not in reconocidas]
+                    mejor = Deteccion(perfil, delimitador, fila, reconocidas, ignoradas)
+    return mejor
+
+
+def leer_csv(contenido: bytes, deteccion: Deteccion) -> pd.DataFrame:
+    """CSV completo como texto con el formato detectado (cabeceras sin espacios ni BOM)."""
+    texto = contenido.decode(deteccion.perfil.codificacion, errors="ignore")
+    df = pd.read_csv(StringIO(texto), sep=deteccion.delimitador, skiprows=deteccion.fila_cabecera,
+                     dtype=str)
+    df.columns = [_limpiar_cabecera(str(c)) for c in df.columns]
+    return df
+
+
+# --- Fichero de errores ----------------------------------------------------
+
+# Fuera de media/ y uploads/, que se sirven como estáticos sin autenticación
+DIR_ERRORES = os.path.join("importaciones", "errores")
+CADUCIDAD_ERRORES = 7 * 24 * 3600
+
+
+def guardar_errores(df: pd.DataFrame, motivos: pd.Series, delimitador: str) -> Optional[str]:
+    """Escribe las filas originales descartadas con su motivo; devuelve el nombre del fichero."""
+    descartadas = motivos.notna()
+    if not descartadas.any():
+        return None
+    os.makedirs(DIR_ERRORES, exist_ok=True)
+    limite = time.time() - CADUCIDAD_ERRORES
+    for antiguo in os.scandir(DIR_ERRORES):
+        if antiguo.is_file() and antiguo.stat().st_mtime < limite:
+            os.remove(antiguo.path)
+
+    errores = df[descartadas].copy()
+    errores.insert(0, "Fila", errores.index + 1)
+    errores["Motivo"] = motivos[descartadas]
+    nombre = f"errores_{uuid4().hex}.csv"
+    errores.to_csv(os.path.join(DIR_ERRORES, nombre), sep=delimitador, index=False, encoding="utf-8-sig")
+    return nombre
+
+
+# --- Escritura por trozos reanudable ----------------------------------------
+
+TAM_TROZO = 1000
+LATIDO = timedelta(minutes=10)  # un lote en curso sin avanzar en este tiempo se da por abandonado
+# Al actualizar un gato existente, los vacíos del CSV no borran lo que ya hay
+CAMPOS_UPSERT = ["nombre", "raza", "sexo", "fecha_vacunacion", "fecha_desparasitacion",
+                 "fecha_esterilizacion"]
+
+
+def reclamar_lote(db, hash_sha256: str, nombre_fichero: str, perfil_id: Optional[int]) -> LoteImportacion:
+    """Crea el lote del fichero o retoma uno interrumpido; 409 si otro proceso lo está importando."""
+    tabla = LoteImportacion.__table__
+    nuevo = db.execute(
+        insert(tabla)
+        .values(hash_sha256=hash_sha256, nombre_fichero=nombre_fichero, perfil_id=perfil_id)
+        .on_conflict_do_nothing(index_elements=[tabla.c.hash_sha256])
+        .returning(tabla.c.id)
+    ).scalar()
+    if nuevo is None:
+        # Reclamo atómico: solo uno de dos intentos simultáneos lo consigue
+        nuevo = db.execute(
+            update(tabla)
+            .where(tabla.c.hash_sha256 == hash_sha256, tabla.c.estado != "completado")
+            .where(or_(tabla.c.estado != "en_curso", tabla.c.updated_at < datetime.utcnow() - LATIDO))
+            .values(estado="en_curso", updated_at=datetime.utcnow())
+            .returning(tabla.c.id)
+        ).scalar()
+        if nuevo is None:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Este fichero ya se está importando")
+    db.commit()
+    return db.query(LoteImportacion).filter(LoteImportacion.id == nuevo).one()
+
+
+def _escribir_trozo(db, filas: List[dict]):
+    """Inserta o actualiza (por microchip) las filas; devuelve [(id, fecha_esterilizacion, insertado)]."""
+    tabla = Gato.__table__
+    devolver = (tabla.c.id, tabla.c.fecha_esterilizacion, literal_column("xmax = 0").label("insertado"))
+    resultado = []
+    con_chip = [f for f in filas if f["codigo_identificacion"]]
+    sin_chip = [f for f in filas if not f["codigo_identificacion"]]
+    if con_chip:
+        stmt = insert(tabla).values(con_chip)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabla.c.codigo_identificacion],
+            index_where=tabla.c.codigo_identificacion.isnot(None),
+            set_={
+                **{c: func.coalesce(stmt.excluded[c], tabla.c[c]) for c in CAMPOS_UPSERT},
+                "updated_at": func.timezone("utc", func.now()),
+            },
+        )
+        resultado += db.execute(stmt.returning(*devolver)).all()
+    if sin_chip:
+        # Sin microchip no hay clave natural: el punto de control evita duplicarlos al reanudar
+        resultado += db.execute(insert(tabla).values(sin_chip).returning(*devolver)).all()
+    registrar_cambios(db, "gatos", [gato_id for gato_id, _, insertado in resultado if insertado], "insert")
+    registrar_cambios(db, "gatos", [gato_id for gato_id, _, insertado in resultado if not insertado], "update", CAMPOS_UPSERT)
+    return resultado
+
+
+def _escribir_fila_a_fila(db, filas: List[dict], indices):
+    """Trozo rechazado por la BD: cada fila en su SAVEPOINT. Devuelve (escritos, {fila: motivo})."""
+    escritos, rechazadas = [], {}
+    for indice, fila in zip(indices, filas):
+        try:
+            with db.begin_nested():
+                escritos += _escribir_trozo(db, [fila])
+        except DBAPIError as e:
+            rechazadas[indice] = f"Rechazada por la base de datos: {type(e.orig).__name__}"
+    return escritos, rechazadas
+
+
+def importar_por_trozos(db, lote: LoteImportacion, gatos_csv: pd.DataFrame, colonia_id: int):
+    """
+    Escribe desde el punto de control del lote; cada trozo se confirma con su
+    avance. Las filas que la BD rechaza se guardan en lote.rechazadas con el
+    trozo y se anotan en gatos_csv["motivo"], también las de intentos anteriores.
+    """
+    for indice, motivo in (lote.rechazadas or {}).items():
+        gatos_csv.loc[int(indice), "motivo"] = motivo
+
+    fijos = {"imagen": "default.png", "ubicacion": "Importado", "colonia_id": colonia_id, "activo": True}
+    for inicio in range(lote.filas_procesadas, len(gatos_csv), TAM_TROZO):
+        trozo = gatos_csv.iloc[inicio:inicio + TAM_TROZO]
+        validos = trozo[trozo["motivo"].isna()].drop(columns="motivo")
+        filas = [{**f, **fijos} for f in validos.to_dict("records")]
+        escritos = []
+        if filas:
+            try:
+                with db.begin_nested():
+                    escritos = _escribir_trozo(db, filas)
+            except DBAPIError:
+                escritos, rechazadas = _escribir_fila_a_fila(db, filas, validos.index)
+                for indice, motivo in rechazadas.items():
+                    gatos_csv.loc[indice, "motivo"] = motivo
+                # Se reasigna (no se modifica en sitio) para que el ORM detecte el cambio del JSON
+                lote.rechazadas = {**(lote.rechazadas or {}), **{str(i): m for i, m in rechazadas.items()}}
+
+        esterilizados = {gato_id: fecha for gato_id, fecha, _ in escritos if fecha is not None}
+        if esterilizados:
+            asociar_por_esterilizacion(db, esterilizados)
+        insertados = sum(1 for *_, insertado in escritos if insertado)
+        lote.importados += insertados
+        lote.actualizados += len(escritos) - insertados
+        lote.omitidos += len(trozo) - len(escritos)
+        lote.filas_procesadas = inicio + len(trozo)
+        db.commit()
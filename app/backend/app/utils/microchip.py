@@ -0,0 +1,27 @@
+"""
+Forma normalizada del código de identificación (microchip): solo dígitos.
+
+Es la forma que se guarda y la única que se busca, así que '941 000-012 345 678'
+y '941000012345678' son el mismo chip y el índice único los trata igual.
+"""
+import math
+import re
+from typing import Optional
+
+LONGITUD_CHIP = 15
+
+
+def normalizar_chip(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        # pandas lee las columnas de chips como números (y los vacíos como NaN)
+        if math.isnan(valor):
+            return None
+        valor = int(valor)
+    digitos = re.sub(r"\D", "", str(valor))
+    return digitos or None
+
+
+def es_chip_valido(codigo: Optional[str]) -> bool:
+    return codigo is not None and len(codigo) == LONGITUD_CHIP and codigo.isdigit()
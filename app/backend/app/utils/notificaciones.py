@@ -0,0 +1,184 @@
+"""
+Notificaciones a usuarios: bandeja en la app (tabla notificaciones) y correo.
+
+Un evento (nueva queja, inspección resuelta...) resuelve sus destinatarios con
+una sola consulta, inserta de una vez una Notificacion por destinatario (y suma
+1 a su contador `users.notificaciones_no_leidas`, que es lo que consulta el
+badge sin recorrer la tabla) y deja el correo en la cola de salida
+(correos_pendientes). No hace commit: todo va en la transacción del evento,
+así que si este se deshace no queda ni aviso ni correo, y la petición no
+espera al servidor SMTP.
+
+El planificador vacía la cola cada minuto. Los usuarios con
+`digest_notificaciones` reciben en su lugar un único correo por hora con todo
+lo acumulado, para que una colonia con mucha actividad no les llene el buzón.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import String, and_, cast, func, insert, literal, or_, select, update
+
+from app.database import SessionLocal
+from app.models import Colonia, CorreoPendiente, Notificacion, User
+from app.utils.logger import get_logger
+from app.utils.utils import enviar_correo
+
+logger = get_logger("notificaciones")
+
+LOTE_ENVIO = 200
+MAX_INTENTOS = 5
+
+# tipo de notificación -> cómo se nombra en el texto
+TIPOS_EVENTO = {"queja": "queja", "inspeccion": "inspección"}
+
+
+def _voluntario_de(responsable):
+    # responsable_voluntario guarda el username o, en las colonias creadas al importar, el id
+    return and_(
+        User.role == "voluntario",
+        or_(User.username == responsable, cast(User.id, String) == responsable),
+    )
+
+
+def destinatarios(db, colonia_id: Optional[int] = None, roles: Iterable[str] = ()) -> List[int]:
+    """Ids del voluntario responsable de la colonia y/o de los usuarios con alguno de `roles`."""
+    condiciones = []
+    if colonia_id is not None:
+        responsable = select(Colonia.responsable_voluntario).where(Colonia.id == colonia_id).scalar_subquery()
+        condiciones.append(_voluntario_de(responsable))
+    if roles:
+        condiciones.append(User.role.in_(list(roles)))
+    if not condiciones:
+        return []
+    return db.execute(select(User.id).where(or_(*condiciones)).order_by(User.id)).scalars().all()
+
+
+def notificar(db, usuario_ids: Iterable[int], mensaje: str, asunto: Optional[str] = None, tipo: Optional[str] = None) -> int:
+    """
+    Una Notificacion por usuario y, si hay `asunto`, su correo en la cola (o en
+    su resumen horario). No hace commit. Devuelve el nº de destinatarios.
+    """
+    usuario_ids = sorted(set(usuario_ids))  # mismo orden de bloqueo de filas de users en todas las transacciones
+    if not usuario_ids:
+        return 0
+    ahora = datetime.utcnow()
+    db.execute(
+        insert(Notificacion.__table__),
+        [{"usuario_id": u, "mensaje": mensaje, "tipo": tipo, "leido": False, "fecha_hora": ahora} for u in usuario_ids],
+    )
+    usuarios = User.__table__
+    db.execute(
+        update(usuarios)
+        .where(usuarios.c.id.in_(usuario_ids))
+        .values(notificaciones_no_leidas=usuarios.c.notificaciones_no_leidas + 1)
+    )
+    if asunto:
+        # INSERT ... SELECT: la preferencia de resumen y el email se leen en el propio INSERT
+        db.execute(insert(CorreoPendiente.__table__).from_select(
+            ["usuario_id", "asunto", "mensaje", "resumen", "created_at"],
+            select(User.id, literal(asunto), literal(mensaje), User.digest_notificaciones, literal(ahora))
+            .where(User.id.in_(usuario_ids), User.email.isnot(None), User.email != ""),
+        ))
+    return len(usuario_ids)
+
+
+def marcar_leidas(db, usuario_id: int, ids: Optional[List[int]] = None) -> int:
+    """
+    Marca como leídas las notificaciones `ids` del usuario (todas si es None) y
+    descuenta las que no lo estaban. No hace commit. Devuelve cuántas cambiaron.
+    """
+    tabla = Notificacion.__table__
+    consulta = update(tabla).where(tabla.c.usuario_id == usuario_id, tabla.c.leido.isnot(True))
+    if ids is not None:
+        consulta = consulta.where(tabla.c.id.in_(ids))
+    marcadas = db.execute(consulta.values(leido=True)).rowcount
+    if marcadas:
+        usuarios = User.__table__
+        db.execute(
+            update(usuarios)
+            .where(usuarios.c.id == usuario_id)
+            .values(notificaciones_no_leidas=func.greatest(usuarios.c.notificaciones_no_leidas - marcadas, 0))
+        )
+    return marcadas
+
+
+def notificar_colonia(db, colonia_id: int, tipo: str) -> int:
+    """Aviso de un nuevo evento de la colonia (queja, inspeccion) a su voluntario responsable."""
+    filas = db.execute(
+        select(User.id, Colonia.nombre)
+        .select_from(Colonia)
+        .join(User, _voluntario_de(Colonia.responsable_voluntario))
+        .where(Colonia.id == colonia_id)
+    ).all()
+    if not filas:
+        logger.info(f"La colonia {colonia_id} no tiene voluntario responsable al que notificar")
+        return 0
+
+    nombre, evento = filas[0].nombre, TIPOS_EVENTO.get(tipo, tipo)
+    asunto = f"📢 Notificación de {evento.capitalize()} en {nombre}"
+    mensaje = (
+        f"🆕 Se ha registrado una nueva {evento} en la colonia '{nombre}' que administras.\n\n"
+        f"✅ Por favor, revísala en el sistema."
+    )
+    return notificar(db, [f.id for f in filas], mensaje, asunto=asunto, tipo=tipo)
+
+
+def _pendientes(resumen: bool, limite: int):
+    # SKIP LOCKED: si dos procesos vacían la cola a la vez, no se reparten el mismo correo
+    return (
+        select(CorreoPendiente.id, CorreoPendiente.usuario_id, User.email, CorreoPendiente.asunto, CorreoPendiente.mensaje)
+        .join(User, User.id == CorreoPendiente.usuario_id)
+        .where(
+            CorreoPendiente.enviado_en.is_(None),
+            CorreoPendiente.resumen == resumen,
+            CorreoPendiente.intentos < MAX_INTENTOS,
+        )
+        .order_by(CorreoPendiente.id)
+        .limit(limite)
+        .with_for_update(of=CorreoPendiente, skip_locked=True)
+    )
+
+
+def _marcar(db, enviados: List[int], fallidos: List[int]):
+    tabla = CorreoPendiente.__table__
+    if enviados:
+        db.execute(update(tabla).where(tabla.c.id.in_(enviados)).values(enviado_en=datetime.utcnow()))
+    if fallidos:
+        db.execute(update(tabla).where(tabla.c.id.in_(fallidos)).values(intentos=tabla.c.intentos + 1))
+
+
+def enviar_pendientes():
+    """Tarea del planificador: envía los correos inmediatos de la cola."""
+    db = SessionLocal()
+    try:
+        enviados, fallidos = [], []
+        for fila in db.execute(_pendientes(False, LOTE_ENVIO)).all():
+            (enviados if enviar_correo(fila.email, fila.asunto, fila.mensaje) else fallidos).append(fila.id)
+        _marcar(db, enviados, fallidos)
+        db.commit()
+        if enviados or fallidos:
+            logger.info(f"Cola de correo: {len(enviados)} enviados, {len(fallidos)} fallidos")
+    finally:
+        db.close()
+
+
+def enviar_resumenes():
+    """Tarea del planificador: un correo por usuario con todo lo acumulado para su resumen."""
+    db = SessionLocal()
+    try:
+        por_usuario = defaultdict(list)
+        for fila in db.execute(_pendientes(True, LOTE_ENVIO * 10)).all():
+            por_usuario[fila.email].append(fila)
+
+        enviados, fallidos = [], []
+        for email, filas in por_usuario.items():
+            cuerpo = "\n\n".join(f"• {f.asunto}\n{f.mensaje}" for f in filas)
+            enviado = enviar_correo(email, f"📬 Resumen de notificaciones ({len(filas)})", cuerpo)
+            (enviados if enviado else fallidos).extend(f.id for f in filas)
+        _marcar(db, enviados, fallidos)
+        db.commit()
+        if por_usuario:
+            logger.info(f"Resúmenes de notificaciones: {len(por_usuario)} usuarios, {len(enviados)} avisos enviados")
+    finally:
+        db.close()
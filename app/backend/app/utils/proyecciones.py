@@ -0,0 +1,40 @@
+"""
+Proyecciones ligeras para los listados (`?fields=id,nombre,imagen`).
+
+Cada ruta declara qué campos se pueden pedir y con qué expresión SQL se
+obtienen; solo se seleccionan esas columnas y las filas se serializan tal
+cual, sin construir objetos del ORM ni pasar por el response_model.
+"""
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def seleccionar_campos(fields: Optional[str], disponibles: Dict[str, object]) -> Optional[list]:
+    """Expresiones etiquetadas para `fields`, o None si no se pidió una proyección."""
+    if fields is None:
+        return None
+    nombres = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not nombres:
+        raise HTTPException(status_code=400, detail="fields no contiene ningún campo")
+    desconocidos = [n for n in nombres if n not in disponibles]
+    if desconocidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no disponibles: {', '.join(desconocidos)}. Opciones: {', '.join(disponibles)}",
+        )
+    return [disponibles[n].label(n) for n in nombres]
+
+
+def respuesta_proyeccion(
+    filas, transformaciones: Optional[Dict[str, Callable]] = None, cabeceras: Optional[Dict[str, str]] = None
+) -> JSONResponse:
+    """Serializa filas de la proyección; `transformaciones` ajusta campos calculados en Python."""
+    datos = [dict(fila._mapping) for fila in filas]
+    for campo, transformar in (transformaciones or {}).items():
+        for fila in datos:
+            if campo in fila:
+                fila[campo] = transformar(fila[campo])
+    return JSONResponse(content=jsonable_encoder(datos), headers=cabeceras)
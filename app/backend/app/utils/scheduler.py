@@ -0,0 +1,158 @@
+"""
+Planificador de tareas periódicas con un único líder por instancia.
+
+Cada worker de uvicorn arranca el planificador, pero solo el que obtiene el
+advisory lock de Postgres ejecuta las tareas; el resto reintenta cada minuto
+y toma el relevo si el líder cae (el lock se libera al cerrarse su conexión).
+Las tareas son funciones síncronas y se ejecutan cada una en su hilo, sin
+bloquear el bucle de eventos ni esperarse entre sí: un pg_dump de horas no
+retrasa el envío de correos de cada minuto ni la comprobación del liderazgo.
+Una tarea que sigue en marcha cuando le vuelve a tocar se salta esa ejecución.
+
+    planificador.registrar("backup", "0 3 * * *", create_backup, "full", "sql")
+"""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.utils.cron import Cron
+from app.utils.logger import get_logger
+
+logger = get_logger("scheduler")
+
+# Clave del advisory lock (cada tenant tiene su propia BD, así que basta con una fija)
+LOCK_PLANIFICADOR = 0x6F6E6567  # "oneg"
+REINTENTO_SEGUNDOS = 60
+
+
+class _Tarea:
+    def __init__(self, nombre: str, cron: Cron, funcion, args):
+        self.nombre = nombre
+        self.cron = cron
+        self.funcion = funcion
+        self.args = args
+        self.proxima = None
+        self.en_curso = None  # asyncio.Task de la ejecución actual
+
+    @property
+    def ocupada(self) -> bool:
+        return self.en_curso is not None and not self.en_curso.done()
+
+
+class Planificador:
+    def __init__(self):
+        self._tareas = {}
+        self._bucle = None
+        self._conexion = None
+
+    def registrar(self, nombre: str, expresion: str, funcion, *args):
+        """Registra (o reemplaza) una tarea. Una expresión vacía la desactiva."""
+        if not expresion:
+            self._tareas.pop(nombre, None)
+            return
+        self._tareas[nombre] = _Tarea(nombre, Cron(expresion), funcion, args)
+
+    def iniciar(self):
+        if self._bucle is None and self._tareas:
+            self._bucle = asyncio.create_task(self._ejecutar())
+
+    async def detener(self):
+        if self._bucle is not None:
+            self._bucle.cancel()
+            try:
+                await self._bucle
+            except asyncio.CancelledError:
+                pass
+            self._bucle = None
+
+    # --- Liderazgo ---
+
+    def _intentar_liderazgo(self) -> bool:
+        # AUTOCOMMIT: una conexión larga "idle in transaction" frenaría el VACUUM
+        conexion = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            obtenido = conexion.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": LOCK_PLANIFICADOR}).scalar()
+        except Exception:
+            conexion.close()
+            raise
+        if obtenido:
+            # La conexión se mantiene abierta mientras dure el liderazgo
+            self._conexion = conexion
+        else:
+            conexion.close()
+        return bool(obtenido)
+
+    def _sigue_lider(self) -> bool:
+        try:
+            self._conexion.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            self._liberar()
+            return False
+
+    def _liberar(self):
+        if self._conexion is not None:
+            try:
+                self._conexion.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_PLANIFICADOR})
+            except Exception:
+                # No devolver al pool una conexión que podría conservar el lock
+                self._conexion.invalidate()
+            self._conexion.close()
+            self._conexion = None
+
+    # --- Bucle principal ---
+
+    async def _ejecutar(self):
+        try:
+            while True:
+                try:
+                    lider = await asyncio.to_thread(self._intentar_liderazgo)
+                except Exception as e:
+                    logger.error(f"No se pudo consultar el lock del planificador: {e}")
+                    lider = False
+
+                if lider:
+                    logger.info(f"Planificador activo en este worker ({', '.join(self._tareas)})")
+                    await self._mientras_lider()
+                    logger.warning("Liderazgo del planificador perdido")
+                await asyncio.sleep(REINTENTO_SEGUNDOS)
+        finally:
+            await asyncio.to_thread(self._liberar)
+
+    async def _mientras_lider(self):
+        ahora = datetime.now()
+        for tarea in self._tareas.values():
+            tarea.proxima = tarea.cron.siguiente(ahora)
+
+        while True:
+            ahora = datetime.now()
+            for tarea in self._tareas.values():
+                if tarea.proxima <= ahora:
+                    if tarea.ocupada:
+                        logger.warning(f"La tarea '{tarea.nombre}' sigue en marcha: se omite esta ejecución")
+                    else:
+                        tarea.en_curso = asyncio.create_task(self._lanzar(tarea))
+                    # Las ejecuciones perdidas mientras corría la tarea no se acumulan
+                    tarea.proxima = tarea.cron.siguiente(ahora)
+
+            # El liderazgo se comprueba al menos cada REINTENTO_SEGUNDOS, haya tareas en marcha o no
+            espera = min(t.proxima for t in self._tareas.values()) - datetime.now()
+            await asyncio.sleep(max(1, min(espera.total_seconds(), REINTENTO_SEGUNDOS)))
+            if not await asyncio.to_thread(self._sigue_lider):
+                en_marcha = [t.nombre for t in self._tareas.values() if t.ocupada]
+                if en_marcha:
+                    # Un hilo no se puede interrumpir: terminan, pero no se lanza nada más aquí
+                    logger.warning(f"Tareas aún en marcha tras perder el liderazgo: {', '.join(en_marcha)}")
+                return
+
+    async def _lanzar(self, tarea: _Tarea):
+        logger.info(f"Ejecutando tarea programada '{tarea.nombre}'")
+        try:
+            await asyncio.to_thread(tarea.funcion, *tarea.args)
+        except Exception as e:
+            logger.error(f"Error en la tarea programada '{tarea.nombre}': {e}")
+
+
+planificador = Planificador()
@@ -0,0 +1,123 @@
+"""
+Series temporales de actividad (esterilizaciones, vacunaciones,
+desparasitaciones, altas de gatos y quejas) por día, semana o mes, agrupadas
+por colonia o por campaña.
+
+Cada métrica es un `count(*) ... GROUP BY date_trunc(...)` sobre una columna
+de fecha indexada, filtrado por rango. Los periodos ya cerrados no cambian
+(salvo correcciones con fecha atrasada, que aparecen al caducar la caché), así
+que se guardan en Redis uno a uno con todos los grupos y solo se consulta en
+la BD el tramo de periodos que falte, normalmente el abierto.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+
+from app.utils.cache import guardar_json, leer_json
+
+# intervalo de la API -> unidad de date_trunc
+UNIDADES = {"dia": "day", "semana": "week", "mes": "month"}
+MAX_PERIODOS = 800
+
+# (métrica, tabla y alias, columna de fecha). Las fechas son UTC sin zona.
+METRICAS = [
+    ("esterilizaciones", "gatos g", "g.fecha_esterilizacion"),
+    ("vacunaciones", "gatos g", "g.fecha_vacunacion"),
+    ("desparasitaciones", "gatos g", "g.fecha_desparasitacion"),
+    ("altas", "gatos g", "g.created_at"),
+    ("quejas", "quejas q", "q.fecha"),
+]
+NOMBRES_METRICAS = [m[0] for m in METRICAS]
+
+# Dimensión de agrupación: expresión del grupo y JOIN necesario sobre gatos.
+# Las quejas no pertenecen a campañas: en la vista por campaña no aparecen.
+AGRUPACIONES = {
+    "colonia": {"gatos": ("g.colonia_id", ""), "quejas": ("q.colonia_id", "")},
+    "campana": {"gatos": ("cg.campana_id", "JOIN campanas_gatos cg ON cg.gato_id = g.id")},
+}
+
+
+def _sql(por: str):
+    partes = []
+    for metrica, tabla, columna in METRICAS:
+        dimension = AGRUPACIONES[por].get(tabla.split()[0])
+        if dimension is None:
+            continue
+        grupo, join = dimension
+        partes.append(
+            f"SELECT '{metrica}' AS metrica, date_trunc(:unidad, {columna}) AS periodo, {grupo} AS grupo, count(*) AS n"
+            f" FROM {tabla} {join}"
+            f" WHERE {columna} >= :desde AND {columna} < :hasta"
+            f" GROUP BY 1, 2, 3"
+        )
+    return text("\nUNION ALL\n".join(partes))
+
+
+SQL_SERIES = {por: _sql(por) for por in AGRUPACIONES}
+
+
+def inicio_periodo(d: date, intervalo: str) -> date:
+    """Mismo corte que date_trunc de PostgreSQL (las semanas empiezan en lunes)."""
+    if intervalo == "dia":
+        return d
+    if intervalo == "semana":
+        return d - timedelta(days=d.weekday())
+    return d.replace(day=1)
+
+
+def siguiente_periodo(d: date, intervalo: str) -> date:
+    if intervalo == "dia":
+        return d + timedelta(days=1)
+    if intervalo == "semana":
+        return d + timedelta(days=7)
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def periodos(desde: date, hasta: date, intervalo: str) -> List[date]:
+    """Inicios de los periodos que cubren [desde, hasta] (ambos incluidos)."""
+    actual, resultado = inicio_periodo(desde, intervalo), []
+    while actual <= hasta:
+        resultado.append(actual)
+        actual = siguiente_periodo(actual, intervalo)
+    return resultado
+
+
+def _clave(por: str, intervalo: str, periodo: date) -> str:
+    return f"series:{por}:{intervalo}:{periodo.isoformat()}"
+
+
+def _consultar(db, por: str, intervalo: str, inicios: List[date]) -> Dict[date, list]:
+    """Una sola consulta para el tramo [primer inicio, fin del último] -> {periodo: [[metrica, grupo, n]]}."""
+    desde = datetime.combine(inicios[0], time.min)
+    hasta = datetime.combine(siguiente_periodo(inicios[-1], intervalo), time.min)
+    resultado = {p: [] for p in inicios}
+    filas = db.execute(SQL_SERIES[por], {"unidad": UNIDADES[intervalo], "desde": desde, "hasta": hasta})
+    for metrica, periodo, grupo, n in filas:
+        if periodo.date() in resultado:
+            resultado[periodo.date()].append([metrica, grupo, n])
+    return resultado
+
+
+def calcular_series(db, por: str, intervalo: str, desde: date, hasta: date, ttl: int) -> Tuple[List[date], Dict[date, list]]:
+    inicios = periodos(desde, hasta, intervalo)
+    hoy = datetime.utcnow().date()
+    # Cerrado: termina antes de hoy (UTC). El abierto y los futuros siempre se recalculan
+    cerrados = [p for p in inicios if siguiente_periodo(p, intervalo) <= hoy]
+
+    datos = {}
+    for periodo, valor in zip(cerrados, leer_json([_clave(por, intervalo, p) for p in cerrados])):
+        if valor is not None:
+            datos[periodo] = valor
+
+    pendientes = [p for p in inicios if p not in datos]
+    if pendientes:
+        # Los huecos suelen ser contiguos (el final del rango): se piden de una vez
+        calculados = _consultar(db, por, intervalo, pendientes)
+        for periodo in pendientes:
+            datos[periodo] = calculados.get(periodo, [])
+        guardar_json(
+            {_clave(por, intervalo, p): datos[p] for p in pendientes if siguiente_periodo(p, intervalo) <= hoy},
+            ttl,
+        )
+    return inicios, datos
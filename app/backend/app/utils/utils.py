@@ -7,8 +7,8 @@ from dotenv import load_dotenv  # Cargar variables de entorno
 load_dotenv()
 print("✅ Variables de entorno cargadas")
 
-def enviar_correo(destinatario: str, asunto: str, mensaje: str):
-    """Envía un correo electrónico utilizando un servidor SMTP en entorno local."""
+def enviar_correo(destinatario: str, asunto: str, mensaje: str) -> bool:
+    """Envía un correo electrónico utilizando un servidor SMTP en entorno local. Devuelve si se envió."""
     SMTP_SERVER = os.getenv("SMTP_SERVER")
     SMTP_PORT = int(os.getenv("SMTP_PORT"))
     REMITENTE = os.getenv("EMAIL_USER")
@@ -33,6 +33,8 @@ def enviar_correo(destinatario: str, asunto: str, mensaje: str):
         server.quit()
 
         print(f"✅ Correo enviado a {destinatario} con éxito.")
+        return True
     
     except Exception as e:
         print(f"❌ Error al enviar el correo: {e}")
+        return False
@@ -0,0 +1,65 @@
+"""
+Presupuesto de arranque: importar `app.main` debe ser rápido y ligero.
+
+Se mide en un proceso limpio (como un worker de uvicorn recién creado) el
+tiempo de importación y la memoria residual máxima, y se comprueba que las
+dependencias pesadas (informes, pandas, S3...) no se cargan al arrancar.
+
+    python -m pytest benchmarks/bench_arranque.py -q
+
+Los límites se pueden ajustar con BENCH_ARRANQUE_MAX_S y BENCH_ARRANQUE_MAX_MB.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MAX_SEGUNDOS = float(os.getenv("BENCH_ARRANQUE_MAX_S", "3.0"))
+MAX_MB = float(os.getenv("BENCH_ARRANQUE_MAX_MB", "150"))
+
+# Módulos que solo deben cargarse al usarse por primera vez
+MODULOS_DIFERIDOS = ["matplotlib", "reportlab", "pandas", "boto3", "requests", "pyarrow"]
+
+_SONDA = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main  # noqa: F401
+segundos = time.perf_counter() - t0
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "segundos": segundos,
+    "rss_mb": rss_kb / 1024,
+    "cargados": sorted({m.split(".")[0] for m in sys.modules}),
+}))
+"""
+
+
+def _medir_arranque():
+    entorno = dict(os.environ)
+    # Evita el create_all de desarrollo: solo se mide el coste de importación
+    entorno["ENV"] = "prod"
+    salida = subprocess.run(
+        [sys.executable, "-c", _SONDA],
+        cwd=BACKEND_DIR,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def test_arranque_sin_dependencias_pesadas():
+    medida = _medir_arranque()
+    cargados = set(medida["cargados"])
+    assert not cargados & set(MODULOS_DIFERIDOS), f"Importados al arrancar: {sorted(cargados & set(MODULOS_DIFERIDOS))}"
+
+
+def test_arranque_dentro_de_presupuesto(benchmark):
+    medida = benchmark.pedantic(_medir_arranque, rounds=5, iterations=1)
+    benchmark.extra_info["rss_mb"] = round(medida["rss_mb"], 1)
+    assert medida["segundos"] < MAX_SEGUNDOS, f"Arranque en {medida['segundos']:.2f}s (máx. {MAX_SEGUNDOS}s)"
+    assert medida["rss_mb"] < MAX_MB, f"RSS al arrancar {medida['rss_mb']:.0f} MB (máx. {MAX_MB} MB)"
@@ -0,0 +1,27 @@
+"""
+Limpieza del CSV de censo (app/utils/importacion.py), sin BD.
+
+    python -m pytest benchmarks/bench_importacion.py -q
+
+Mide solo la etapa de limpieza por columnas; la inserción se mide en
+bench_rutas.py::test_importar_gatos_csv.
+"""
+import io
+
+import pandas as pd
+import pytest
+
+from app.utils.importacion import limpiar_censo
+from benchmarks.seed import generar_csv_censo
+
+
+@pytest.fixture(scope="module", params=[5_000, 50_000], ids=["5k", "50k"])
+def censo(request):
+    contenido = generar_csv_censo(request.param).decode("utf-8")
+    return pd.read_csv(io.StringIO(contenido), sep=";", skiprows=3, dtype=str)
+
+
+def test_limpiar_censo(benchmark, censo):
+    limpio = benchmark(limpiar_censo, censo)
+    assert len(limpio) == len(censo)
+    assert limpio["motivo"].isna().all()
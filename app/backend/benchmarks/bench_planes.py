@@ -0,0 +1,92 @@
+"""
+Planes de consulta del listado filtrado de gatos.
+
+Comprueba con EXPLAIN, sobre la BD sembrada, que las combinaciones de filtros
+y orden más habituales de `/gatos/` usan índices en lugar de recorrer la
+tabla entera, y mide la ruta HTTP con esos mismos parámetros.
+
+    python -m pytest benchmarks/bench_planes.py -q
+
+Con tablas pequeñas el planificador prefiere con razón un recorrido
+secuencial: usar un dataset de al menos 10k gatos.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import SessionLocal
+from app.models import Colonia, Gato
+from app.utils.filtros import FiltrosGatos
+from benchmarks.bench_rutas import _get_ok, admin_headers, client  # noqa: F401  (fixtures)
+
+LIMITE = 50
+
+# (descripción, parámetros de FiltrosGatos, query string equivalente)
+CASOS = [
+    ("colonia", {"colonia_id": "COLONIA"}, "colonia_id=COLONIA"),
+    ("varias_colonias_hembras", {"colonia_id": "COLONIAS", "sexo": "H"}, "colonia_id=COLONIAS&sexo=H"),
+    ("vacunados_rango", {"vacunacion_desde": "2023-01-01", "vacunacion_hasta": "2023-01-31"},
+     "vacunacion_desde=2023-01-01&vacunacion_hasta=2023-01-31"),
+    # Con orden descendente los nulos van primero (como en el índice): se filtran
+    ("esterilizados_recientes", {"esterilizado": True, "orden": "-fecha_esterilizacion"},
+     "esterilizado=true&orden=-fecha_esterilizacion"),
+    ("por_nombre", {"orden": "nombre"}, "orden=nombre"),
+]
+
+
+@pytest.fixture(scope="module")
+def colonias():
+    db = SessionLocal()
+    try:
+        ids = db.execute(select(Colonia.id).order_by(Colonia.id).limit(3)).scalars().all()
+        assert ids, "La BD no está sembrada (python -m benchmarks.seed)"
+        return ids
+    finally:
+        db.close()
+
+
+def _resolver(valor, colonias):
+    return {"COLONIA": [colonias[0]], "COLONIAS": colonias}.get(valor, valor)
+
+
+def _filtros(params, colonias):
+    base = dict(colonia_id=None, sexo=None, esterilizado=None, vacunado=None, adoptabilidad=None,
+                vacunacion_desde=None, vacunacion_hasta=None, esterilizacion_desde=None,
+                esterilizacion_hasta=None, incluir_inactivos=False, orden=None)
+    for clave, valor in params.items():
+        valor = _resolver(valor, colonias)
+        base[clave] = date.fromisoformat(valor) if clave.endswith(("_desde", "_hasta")) else valor
+    return FiltrosGatos(**base)
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+@pytest.mark.parametrize("nombre,params,_qs", CASOS, ids=[c[0] for c in CASOS])
+def test_plan_usa_indices(nombre, params, _qs, colonias):
+    filtros = _filtros(params, colonias)
+    consulta = select(Gato).where(*filtros.condiciones()).order_by(*filtros.orden).limit(LIMITE)
+    sql = str(consulta.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    db = SessionLocal()
+    try:
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+    finally:
+        db.close()
+
+    nodos_gatos = [n for n in _nodos(plan) if n.get("Relation Name") == "gatos"]
+    tipos = {n["Node Type"] for n in nodos_gatos}
+    assert "Seq Scan" not in tipos, f"{nombre}: recorrido secuencial de gatos ({tipos})"
+    assert tipos & {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}, f"{nombre}: sin índice ({tipos})"
+
+
+@pytest.mark.parametrize("nombre,_params,qs", CASOS, ids=[c[0] for c in CASOS])
+def test_listado_filtrado(benchmark, client, admin_headers, colonias, nombre, _params, qs):  # noqa: F811
+    qs = qs.replace("colonia_id=COLONIAS", "&".join(f"colonia_id={c}" for c in colonias))
+    qs = qs.replace("COLONIA", str(colonias[0]))
+    benchmark(_get_ok, client, f"/api/gatos/gatos/?limit={LIMITE}&{qs}", admin_headers)
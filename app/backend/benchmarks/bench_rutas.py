@@ -0,0 +1,141 @@
+"""
+Benchmarks (pytest-benchmark) de las rutas más pesadas de la API.
+
+Requiere una BD sembrada con `python -m benchmarks.seed` y las variables de
+entorno habituales del backend (DATABASE_URL, AUTHJWT_SECRET_KEY, ...).
+
+    python -m pytest benchmarks/bench_rutas.py --benchmark-autosave
+    python -m pytest benchmarks/bench_rutas.py --benchmark-compare --benchmark-compare-fail=mean:15%
+
+Cada resultado guarda la escala del dataset en `extra_info`, de modo que solo
+se comparen ejecuciones hechas sobre el mismo volumen de datos.
+"""
+import itertools
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from app.main import app
+from app.database import SessionLocal
+from app.models import Gato, User
+from benchmarks.seed import ADMIN_BENCH, PASSWORD_BENCH, generar_csv_censo
+
+ESCALA = os.getenv("BENCH_ESCALA", "sin-etiqueta")
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def total_gatos():
+    db = SessionLocal()
+    try:
+        return db.query(func.count(Gato.id)).scalar()
+    finally:
+        db.close()
+
+
+def _login(client, username):
+    r = client.post("/api/auth/login", json={"username": username, "password": PASSWORD_BENCH, "accepted_terms": True})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _login(client, ADMIN_BENCH)
+
+
+@pytest.fixture(scope="session")
+def voluntario_headers(client):
+    db = SessionLocal()
+    try:
+        voluntario = db.query(User).filter(User.role == "voluntario").order_by(User.id).first()
+        assert voluntario, "La BD no está sembrada (python -m benchmarks.seed)"
+        username = voluntario.username
+    finally:
+        db.close()
+    return _login(client, username)
+
+
+@pytest.fixture(autouse=True)
+def _etiquetar(benchmark, total_gatos):
+    benchmark.extra_info["escala"] = ESCALA
+    benchmark.extra_info["gatos"] = total_gatos
+
+
+def _get_ok(client, url, headers=None):
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200, r.text
+    return r
+
+
+@pytest.mark.parametrize("limit", [10, 100, 1000])
+def test_get_gatos(benchmark, client, admin_headers, limit):
+    benchmark(_get_ok, client, f"/api/gatos/gatos/?limit={limit}", admin_headers)
+
+
+@pytest.mark.parametrize("fields", [None, "id,nombre,imagen"])
+def test_get_gatos_proyeccion(benchmark, client, admin_headers, fields):
+    url = "/api/gatos/gatos/?limit=1000" + (f"&fields={fields}" if fields else "")
+    benchmark(_get_ok, client, url, admin_headers)
+
+
+def test_get_gatos_offset_profundo(benchmark, client, admin_headers, total_gatos):
+    skip = max(0, total_gatos - 200)
+    benchmark(_get_ok, client, f"/api/gatos/gatos/?skip={skip}&limit=100", admin_headers)
+
+
+@pytest.mark.parametrize("limit", [10, 1000])
+def test_listar_colonias(benchmark, client, limit):
+    benchmark(_get_ok, client, f"/api/colonias/colonias/?limit={limit}")
+
+
+def test_get_mis_colonias(benchmark, client, voluntario_headers):
+    benchmark(_get_ok, client, "/api/colonias/colonias/mis-colonias", voluntario_headers)
+
+
+def test_listar_quejas(benchmark, client):
+    benchmark(_get_ok, client, "/api/quejas/quejas/")
+
+
+def test_mapa_colonias(benchmark, client):
+    benchmark(_get_ok, client, "/api/colonias/colonias/mapa/colonias")
+
+
+@pytest.mark.parametrize("informe", ["colonias", "campanas", "graficos/colonias"])
+def test_informes_pdf(benchmark, client, informe):
+    benchmark.pedantic(_get_ok, args=(client, f"/api/informes/informes/{informe}"), rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow", "csv"])
+def test_exportar_gatos(benchmark, client, admin_headers, formato):
+    benchmark.pedantic(
+        _get_ok, args=(client, f"/api/exportaciones/exportaciones/gatos?formato={formato}", admin_headers),
+        rounds=3, iterations=1,
+    )
+
+
+def test_importar_gatos_csv(benchmark, client, admin_headers):
+    # Cada ronda importa un CSV nuevo con códigos distintos para medir inserciones reales
+    lotes = itertools.count()
+
+    def preparar():
+        n = next(lotes)
+        contenido = generar_csv_censo(1000, semilla=n, offset_codigo=(os.getpid() % 1000) * 10_000_000 + n * 10_000)
+        return (client, contenido), {}
+
+    def importar(client, contenido):
+        r = client.post(
+            "/api/gatos/gatos/importar-csv",
+            files={"file": ("censo.csv", contenido, "text/csv")},
+            headers=admin_headers,
+        )
+        assert r.status_code == 200, r.text
+
+    benchmark.pedantic(importar, setup=preparar, rounds=5, iterations=1)
@@ -0,0 +1,72 @@
+"""
+Prueba de carga con Locust sobre las rutas pesadas.
+
+    locust -f benchmarks/locustfile.py --host http://localhost:8000 \\
+        --headless -u 50 -r 10 -t 2m --csv bench_locust
+
+Los usuarios inician sesión con las credenciales que crea `benchmarks.seed`.
+"""
+import os
+import random
+
+from locust import HttpUser, between, task
+
+from benchmarks.seed import ADMIN_BENCH, PASSWORD_BENCH, generar_csv_censo
+
+
+class _UsuarioOnegat(HttpUser):
+    abstract = True
+    wait_time = between(0.5, 2)
+    username = ADMIN_BENCH
+
+    def on_start(self):
+        r = self.client.post(
+            "/api/auth/login",
+            json={"username": self.username, "password": PASSWORD_BENCH, "accepted_terms": True},
+        )
+        r.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+
+
+class Voluntario(_UsuarioOnegat):
+    weight = 8
+    # Usuario de un voluntario sembrado (vol_<tenant>_<id>)
+    username = os.getenv("BENCH_VOLUNTARIO", "vol_default_2")
+
+    @task(4)
+    def mis_colonias(self):
+        self.client.get("/api/colonias/colonias/mis-colonias")
+
+    @task(4)
+    def mis_gatos(self):
+        self.client.get("/api/gatos/gatos/mis-gatos?limit=50")
+
+    @task(2)
+    def mapa(self):
+        self.client.get("/api/colonias/colonias/mapa/colonias")
+
+
+class Administrador(_UsuarioOnegat):
+    weight = 2
+
+    @task(5)
+    def listado_gatos(self):
+        self.client.get(f"/api/gatos/gatos/?skip={random.randrange(0, 5000)}&limit=100", name="/gatos/?skip=N")
+
+    @task(3)
+    def colonias(self):
+        self.client.get("/api/colonias/colonias/?limit=100")
+
+    @task(3)
+    def quejas(self):
+        self.client.get("/api/quejas/quejas/")
+
+    @task(1)
+    def informe_colonias(self):
+        self.client.get("/api/informes/informes/colonias")
+
+    @task(1)
+    def importar_csv(self):
+        contenido = generar_csv_censo(200, semilla=random.randrange(1_000_000),
+                                      offset_codigo=random.randrange(10_000_000) * 1000)
+        self.client.post("/api/gatos/gatos/importar-csv", files={"file": ("censo.csv", contenido, "text/csv")})
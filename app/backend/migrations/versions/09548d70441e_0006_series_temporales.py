@@ -0,0 +1,33 @@
+"""0006_series_temporales
+
+Revision ID: 09548d70441e
+Revises: d91fd653ef3b
+Create Date: 2026-10-19 14:02:17.335904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '09548d70441e'
+down_revision: Union[str, None] = 'd91fd653ef3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Sin valor por defecto al añadirla: la fecha de alta de los gatos existentes
+    # es desconocida y no debe contarse como alta de hoy
+    op.add_column('gatos', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.alter_column('gatos', 'created_at', server_default=sa.text("timezone('utc', now())"))
+    op.create_index(op.f('ix_gatos_created_at'), 'gatos', ['created_at'], unique=False)
+    op.create_index(op.f('ix_quejas_fecha'), 'quejas', ['fecha'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_quejas_fecha'), table_name='quejas')
+    op.drop_index(op.f('ix_gatos_created_at'), table_name='gatos')
+    op.drop_column('gatos', 'created_at')
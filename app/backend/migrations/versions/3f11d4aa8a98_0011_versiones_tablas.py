@@ -0,0 +1,58 @@
+"""0011_versiones_tablas
+
+Revision ID: 3f11d4aa8a98
+Revises: 3f5809041f29
+Create Date: 2026-10-19 18:26:44.918230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f11d4aa8a98'
+down_revision: Union[str, None] = '3f5809041f29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tablas de los listados con ETag (models.TABLAS_VERSIONADAS)
+TABLAS = ('campanas', 'colonias', 'gatos', 'quejas', 'usuarios_colonias')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'versiones_tablas',
+        sa.Column('tabla', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('modificado_en', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('tabla', name=op.f('pk_versiones_tablas')),
+    )
+    # Un trigger por sentencia (no por fila): una importación masiva suma una
+    # versión por sentencia. greatest() mantiene modificado_en creciente aunque
+    # las transacciones confirmen en otro orden
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_versionar_tabla() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO versiones_tablas (tabla, version, modificado_en)
+            VALUES (TG_TABLE_NAME, 1, timezone('utc', clock_timestamp()))
+            ON CONFLICT (tabla) DO UPDATE
+            SET version = versiones_tablas.version + 1,
+                modificado_en = greatest(versiones_tablas.modificado_en, EXCLUDED.modificado_en);
+            RETURN NULL;
+        END $$
+    """)
+    for tabla in TABLAS:
+        op.execute(f"INSERT INTO versiones_tablas (tabla, version) VALUES ('{tabla}', 1)")
+        op.execute(
+            f"CREATE TRIGGER tr_{tabla}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla}"
+            f" FOR EACH STATEMENT EXECUTE FUNCTION f_versionar_tabla()"
+        )
+
+
+def downgrade() -> None:
+    for tabla in TABLAS:
+        op.execute(f"DROP TRIGGER IF EXISTS tr_{tabla}_version ON {tabla}")
+    op.execute("DROP FUNCTION IF EXISTS f_versionar_tabla()")
+    op.drop_table('versiones_tablas')
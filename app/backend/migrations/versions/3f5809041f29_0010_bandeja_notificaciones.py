@@ -0,0 +1,37 @@
+"""0010_bandeja_notificaciones
+
+Revision ID: 3f5809041f29
+Revises: d7572dde4c51
+Create Date: 2026-10-19 17:48:31.260417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f5809041f29'
+down_revision: Union[str, None] = 'd7572dde4c51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('notificaciones_no_leidas', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.create_index('ix_notificaciones_usuario_id_id', 'notificaciones', ['usuario_id', 'id'], unique=False)
+    # Contador inicial a partir de las notificaciones existentes
+    op.execute("""
+        UPDATE users u SET notificaciones_no_leidas = n.total
+        FROM (
+            SELECT usuario_id, count(*) AS total FROM notificaciones
+            WHERE leido IS NOT TRUE GROUP BY usuario_id
+        ) n
+        WHERE n.usuario_id = u.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notificaciones_usuario_id_id', table_name='notificaciones')
+    op.drop_column('users', 'notificaciones_no_leidas')
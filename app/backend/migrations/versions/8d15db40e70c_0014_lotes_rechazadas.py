@@ -0,0 +1,26 @@
+"""0014_lotes_rechazadas
+
+Revision ID: 8d15db40e70c
+Revises: f1f0ced01a02
+Create Date: 2026-10-19 21:52:30.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d15db40e70c'
+down_revision: Union[str, None] = 'f1f0ced01a02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('lotes_importacion', sa.Column('rechazadas', sa.JSON(none_as_null=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('lotes_importacion', 'rechazadas')
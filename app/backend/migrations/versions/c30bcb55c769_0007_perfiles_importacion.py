@@ -0,0 +1,44 @@
+"""0007_perfiles_importacion
+
+Revision ID: c30bcb55c769
+Revises: 09548d70441e
+Create Date: 2026-10-19 15:20:06.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c30bcb55c769'
+down_revision: Union[str, None] = '09548d70441e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'perfiles_importacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(), nullable=False),
+        sa.Column('columnas', sa.JSON(), nullable=False),
+        sa.Column('formato_fecha', sa.String(), nullable=True),
+        sa.Column('codificacion', sa.String(), nullable=False),
+        sa.Column('delimitador', sa.String(length=1), nullable=True),
+        sa.Column('fila_cabecera', sa.Integer(), nullable=True),
+        sa.Column('colonia_id', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.ForeignKeyConstraint(['colonia_id'], ['colonias.id'], name=op.f('fk_perfiles_importacion_colonia_id_colonias'), ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_perfiles_importacion')),
+        sa.UniqueConstraint('nombre', name=op.f('uq_perfiles_importacion_nombre')),
+    )
+    op.create_index(op.f('ix_perfiles_importacion_id'), 'perfiles_importacion', ['id'], unique=False)
+    op.create_index(op.f('ix_perfiles_importacion_updated_at'), 'perfiles_importacion', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_perfiles_importacion_updated_at'), table_name='perfiles_importacion')
+    op.drop_index(op.f('ix_perfiles_importacion_id'), table_name='perfiles_importacion')
+    op.drop_table('perfiles_importacion')
@@ -0,0 +1,48 @@
+"""0008_lotes_importacion
+
+Revision ID: cc6bc923abb2
+Revises: c30bcb55c769
+Create Date: 2026-10-19 16:04:51.772019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cc6bc923abb2'
+down_revision: Union[str, None] = 'c30bcb55c769'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'lotes_importacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hash_sha256', sa.String(length=64), nullable=False),
+        sa.Column('nombre_fichero', sa.String(), nullable=True),
+        sa.Column('perfil_id', sa.Integer(), nullable=True),
+        sa.Column('estado', sa.String(), nullable=False),
+        sa.Column('total_filas', sa.Integer(), nullable=False),
+        sa.Column('filas_procesadas', sa.Integer(), nullable=False),
+        sa.Column('importados', sa.Integer(), nullable=False),
+        sa.Column('actualizados', sa.Integer(), nullable=False),
+        sa.Column('omitidos', sa.Integer(), nullable=False),
+        sa.Column('errores', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.ForeignKeyConstraint(['perfil_id'], ['perfiles_importacion.id'], name=op.f('fk_lotes_importacion_perfil_id_perfiles_importacion'), ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_lotes_importacion')),
+        sa.UniqueConstraint('hash_sha256', name=op.f('uq_lotes_importacion_hash_sha256')),
+    )
+    op.create_index(op.f('ix_lotes_importacion_id'), 'lotes_importacion', ['id'], unique=False)
+    op.create_index(op.f('ix_lotes_importacion_updated_at'), 'lotes_importacion', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_lotes_importacion_updated_at'), table_name='lotes_importacion')
+    op.drop_index(op.f('ix_lotes_importacion_id'), table_name='lotes_importacion')
+    op.drop_table('lotes_importacion')
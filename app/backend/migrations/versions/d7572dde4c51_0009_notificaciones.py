@@ -0,0 +1,49 @@
+"""0009_notificaciones
+
+Revision ID: d7572dde4c51
+Revises: cc6bc923abb2
+Create Date: 2026-10-19 17:12:08.403915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7572dde4c51'
+down_revision: Union[str, None] = 'cc6bc923abb2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('digest_notificaciones', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('notificaciones', sa.Column('tipo', sa.String(), nullable=True))
+    op.create_table(
+        'correos_pendientes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('asunto', sa.String(), nullable=False),
+        sa.Column('mensaje', sa.String(), nullable=False),
+        sa.Column('resumen', sa.Boolean(), nullable=False),
+        sa.Column('intentos', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('enviado_en', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.ForeignKeyConstraint(['usuario_id'], ['users.id'], name=op.f('fk_correos_pendientes_usuario_id_users'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_correos_pendientes')),
+    )
+    op.create_index(op.f('ix_correos_pendientes_id'), 'correos_pendientes', ['id'], unique=False)
+    op.create_index(op.f('ix_correos_pendientes_updated_at'), 'correos_pendientes', ['updated_at'], unique=False)
+    op.create_index('ix_correos_pendientes_pendientes', 'correos_pendientes', ['resumen', 'id'], unique=False, postgresql_where=sa.text('enviado_en IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_correos_pendientes_pendientes', table_name='correos_pendientes', postgresql_where=sa.text('enviado_en IS NULL'))
+    op.drop_index(op.f('ix_correos_pendientes_updated_at'), table_name='correos_pendientes')
+    op.drop_index(op.f('ix_correos_pendientes_id'), table_name='correos_pendientes')
+    op.drop_table('correos_pendientes')
+    op.drop_column('notificaciones', 'tipo')
+    op.drop_column('users', 'digest_notificaciones')
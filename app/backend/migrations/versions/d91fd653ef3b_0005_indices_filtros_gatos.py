@@ -0,0 +1,32 @@
+"""0005_indices_filtros_gatos
+
+Revision ID: d91fd653ef3b
+Revises: e40e372a6f8a
+Create Date: 2026-10-19 12:31:44.906215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91fd653ef3b'
+down_revision: Union[str, None] = 'e40e372a6f8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columnas de filtro por rango y de orden del listado de gatos (app/utils/filtros.py)
+COLUMNAS = ['nombre', 'fecha_vacunacion', 'fecha_esterilizacion', 'fecha_desparasitacion']
+
+
+def upgrade() -> None:
+    for columna in COLUMNAS:
+        op.create_index(op.f(f'ix_gatos_{columna}'), 'gatos', [columna], unique=False)
+    op.create_index('ix_gatos_colonia_id_id', 'gatos', ['colonia_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_gatos_colonia_id_id', table_name='gatos')
+    for columna in reversed(COLUMNAS):
+        op.drop_index(op.f(f'ix_gatos_{columna}'), table_name='gatos')
@@ -0,0 +1,50 @@
+"""0004_microchip
+
+Revision ID: e40e372a6f8a
+Revises: f6a2a8ef1029
+Create Date: 2026-10-19 11:48:05.127731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e40e372a6f8a'
+down_revision: Union[str, None] = 'f6a2a8ef1029'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Forma normalizada: solo dígitos (vacío -> NULL)
+    op.execute(r"""
+        UPDATE gatos
+        SET codigo_identificacion = NULLIF(regexp_replace(codigo_identificacion, '\D', '', 'g'), '')
+        WHERE codigo_identificacion IS NOT NULL AND codigo_identificacion !~ '^\d+$'
+    """)
+
+    duplicados = op.get_bind().execute(sa.text("""
+        SELECT codigo_identificacion, array_agg(id ORDER BY id) AS ids
+        FROM gatos
+        WHERE codigo_identificacion IS NOT NULL
+        GROUP BY codigo_identificacion
+        HAVING count(*) > 1
+        LIMIT 20
+    """)).all()
+    if duplicados:
+        detalle = "; ".join(f"{codigo}: gatos {ids}" for codigo, ids in duplicados)
+        raise RuntimeError(f"Hay microchips duplicados; corrígelos antes de migrar ({detalle})")
+
+    # text_pattern_ops: sirve igualdad y búsquedas por prefijo (LIKE '941%') con cualquier collation
+    op.create_index(
+        'uq_gatos_codigo_identificacion', 'gatos', ['codigo_identificacion'], unique=True,
+        postgresql_where=sa.text('codigo_identificacion IS NOT NULL'),
+        postgresql_ops={'codigo_identificacion': 'text_pattern_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_gatos_codigo_identificacion', table_name='gatos')
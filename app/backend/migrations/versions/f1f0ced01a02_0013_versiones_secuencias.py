@@ -0,0 +1,72 @@
+"""0013_versiones_secuencias
+
+Revision ID: f1f0ced01a02
+Revises: f27d197bf205
+Create Date: 2026-10-19 21:14:05.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1f0ced01a02'
+down_revision: Union[str, None] = 'f27d197bf205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tablas de los listados con ETag (models.TABLAS_VERSIONADAS)
+TABLAS = ('campanas', 'colonias', 'gatos', 'quejas', 'usuarios_colonias')
+LOCK_VERSIONES = 0x76657273  # models.LOCK_VERSIONES
+
+
+def upgrade() -> None:
+    # La fila por tabla de versiones_tablas se bloqueaba hasta el commit en cada
+    # escritura y serializaba a todos los escritores de esa tabla. nextval() no
+    # bloquea; el lock compartido no excluye a otros escritores y solo indica a
+    # los lectores (utils/condicional.py) que hay escrituras sin confirmar
+    for tabla in TABLAS:
+        op.execute(f"CREATE SEQUENCE {tabla}_version_seq")
+        # Sigue donde estaba el contador: un ETag antiguo no vuelve a ser válido
+        op.execute(
+            f"SELECT setval('{tabla}_version_seq', coalesce("
+            f"(SELECT max(version) FROM versiones_tablas WHERE tabla = '{tabla}'), 0) + 1)"
+        )
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION f_versionar_tabla() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared({LOCK_VERSIONES}, TG_RELID::int);
+            PERFORM nextval((TG_TABLE_NAME || '_version_seq')::regclass);
+            RETURN NULL;
+        END $$
+    """)
+    op.drop_table('versiones_tablas')
+
+
+def downgrade() -> None:
+    op.create_table(
+        'versiones_tablas',
+        sa.Column('tabla', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('modificado_en', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('tabla', name=op.f('pk_versiones_tablas')),
+    )
+    for tabla in TABLAS:
+        op.execute(
+            f"INSERT INTO versiones_tablas (tabla, version) SELECT '{tabla}', last_value FROM {tabla}_version_seq"
+        )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_versionar_tabla() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO versiones_tablas (tabla, version, modificado_en)
+            VALUES (TG_TABLE_NAME, 1, timezone('utc', clock_timestamp()))
+            ON CONFLICT (tabla) DO UPDATE
+            SET version = versiones_tablas.version + 1,
+                modificado_en = greatest(versiones_tablas.modificado_en, EXCLUDED.modificado_en);
+            RETURN NULL;
+        END $$
+    """)
+    for tabla in TABLAS:
+        op.execute(f"DROP SEQUENCE IF EXISTS {tabla}_version_seq")
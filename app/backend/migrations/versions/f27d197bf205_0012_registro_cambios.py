@@ -0,0 +1,39 @@
+"""0012_registro_cambios
+
+Revision ID: f27d197bf205
+Revises: 3f11d4aa8a98
+Create Date: 2026-10-19 19:03:57.116482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f27d197bf205'
+down_revision: Union[str, None] = '3f11d4aa8a98'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'registro_cambios',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('transaccion', sa.BigInteger(), server_default=sa.text('txid_current()'), nullable=False),
+        sa.Column('tabla', sa.String(), nullable=False),
+        sa.Column('pk', sa.String(), nullable=False),
+        sa.Column('op', sa.String(length=6), nullable=False),
+        sa.Column('campos', sa.JSON(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=True),
+        sa.Column('fecha', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_registro_cambios')),
+    )
+    op.create_index('ix_registro_cambios_transaccion_id', 'registro_cambios', ['transaccion', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_registro_cambios_transaccion_id', table_name='registro_cambios')
+    op.drop_table('registro_cambios')
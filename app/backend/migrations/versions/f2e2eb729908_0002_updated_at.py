@@ -0,0 +1,36 @@
+"""0002_updated_at
+
+Revision ID: f2e2eb729908
+Revises: dd6e49386529
+Create Date: 2026-10-19 10:12:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2e2eb729908'
+down_revision: Union[str, None] = 'dd6e49386529'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tablas con marca de última modificación (backups incrementales)
+TABLAS = [
+    'actividades', 'actividades_voluntarios', 'campanas', 'colonias', 'gatos',
+    'inspecciones', 'notificaciones', 'partes', 'quejas', 'users',
+]
+
+
+def upgrade() -> None:
+    for tabla in TABLAS:
+        op.add_column(tabla, sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False))
+        op.create_index(op.f(f'ix_{tabla}_updated_at'), tabla, ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    for tabla in reversed(TABLAS):
+        op.drop_index(op.f(f'ix_{tabla}_updated_at'), table_name=tabla)
+        op.drop_column(tabla, 'updated_at')
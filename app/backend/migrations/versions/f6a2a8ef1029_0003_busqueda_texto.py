@@ -0,0 +1,47 @@
+"""0003_busqueda_texto
+
+Revision ID: f6a2a8ef1029
+Revises: f2e2eb729908
+Create Date: 2026-10-19 11:02:17.334920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2a8ef1029'
+down_revision: Union[str, None] = 'f2e2eb729908'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Deben coincidir exactamente con las expresiones de app/routes/busqueda.py,
+# o PostgreSQL no usará los índices
+INDICES = {
+    'gatos': "setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(nombre, '') || ' ' || coalesce(codigo_identificacion, ''))), 'A')"
+             " || setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(raza, ''))), 'B')",
+    'colonias': "setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(nombre, ''))), 'A')"
+                " || setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce(ubicacion, ''))), 'B')",
+    'quejas': "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(descripcion, '')))",
+    'inspecciones': "to_tsvector('spanish'::regconfig, f_unaccent(coalesce(observaciones, '')))",
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() no es IMMUTABLE (depende del diccionario); el envoltorio fija el
+    # diccionario y permite usarlo en índices de expresión
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    for tabla, expresion in INDICES.items():
+        op.execute(f"CREATE INDEX ix_{tabla}_busqueda ON {tabla} USING gin (({expresion}))")
+
+
+def downgrade() -> None:
+    for tabla in INDICES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{tabla}_busqueda")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")